@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     "rest_framework",
     "corsheaders",
     # local
+    "core",
     "accounts",
     "profiles",
     "plant_definitions",
@@ -104,6 +105,7 @@ REST_FRAMEWORK = {
         "user": "200/min",
         "anon": "50/min",
         "ingest_per_device": "60/hour",
+        "ingest_batch_per_device": "60/hour",
         "feed_per_device": "60/hour",
     },
     "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
@@ -151,6 +153,70 @@ CORS_ALLOW_ALL_ORIGINS = True
 CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://redis:6379/0")
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default="redis://redis:6379/1")
 
+# --- Cache ---
+# Shared Redis cache (the broker's Redis, separate DB) so DRF throttles and cached
+# IoT credentials are shared by every web worker. Without it each process keeps
+# its own LocMem cache, which is fine for local dev and tests.
+USE_REDIS_CACHE = env.bool("USE_REDIS_CACHE", default=False)
+
+if USE_REDIS_CACHE:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": env("REDIS_CACHE_URL", default="redis://redis:6379/2"),
+            "KEY_PREFIX": "flovers",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "flovers-default",
+        }
+    }
+
+# --- Readings ---
+# Key for the HMAC stored in AccountSecret.secret_hash (IoT credential lookups). Falls back to
+# SECRET_KEY when empty; set a dedicated key so SECRET_KEY can be rotated on its own. After
+# changing whichever key is in use, run `manage.py rehash_account_secrets` or every device gets 403.
+READINGS_SECRET_HASH_KEY = env("READINGS_SECRET_HASH_KEY", default="")
+# History bucketing engine: "rollup" (default), "db" or "python"; see readings/history.py
+READINGS_HISTORY_ENGINE = env("READINGS_HISTORY_ENGINE", default="rollup")
+
+# Raw readings older than this many days are compacted into daily rollups and deleted
+# (0 = keep forever). Users can override it in ProfileSettings.readings_retention_days.
+READINGS_RAW_RETENTION_DAYS = env.int("READINGS_RAW_RETENTION_DAYS", default=0)
+READINGS_RETENTION_BATCH_SIZE = env.int("READINGS_RETENTION_BATCH_SIZE", default=5000)
+# PostgreSQL only: readings_reading is range-partitioned by month (see `manage.py
+# reading_partitions --convert`); expired months are then dropped instead of deleted.
+READINGS_PARTITIONED = env.bool("READINGS_PARTITIONED", default=False)
+
+# --- Push ---
+# FCM transport: "sdk" (firebase_admin, default), "threads" or "async"; see profiles/push.py
+PUSH_TRANSPORT = env("PUSH_TRANSPORT", default="sdk")
+PUSH_MAX_CONCURRENCY = env.int("PUSH_MAX_CONCURRENCY", default=50)
+PUSH_HTTP_TIMEOUT = env.float("PUSH_HTTP_TIMEOUT", default=10.0)
+# HTTP transports only: point at the local stub (`manage.py push_benchmark --serve`) to test offline.
+FCM_ENDPOINT = env("FCM_ENDPOINT", default="https://fcm.googleapis.com")
+FCM_PROJECT_ID = env("FCM_PROJECT_ID", default="")
+
+# --- Plant recognition ---
+# Load and warm the scan model when Django starts (web workers serving scans);
+# otherwise it loads lazily on the first scan. See plant_recognition/inference.py
+PLANT_RECOGNITION_WARMUP = env.bool("PLANT_RECOGNITION_WARMUP", default=False)
+# Batched inference server (`manage.py plant_inference_server`, plant_recognition/batching.py).
+# When set, scans go there; if it can't be reached they run in-process unless the fallback is off.
+PLANT_INFERENCE_URL = env("PLANT_INFERENCE_URL", default="")
+PLANT_INFERENCE_TIMEOUT = env.float("PLANT_INFERENCE_TIMEOUT", default=10.0)
+PLANT_INFERENCE_FALLBACK = env.bool("PLANT_INFERENCE_FALLBACK", default=True)
+PLANT_INFERENCE_MAX_BATCH = env.int("PLANT_INFERENCE_MAX_BATCH", default=8)
+PLANT_INFERENCE_MAX_WAIT_MS = env.float("PLANT_INFERENCE_MAX_WAIT_MS", default=10.0)
+PLANT_INFERENCE_MAX_QUEUE = env.int("PLANT_INFERENCE_MAX_QUEUE", default=32)
+PLANT_INFERENCE_TORCH_THREADS = env.int("PLANT_INFERENCE_TORCH_THREADS", default=2)
+# Repeat scans of (nearly) the same photo are answered from the cache for this many seconds
+# (0 = off); see plant_recognition/scan_cache.py. `manage.py plant_scan_cache` shows the hit rate.
+PLANT_SCAN_CACHE_TTL = env.int("PLANT_SCAN_CACHE_TTL", default=3600)
+
 # --- Public base URL (used for email links) ---
 SITE_URL = env(
     "SITE_URL",
@@ -171,6 +237,22 @@ CELERY_BEAT_SCHEDULE = {
         "task": "profiles.tasks.check_and_send_daily_task_notifications",
         "schedule": crontab(),  # every minute
     },
+    "refresh-dirty-reading-rollups-every-5-minutes": {
+        "task": "readings.tasks.refresh_reading_rollups",
+        "schedule": crontab(minute="*/5"),
+    },
+    "drain-outbound-messages-every-minute": {
+        "task": "core.tasks.drain_outbound_messages",
+        "schedule": crontab(),
+    },
+    "purge-outbound-messages-daily": {
+        "task": "core.tasks.purge_outbound_messages",
+        "schedule": crontab(hour=4, minute=15),
+    },
+    "apply-reading-retention-daily": {
+        "task": "readings.tasks.apply_reading_retention",
+        "schedule": crontab(hour=3, minute=30),
+    },
 }
 
 CELERY_TIMEZONE = "UTC"
@@ -196,7 +278,17 @@ EMAIL_USE_SSL = env.bool("EMAIL_USE_SSL", default=False)
 EMAIL_HOST_USER = env("EMAIL_HOST_USER", default="")
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD", default="")
 DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", default="no-reply@flovers.app")
+# core.emailing.send_email_batch reopens the SMTP connection after this many messages.
+EMAIL_BATCH_MAX_PER_CONNECTION = env.int("EMAIL_BATCH_MAX_PER_CONNECTION", default=100)
 SERVER_EMAIL = env("SERVER_EMAIL", default=DEFAULT_FROM_EMAIL)
+# Outbox (core.outbox): request emails are queued and sent by the drain worker.
+OUTBOX_BATCH_SIZE = env.int("OUTBOX_BATCH_SIZE", default=50)
+OUTBOX_MAX_ATTEMPTS = env.int("OUTBOX_MAX_ATTEMPTS", default=6)
+OUTBOX_RETRY_BASE_SECONDS = env.int("OUTBOX_RETRY_BASE_SECONDS", default=60)
+OUTBOX_RETRY_MAX_SECONDS = env.int("OUTBOX_RETRY_MAX_SECONDS", default=3600)
+OUTBOX_CLAIM_SECONDS = env.int("OUTBOX_CLAIM_SECONDS", default=600)
+# Sent and dead messages are deleted after this many days (0 = keep forever).
+OUTBOX_RETENTION_DAYS = env.int("OUTBOX_RETENTION_DAYS", default=30)
 
 # Email + i18n helpers
 EMAIL_SUBJECT_PREFIX = env("EMAIL_SUBJECT_PREFIX", default="[Flovers] ").strip()
@@ -1 +1,22 @@
 from django.contrib import admin
+from django.utils import timezone
+
+from .models import OutboundMessage
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "subject", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status", "kind")
+    search_fields = ("subject", "to")
+    readonly_fields = ("created_at", "sent_at")
+    actions = ("requeue",)
+
+    @admin.action(description="Requeue selected messages")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=OutboundMessage.STATUS_SENT).update(
+            status=OutboundMessage.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f"Requeued {updated} message(s).")
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .i18n import get_catalog
+
+        # Compile the translation catalog once per process, not on the first email.
+        get_catalog()
@@ -0,0 +1,63 @@
+"""
+Cache helpers that need more than Django's cache API.
+
+On Redis (USE_REDIS_CACHE) these run as single Lua scripts on the raw redis-py
+client, so they stay atomic across workers; on other backends (LocMem in dev and
+tests, per process) they fall back to plain cache calls.
+"""
+from __future__ import annotations
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DELETE_IF_EQUAL_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_delete_if_equal_script = None
+
+
+def redis_client(cache, key):
+    """
+    Return the raw redis-py client behind Django's RedisCache, or None for other backends.
+
+    Django has no public accessor for it, so this is the one place that reaches
+    into RedisCache._cache (a RedisCacheClient). Should that internal change,
+    callers fall back to their non-Redis path with a warning instead of failing.
+    """
+    try:
+        from django.core.cache.backends.redis import RedisCache
+    except ImportError:  # pragma: no cover
+        return None
+
+    if not isinstance(cache, RedisCache):
+        return None
+    get_client = getattr(getattr(cache, "_cache", None), "get_client", None)
+    if get_client is None:
+        logger.warning("RedisCache has no _cache.get_client(); using the non-Redis fallback.")
+        return None
+    return get_client(key, write=True)
+
+
+def delete_if_equal(cache, key: str, value: int) -> bool:
+    """
+    Delete `key` only if it still holds `value`, e.g. to release a lock taken with
+    cache.add(key, token) without deleting a newer holder's lock after it expired.
+
+    `value` must be an int: Django's RedisCache stores ints unpickled, so the
+    script can compare them as plain strings.
+    """
+    global _delete_if_equal_script
+    client = redis_client(cache, key)
+    if client is None:
+        if cache.get(key) != value:
+            return False
+        return cache.delete(key)
+
+    if _delete_if_equal_script is None:
+        _delete_if_equal_script = client.register_script(_DELETE_IF_EQUAL_LUA)
+    return bool(_delete_if_equal_script(keys=[cache.make_and_validate_key(key)], args=[value], client=client))
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Optional
+import smtplib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
 from email.mime.image import MIMEImage
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.base import TextNode, Variable, VariableNode
 from django.template.loader import get_template
 from django.utils.html import strip_tags
 
@@ -14,20 +22,261 @@ from .i18n import load_email_scope, merge_base, t
 logger = logging.getLogger(__name__)
 
 
-def _render_template(path: str, context: dict[str, Any]) -> str:
-    tpl = get_template(path)
-    return tpl.render(context)
+# Stands in for the fragment while a base template is pre-rendered into a shell.
+_CONTENT_MARKER = "@@flovers-email-content@@"
 
+# Settings that feed the compiled emails' templates or static context.
+_RENDER_SETTINGS = {"TEMPLATES", "BASE_DIR", "SITE_URL", "PUBLIC_WEB_BASE", "APP_NAME"}
 
-def _render_optional(path: str, context: dict[str, Any]) -> str:
+
+def _load_optional(path: str):
     try:
-        return _render_template(path, context)
+        return get_template(path)
+    except TemplateDoesNotExist:
+        # Compiled once per (template, lang), so this doesn't repeat per send.
+        logger.warning("Email template not found: %s", path)
+        return None
+    except Exception:
+        logger.exception("Failed to compile template: %s", path)
+        return None
+
+
+def _render_compiled(tpl, context: dict[str, Any], path: str) -> str:
+    if tpl is None:
+        return ""
+    try:
+        return tpl.render(context)
     except Exception:
         logger.exception("Failed to render template: %s", path)
         return ""
 
 
-def send_templated_email(
+@dataclass(frozen=True)
+class _Shell:
+    """A base template rendered once around the content marker."""
+    prefix: str
+    suffix: str
+    names: frozenset  # context names the base template reads (besides the content)
+
+
+def _build_shell(tpl, static_ctx: dict[str, Any], content_name: str) -> Optional[_Shell]:
+    """
+    Pre-render a base template whose top level is only text and plain variables.
+    Anything else (tags, filters on the content) is rendered per message instead.
+    """
+    if tpl is None:
+        return None
+
+    names = set()
+    for node in getattr(tpl.template, "nodelist", []):
+        if isinstance(node, TextNode):
+            continue
+        if not isinstance(node, VariableNode) or not isinstance(node.filter_expression.var, Variable):
+            return None
+        name = node.filter_expression.var.var.split(".", 1)[0]
+        if name == content_name and any(f.__name__ != "safe" for f, _ in node.filter_expression.filters):
+            return None
+        names.add(name)
+
+    try:
+        rendered = tpl.render({**static_ctx, content_name: _CONTENT_MARKER})
+    except Exception:
+        return None
+    if rendered.count(_CONTENT_MARKER) != 1:
+        return None
+
+    prefix, suffix = rendered.split(_CONTENT_MARKER)
+    return _Shell(prefix=prefix, suffix=suffix, names=frozenset(names - {content_name}))
+
+
+@dataclass(frozen=True)
+class CompiledEmail:
+    """
+    Everything about a (template_name, lang) email that doesn't depend on the
+    recipient: the merged base + scope translations, the compiled fragment and base
+    templates, and the base templates pre-rendered into shells.
+    """
+    template_name: str
+    lang: str
+    static_ctx: dict
+    scope_subject: str
+    html: Any
+    txt: Any
+    base_html: Any
+    base_txt: Any
+    html_shell: Optional[_Shell]
+    txt_shell: Optional[_Shell]
+
+    def _wrap(self, shell, base_tpl, base_path, content_name, fragment, ctx, caller_keys) -> str:
+        if shell is not None and not (shell.names & caller_keys):
+            return f"{shell.prefix}{fragment}{shell.suffix}"
+        return _render_compiled(base_tpl, {**ctx, content_name: fragment}, base_path)
+
+    def render(self, caller_ctx: dict[str, Any]) -> tuple[str, str]:
+        """Returns (html, txt) for one recipient."""
+        ctx = {**self.static_ctx, **caller_ctx}
+        caller_keys = caller_ctx.keys()
+
+        html_fragment = _render_compiled(self.html, ctx, f"email/{self.template_name}.html")
+        txt_fragment = _render_compiled(self.txt, ctx, f"email/{self.template_name}.txt")
+
+        html = ""
+        txt = ""
+        if html_fragment:
+            html = self._wrap(self.html_shell, self.base_html, "email/base.html", "content_html", html_fragment, ctx, caller_keys)
+        if txt_fragment:
+            txt = self._wrap(self.txt_shell, self.base_txt, "email/base.txt", "content_txt", txt_fragment, ctx, caller_keys)
+
+        if not txt and html:
+            txt = strip_tags(html)
+        return html, txt
+
+
+class _RenderStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.compiled = 0
+            self.compile_seconds = 0.0
+            self.rendered = 0
+            self.render_seconds = 0.0
+
+    def add_compile(self, seconds: float):
+        with self._lock:
+            self.compiled += 1
+            self.compile_seconds += seconds
+
+    def add_render(self, seconds: float):
+        with self._lock:
+            self.rendered += 1
+            self.render_seconds += seconds
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "compiled": self.compiled,
+                "compile_seconds": self.compile_seconds,
+                "rendered": self.rendered,
+                "render_seconds": self.render_seconds,
+            }
+
+
+_render_stats = _RenderStats()
+_compiled: dict[tuple[str, str], CompiledEmail] = {}
+_compiled_lock = threading.Lock()
+
+
+def email_render_stats() -> dict[str, float]:
+    """
+    Process-wide email rendering counters: compiled (template, lang) entries and the
+    time spent compiling them, rendered emails and the time spent rendering them.
+    Diff two snapshots to get the cost of a block of work.
+    """
+    return _render_stats.snapshot()
+
+
+def reset_email_render_stats() -> None:
+    _render_stats.reset()
+
+
+def clear_email_render_cache() -> None:
+    with _compiled_lock:
+        _compiled.clear()
+
+
+@receiver(setting_changed)
+def _clear_render_cache_on_setting_change(*, setting, **kwargs):
+    if setting in _RENDER_SETTINGS:
+        clear_email_render_cache()
+
+
+def compiled_email(template_name: str, lang: str) -> CompiledEmail:
+    key = (template_name, lang)
+    compiled = _compiled.get(key)
+    if compiled is not None:
+        return compiled
+
+    started = time.perf_counter()
+    base_ctx = merge_base(
+        {},
+        lang=lang,
+        extra_base={
+            "site_url": getattr(settings, "SITE_URL", ""),
+            "public_web_base": getattr(settings, "PUBLIC_WEB_BASE", getattr(settings, "SITE_URL", "")),
+            "app_name": getattr(settings, "APP_NAME", "Flovers"),
+        },
+    )
+
+    scope = template_name.replace("/", ".")
+    scope_ctx = load_email_scope(scope, lang=lang)
+    static_ctx = {**base_ctx, **scope_ctx}
+
+    html = _load_optional(f"email/{template_name}.html")
+    txt = _load_optional(f"email/{template_name}.txt")
+    base_html = _load_optional("email/base.html")
+    base_txt = _load_optional("email/base.txt")
+    if html is None and txt is None:
+        logger.error("No templates found for email: %s", template_name)
+
+    compiled = CompiledEmail(
+        template_name=template_name,
+        lang=lang,
+        static_ctx=static_ctx,
+        scope_subject=(scope_ctx.get("subject") or "").strip(),
+        html=html,
+        txt=txt,
+        base_html=base_html,
+        base_txt=base_txt,
+        html_shell=_build_shell(base_html, static_ctx, "content_html"),
+        txt_shell=_build_shell(base_txt, static_ctx, "content_txt"),
+    )
+    _render_stats.add_compile(time.perf_counter() - started)
+
+    with _compiled_lock:
+        return _compiled.setdefault(key, compiled)
+
+
+def attach_files(
+    msg: EmailMultiAlternatives,
+    *,
+    inline_attachments: Optional[list[dict[str, Any]]] = None,
+    attachments: Optional[list[dict[str, Any]]] = None,
+) -> None:
+    """Attach files given in build_templated_email's inline_attachments/attachments form."""
+    for item in inline_attachments or []:
+        content = item.get("content")
+        content_id = (item.get("content_id") or "").strip()
+        filename = (item.get("filename") or "").strip()
+        mimetype = (item.get("mimetype") or "image/png").strip().lower()
+
+        if not content or not content_id:
+            continue
+
+        maintype, _, subtype = mimetype.partition("/")
+        if maintype != "image":
+            logger.warning("Unsupported inline attachment mimetype for CID email: %s", mimetype)
+            continue
+
+        image = MIMEImage(content, _subtype=subtype or "png")
+        image.add_header("Content-ID", f"<{content_id}>")
+        image.add_header("Content-Disposition", "inline", filename=filename or content_id)
+        msg.attach(image)
+
+    for item in attachments or []:
+        content = item.get("content")
+        filename = (item.get("filename") or "").strip()
+        mimetype = (item.get("mimetype") or "application/octet-stream").strip().lower()
+
+        if not content or not filename:
+            continue
+
+        msg.attach(filename, content, mimetype)
+
+
+def build_templated_email(
     *,
     to_email: str,
     template_name: str,
@@ -38,8 +287,10 @@ def send_templated_email(
     reply_to: Optional[list[str]] = None,
     inline_attachments: Optional[list[dict[str, Any]]] = None,
     attachments: Optional[list[dict[str, Any]]] = None,
-) -> bool:
+) -> Optional[EmailMultiAlternatives]:
     """
+    Build (but don't send) a templated email; None without a recipient.
+
     Renders:
       templates/email/<template_name>.html (fragment)
       templates/email/<template_name>.txt  (fragment)
@@ -67,22 +318,11 @@ def send_templated_email(
       ]
     """
     if not to_email:
-      return False
+      return None
 
     lang = (lang or getattr(settings, "EMAIL_DEFAULT_LANG", "en") or "en").strip().lower()
 
-    base_ctx = merge_base(
-        {},
-        lang=lang,
-        extra_base={
-            "site_url": getattr(settings, "SITE_URL", ""),
-            "public_web_base": getattr(settings, "PUBLIC_WEB_BASE", getattr(settings, "SITE_URL", "")),
-            "app_name": getattr(settings, "APP_NAME", "Flovers"),
-        },
-    )
-
-    scope = template_name.replace("/", ".")
-    scope_ctx = load_email_scope(scope, lang=lang)
+    compiled = compiled_email(template_name, lang)
 
     caller_ctx = dict(context or {})
 
@@ -92,13 +332,11 @@ def send_templated_email(
         elif "reset_link" in caller_ctx:
             caller_ctx["link"] = caller_ctx["reset_link"]
 
-    ctx: dict[str, Any] = {**base_ctx, **scope_ctx, **caller_ctx}
-
     subject: str = ""
     if subject_key:
         subject = t(subject_key, lang=lang, default="") or ""
     if not subject:
-        subject = (scope_ctx.get("subject") or "").strip()
+        subject = compiled.scope_subject
     if not subject:
         subject = "Flovers"
 
@@ -109,21 +347,9 @@ def send_templated_email(
 
     base_from = from_email or getattr(settings, "DEFAULT_FROM_EMAIL", None) or "no-reply@example.com"
 
-    html_fragment = _render_optional(f"email/{template_name}.html", ctx)
-    txt_fragment = _render_optional(f"email/{template_name}.txt", ctx)
-
-    html = ""
-    txt = ""
-
-    if html_fragment:
-        html = _render_optional("email/base.html", {**ctx, "content_html": html_fragment})
-    if txt_fragment:
-        txt = _render_optional("email/base.txt", {**ctx, "content_txt": txt_fragment})
-
-    if not txt and html:
-        txt = strip_tags(html)
-    if not html and txt:
-        html = ""
+    started = time.perf_counter()
+    html, txt = compiled.render(caller_ctx)
+    _render_stats.add_render(time.perf_counter() - started)
 
     msg = EmailMultiAlternatives(
         subject=subject,
@@ -135,34 +361,84 @@ def send_templated_email(
     if html:
         msg.attach_alternative(html, "text/html")
 
-    for item in inline_attachments or []:
-        content = item.get("content")
-        content_id = (item.get("content_id") or "").strip()
-        filename = (item.get("filename") or "").strip()
-        mimetype = (item.get("mimetype") or "image/png").strip().lower()
+    attach_files(msg, inline_attachments=inline_attachments, attachments=attachments)
+    return msg
 
-        if not content or not content_id:
-            continue
 
-        maintype, _, subtype = mimetype.partition("/")
-        if maintype != "image":
-            logger.warning("Unsupported inline attachment mimetype for CID email: %s", mimetype)
-            continue
+def send_templated_email(**kwargs) -> bool:
+    """Render and send one email; takes the same arguments as build_templated_email."""
+    msg = build_templated_email(**kwargs)
+    if msg is None:
+        return False
 
-        image = MIMEImage(content, _subtype=subtype or "png")
-        image.add_header("Content-ID", f"<{content_id}>")
-        image.add_header("Content-Disposition", "inline", filename=filename or content_id)
-        msg.attach(image)
+    msg.send(fail_silently=False)
+    return True
 
-    for item in attachments or []:
-        content = item.get("content")
-        filename = (item.get("filename") or "").strip()
-        mimetype = (item.get("mimetype") or "application/octet-stream").strip().lower()
 
-        if not content or not filename:
-            continue
+def _close_quietly(connection) -> None:
+    try:
+        connection.close()
+    except Exception:
+        logger.debug("Closing the email connection failed", exc_info=True)
 
-        msg.attach(filename, content, mimetype)
 
-    msg.send(fail_silently=False)
-    return True
+def send_email_batch(
+    messages: list[Optional[EmailMessage]],
+    *,
+    max_per_connection: Optional[int] = None,
+    retries: int = 1,
+    on_error: Optional[Callable[[int, Exception], None]] = None,
+) -> list[bool]:
+    """
+    Send many prepared messages (e.g. from build_templated_email) over one reused
+    connection instead of one SMTP session per message.
+
+    The connection is recycled after max_per_connection messages (default
+    settings.EMAIL_BATCH_MAX_PER_CONNECTION). A dropped or failing connection is
+    reopened and the message retried up to `retries` times; a recipient the server
+    refuses fails only that message. None entries are skipped. on_error(index, exc)
+    is called with the final error of each message that failed.
+
+    Returns one bool per message: whether it was sent.
+    """
+    limit = max(1, int(max_per_connection or getattr(settings, "EMAIL_BATCH_MAX_PER_CONNECTION", 100) or 100))
+    results = [False] * len(messages)
+
+    connection = None
+    sent_on_connection = 0
+    try:
+        for idx, msg in enumerate(messages):
+            if msg is None:
+                continue
+
+            for attempt in range(retries + 1):
+                try:
+                    if connection is None:
+                        connection = get_connection(fail_silently=False)
+                        connection.open()
+                        sent_on_connection = 0
+                    results[idx] = bool(connection.send_messages([msg]))
+                    sent_on_connection += 1
+                    break
+                except smtplib.SMTPRecipientsRefused as exc:
+                    logger.warning("Email recipients refused: %s", msg.recipients())
+                    if on_error is not None:
+                        on_error(idx, exc)
+                    break
+                except (smtplib.SMTPException, OSError) as exc:
+                    if connection is not None:
+                        _close_quietly(connection)
+                        connection = None
+                    if attempt >= retries:
+                        logger.exception("Failed to send email to %s", msg.recipients())
+                        if on_error is not None:
+                            on_error(idx, exc)
+
+            if connection is not None and sent_on_connection >= limit:
+                _close_quietly(connection)
+                connection = None
+    finally:
+        if connection is not None:
+            _close_quietly(connection)
+
+    return results
@@ -2,11 +2,14 @@ from __future__ import annotations
 
 import json
 import logging
+import threading
 from functools import lru_cache
 from pathlib import Path
 from typing import Any, Mapping, Optional
 
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
 logger = logging.getLogger(__name__)
 
@@ -35,19 +38,6 @@ def _safe_lang(lang: Optional[str]) -> str:
     return lang or DEFAULT_LANG
 
 
-def _deep_get(d: Mapping[str, Any], key: str) -> Any:
-    """
-    Retrieve nested keys using dot notation, e.g. "a.b.c".
-    (You mostly use flat JSON dicts, but this supports nesting too.)
-    """
-    cur: Any = d
-    for part in key.split("."):
-        if not isinstance(cur, Mapping) or part not in cur:
-            return None
-        cur = cur[part]
-    return cur
-
-
 @lru_cache(maxsize=512)
 def _load_json_file(path: str) -> dict[str, Any]:
     p = Path(path)
@@ -91,9 +81,110 @@ def load_email_scope(scope: str, *, lang: Optional[str] = None) -> dict[str, Any
     return _load_scope(DEFAULT_LANG, scope) or {}
 
 
+def _flatten(prefix: str, data: Mapping[str, Any], out: dict[str, str]) -> None:
+    for key, value in data.items():
+        full_key = f"{prefix}.{key}"
+        if isinstance(value, Mapping):
+            _flatten(full_key, value, out)
+        elif value is not None:
+            out[full_key] = str(value)
+
+
+def _read_locale(lang_dir: Path) -> dict[str, str]:
+    """Every email/<scope>.json of one language, flattened to {full_key: text}."""
+    flat: dict[str, str] = {}
+    for path in sorted((lang_dir / "email").glob("*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            logger.exception("Failed to load i18n JSON: %s", path)
+            continue
+        if isinstance(data, Mapping):
+            _flatten(path.stem, data, flat)
+    return flat
+
+
+class Catalog:
+    """
+    All translations compiled into one flat dict keyed (lang, full_key), with the
+    DEFAULT_LANG fallback already filled in for every known language, so a lookup
+    is a single dict get.
+
+    Also holds the supported-language set used to resolve user languages.
+    """
+
+    def __init__(self, root: Path, supported_langs, default_lang: str):
+        self.default_lang = default_lang
+        self.supported = frozenset(supported_langs) or frozenset({default_lang})
+
+        locales: dict[str, dict[str, str]] = {}
+        if root.is_dir():
+            for lang_dir in sorted(root.iterdir()):
+                if lang_dir.is_dir():
+                    locales[lang_dir.name.lower()] = _read_locale(lang_dir)
+
+        fallback = locales.get(DEFAULT_LANG, {})
+        self.langs = frozenset(locales) | {DEFAULT_LANG}
+        self.entries: dict[tuple[str, str], str] = {}
+        for lang in self.langs:
+            for key, text in {**fallback, **locales.get(lang, {})}.items():
+                self.entries[(lang, key)] = text
+
+    def get(self, lang: str, key: str) -> Optional[str]:
+        val = self.entries.get((lang, key))
+        if val is None and lang not in self.langs:
+            val = self.entries.get((DEFAULT_LANG, key))
+        return val
+
+    def resolve_lang(self, lang: Optional[str]) -> str:
+        """A user's language if supported, else the default email language."""
+        lang = str(lang or "").strip().lower()
+        return lang if lang in self.supported else self.default_lang
+
+
+_catalog: Optional[Catalog] = None
+_catalog_lock = threading.Lock()
+
+# Settings the compiled catalog is built from.
+_CATALOG_SETTINGS = {"BASE_DIR", "SUPPORTED_LANGS", "EMAIL_DEFAULT_LANG"}
+
+
+def get_catalog() -> Catalog:
+    """The process-wide compiled catalog; built on first use (or at app startup)."""
+    global _catalog
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = Catalog(
+                    _locales_root(),
+                    getattr(settings, "SUPPORTED_LANGS", []),
+                    getattr(settings, "EMAIL_DEFAULT_LANG", DEFAULT_LANG) or DEFAULT_LANG,
+                )
+            catalog = _catalog
+    return catalog
+
+
+def clear_catalog() -> None:
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+@receiver(setting_changed)
+def _clear_catalog_on_setting_change(*, setting, **kwargs):
+    if setting in _CATALOG_SETTINGS:
+        clear_catalog()
+
+
+def supported_lang(lang: Optional[str]) -> str:
+    """Map a stored profile language to a supported one (else EMAIL_DEFAULT_LANG)."""
+    return get_catalog().resolve_lang(lang)
+
+
 def t(key: str, *, lang: Optional[str] = None, default: Optional[str] = None) -> str:
     """
-    Translation lookup with JSON files.
+    Translation lookup in the compiled catalog.
 
     Key convention:
       - base.<field>                       -> email/base.json
@@ -102,41 +193,10 @@ def t(key: str, *, lang: Optional[str] = None, default: Optional[str] = None) ->
       - profiles.due_today.<field>         -> email/profiles.due_today.json
       - profiles.overdue_1d.<field>        -> email/profiles.overdue_1d.json
     """
-    lang = _safe_lang(lang)
-    parts = key.split(".")
-    if not parts:
-        return default or key
-
-    # base.*
-    if parts[0] == "base":
-        if len(parts) < 2:
-            return default or key
-        scope = "base"
-        lookup_key = ".".join(parts[1:])
-        data_lang = _load_scope(lang, scope)
-        val = _deep_get(data_lang, lookup_key)
-
-        if val is None:
-            data_fallback = _load_scope(DEFAULT_LANG, scope)
-            val = _deep_get(data_fallback, lookup_key)
-
-    else:
-        # <group>.<name>.<field...>
-        if len(parts) < 3:
-            return default or key
-        scope = f"{parts[0]}.{parts[1]}"
-        lookup_key = ".".join(parts[2:])
-        data_lang = _load_scope(lang, scope)
-        val = _deep_get(data_lang, lookup_key)
-
-        if val is None:
-            data_fallback = _load_scope(DEFAULT_LANG, scope)
-            val = _deep_get(data_fallback, lookup_key)
-
+    val = get_catalog().get(_safe_lang(lang), key)
     if val is None:
         return default or key
-
-    return str(val)
+    return val
 
 
 def tf(key: str, *, lang: Optional[str] = None, default: Optional[str] = None, **kwargs: Any) -> str:
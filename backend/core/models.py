@@ -1 +1,111 @@
+import base64
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
 from django.db import models
+from django.utils import timezone
+
+from .emailing import attach_files
+
+
+def _encode_files(items, *, inline: bool = False) -> list[dict]:
+    encoded = []
+    for item in items or []:
+        content = item.get("content")
+        if not content:
+            continue
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        entry = {
+            "filename": item.get("filename") or "",
+            "mimetype": item.get("mimetype") or "",
+            "content": base64.b64encode(content).decode("ascii"),
+        }
+        if inline:
+            entry["content_id"] = item.get("content_id") or ""
+        encoded.append(entry)
+    return encoded
+
+
+def _decode_files(items) -> list[dict]:
+    return [{**item, "content": base64.b64decode(item.get("content") or "")} for item in items or []]
+
+
+class OutboundMessage(models.Model):
+    """
+    A rendered email waiting in the outbox. Requests write these inside their own
+    transaction; core.tasks.drain_outbound_messages sends them in batches.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_DEAD = "dead"
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_DEAD, "Dead"),
+    )
+
+    kind = models.CharField(max_length=128, blank=True, default="")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    from_email = models.CharField(max_length=254, blank=True, default="")
+    to = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list, blank=True)
+    subject = models.TextField(blank=True, default="")
+    body_text = models.TextField(blank=True, default="")
+    body_html = models.TextField(blank=True, default="")
+    inline_attachments = models.JSONField(default=list, blank=True)
+    attachments = models.JSONField(default=list, blank=True)
+
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("id",)
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind or 'email'} to {', '.join(self.to)} ({self.status})"
+
+    @classmethod
+    def from_email_message(cls, msg: EmailMultiAlternatives, *, kind: str = "", inline_attachments=None, attachments=None) -> "OutboundMessage":
+        """
+        An unsaved row for a message from build_templated_email, built without its
+        files; pass those in their build_templated_email form instead.
+        """
+        html = next((content for content, mimetype in msg.alternatives if mimetype == "text/html"), "")
+        return cls(
+            kind=kind,
+            from_email=msg.from_email or "",
+            to=list(msg.to),
+            reply_to=list(msg.reply_to or []),
+            subject=msg.subject,
+            body_text=msg.body or "",
+            body_html=html,
+            inline_attachments=_encode_files(inline_attachments, inline=True),
+            attachments=_encode_files(attachments),
+        )
+
+    def to_email_message(self) -> EmailMultiAlternatives:
+        msg = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body_text,
+            from_email=self.from_email or getattr(settings, "DEFAULT_FROM_EMAIL", None),
+            to=list(self.to),
+            reply_to=list(self.reply_to) or None,
+        )
+        if self.body_html:
+            msg.attach_alternative(self.body_html, "text/html")
+        attach_files(
+            msg,
+            inline_attachments=_decode_files(self.inline_attachments),
+            attachments=_decode_files(self.attachments),
+        )
+        return msg
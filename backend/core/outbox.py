@@ -0,0 +1,194 @@
+"""
+Transactional email outbox.
+
+Views call enqueue_templated_email() instead of sending: the email is rendered in
+the request and stored as an OutboundMessage in the request's transaction, and
+core.tasks.drain_outbound_messages is kicked once that transaction commits. The
+drain (also on the beat schedule, to pick up retries) claims due rows in batches,
+sends each batch over one SMTP connection via send_email_batch(), and backs failed
+messages off exponentially until OUTBOX_MAX_ATTEMPTS, after which they are left as
+dead letters for the admin.
+
+Claiming pushes a row's next_attempt_at out by OUTBOX_CLAIM_SECONDS and counts the
+attempt up front, so concurrent drains skip each other's batches and a worker that
+dies mid-batch only delays its rows.
+
+A sent message keeps only its envelope (kind, recipients, subject, timestamps):
+bodies and attachments are cleared when it is marked sent. core.tasks.purge_outbound_messages
+deletes sent and dead rows after OUTBOX_RETENTION_DAYS.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Any, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .emailing import build_templated_email, send_email_batch
+from .models import OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name: str, default: int) -> int:
+    return max(1, int(getattr(settings, name, default) or default))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next try of a message that has failed `attempts` times."""
+    base = _setting("OUTBOX_RETRY_BASE_SECONDS", 60)
+    cap = _setting("OUTBOX_RETRY_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(cap, base * 2 ** max(0, attempts - 1)))
+
+
+def _kick_drain() -> None:
+    from .tasks import drain_outbound_messages
+
+    drain_outbound_messages.delay()
+
+
+def enqueue_templated_email(
+    *,
+    inline_attachments: Optional[list[dict[str, Any]]] = None,
+    attachments: Optional[list[dict[str, Any]]] = None,
+    **kwargs,
+) -> Optional[OutboundMessage]:
+    """
+    Render an email and store it in the outbox; takes the same arguments as
+    build_templated_email. Returns the saved row, or None without a recipient.
+    """
+    msg = build_templated_email(**kwargs)
+    if msg is None:
+        return None
+
+    row = OutboundMessage.from_email_message(
+        msg,
+        kind=kwargs.get("template_name") or "",
+        inline_attachments=inline_attachments,
+        attachments=attachments,
+    )
+    row.save()
+    # A broker outage must not fail the request; the beat drain picks the row up.
+    transaction.on_commit(_kick_drain, robust=True)
+    return row
+
+
+def _claim_batch(limit: int, now) -> list[OutboundMessage]:
+    lease_until = now + timedelta(seconds=_setting("OUTBOX_CLAIM_SECONDS", 600))
+    with transaction.atomic():
+        ids = list(
+            OutboundMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundMessage.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        OutboundMessage.objects.filter(id__in=ids).update(
+            attempts=F("attempts") + 1,
+            next_attempt_at=lease_until,
+        )
+    return list(OutboundMessage.objects.filter(id__in=ids).order_by("next_attempt_at", "id"))
+
+
+def _send_batch(rows: list[OutboundMessage]) -> dict[str, int]:
+    errors: dict[int, str] = {}
+    messages = []
+    for idx, row in enumerate(rows):
+        try:
+            messages.append(row.to_email_message())
+        except Exception as exc:
+            logger.exception("Outbox message %s could not be rebuilt", row.id)
+            errors[idx] = f"{type(exc).__name__}: {exc}"
+            messages.append(None)
+
+    def record_error(idx: int, exc: Exception) -> None:
+        errors[idx] = f"{type(exc).__name__}: {exc}"
+
+    results = send_email_batch(messages, on_error=record_error)
+
+    now = timezone.now()
+    max_attempts = _setting("OUTBOX_MAX_ATTEMPTS", 6)
+    counts = {"sent": 0, "retried": 0, "dead": 0}
+    sent_ids = []
+    failed = []
+
+    for idx, (row, ok) in enumerate(zip(rows, results)):
+        if ok:
+            sent_ids.append(row.id)
+            counts["sent"] += 1
+            continue
+
+        row.last_error = (errors.get(idx) or "Send failed.")[:2000]
+        if row.attempts >= max_attempts:
+            row.status = OutboundMessage.STATUS_DEAD
+            counts["dead"] += 1
+            logger.error("Outbox message %s dead after %s attempts: %s", row.id, row.attempts, row.last_error)
+        else:
+            row.next_attempt_at = now + retry_delay(row.attempts)
+            counts["retried"] += 1
+        failed.append(row)
+
+    if sent_ids:
+        OutboundMessage.objects.filter(id__in=sent_ids).update(
+            status=OutboundMessage.STATUS_SENT,
+            sent_at=now,
+            last_error="",
+            body_text="",
+            body_html="",
+            inline_attachments=[],
+            attachments=[],
+        )
+    if failed:
+        OutboundMessage.objects.bulk_update(failed, ["status", "next_attempt_at", "last_error"])
+    return counts
+
+
+def drain_outbox(*, batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> dict[str, int]:
+    """
+    Send due outbox messages until none are left (or max_batches batches were sent).
+    Returns {"sent", "retried", "dead"} counts.
+    """
+    batch_size = int(batch_size or _setting("OUTBOX_BATCH_SIZE", 50))
+    totals = {"sent": 0, "retried": 0, "dead": 0}
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = _claim_batch(batch_size, timezone.now())
+        if not rows:
+            break
+        batches += 1
+
+        for key, value in _send_batch(rows).items():
+            totals[key] += value
+        if len(rows) < batch_size:
+            break
+
+    if batches:
+        logger.info("outbox drain batches=%s sent=%s retried=%s dead=%s", batches, totals["sent"], totals["retried"], totals["dead"])
+    return totals
+
+
+def purge_outbox(*, retention_days: Optional[int] = None) -> int:
+    """
+    Delete sent and dead messages created more than OUTBOX_RETENTION_DAYS ago
+    (0 keeps them forever). Returns the number of deleted rows.
+    """
+    if retention_days is None:
+        retention_days = int(getattr(settings, "OUTBOX_RETENTION_DAYS", 30))
+    if retention_days <= 0:
+        return 0
+
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = OutboundMessage.objects.filter(
+        status__in=[OutboundMessage.STATUS_SENT, OutboundMessage.STATUS_DEAD],
+        created_at__lt=cutoff,
+    ).delete()
+    if deleted:
+        logger.info("outbox purge deleted=%s older_than_days=%s", deleted, retention_days)
+    return deleted
@@ -1,6 +1,19 @@
 from celery import shared_task
 from django.utils import timezone
 
+from .outbox import drain_outbox, purge_outbox
+
+
 @shared_task
 def send_watering_reminder(user_id):
     print(f"Reminder for user {user_id} at {timezone.now()}")
+
+
+@shared_task(bind=True, ignore_result=True)
+def drain_outbound_messages(self):
+    drain_outbox()
+
+
+@shared_task(bind=True, ignore_result=True)
+def purge_outbound_messages(self):
+    purge_outbox()
@@ -0,0 +1,27 @@
+import fakeredis
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from core.caching import delete_if_equal
+
+
+def _fake_redis_cache():
+    # Django's own RedisCache, with redis-py talking to an in-memory fakeredis server.
+    return RedisCache(
+        "redis://fake:6379/0",
+        {"OPTIONS": {"connection_class": fakeredis.FakeRedisConnection, "server": fakeredis.FakeServer()}},
+    )
+
+
+@pytest.mark.parametrize("make_cache", [_fake_redis_cache, lambda: LocMemCache("caching-tests", {})])
+def test_delete_if_equal_only_deletes_the_holders_value(make_cache):
+    cache = make_cache()
+    cache.add("lock", 1234, 60)
+
+    assert delete_if_equal(cache, "lock", 99) is False
+    assert cache.get("lock") == 1234
+
+    assert delete_if_equal(cache, "lock", 1234) is True
+    assert cache.get("lock") is None
+    assert delete_if_equal(cache, "lock", 1234) is False
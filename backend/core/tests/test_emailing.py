@@ -1,11 +1,20 @@
 import json
+import smtplib
+from unittest.mock import patch
 
 import pytest
 from django.core import mail
+from django.core.mail import EmailMessage
 from django.test import override_settings
 
 from core import i18n
-from core.emailing import send_templated_email
+from core.emailing import (
+    clear_email_render_cache,
+    compiled_email,
+    email_render_stats,
+    send_email_batch,
+    send_templated_email,
+)
 
 
 def _write(path, content):
@@ -68,5 +77,143 @@ def test_send_templated_email_renders_templates_and_attachment(tmp_path):
     i18n._load_json_file.cache_clear()
 
 
+@pytest.mark.parametrize("lang", ["en", "pl"])
+@pytest.mark.parametrize("template_name", ["profiles/due_today", "readings/moisture_alert", "accounts/activation"])
+def test_compiled_email_shell_matches_full_render(template_name, lang):
+    clear_email_render_cache()
+    compiled = compiled_email(template_name, lang)
+    assert compiled.html_shell is not None and compiled.txt_shell is not None
+
+    context = {"count": 3, "line1": "You have 3 tasks <due>", "link": "https://example.com/?a=1&b=2"}
+    html, txt = compiled.render(context)
+    # Overriding a base variable (with its own value) forces the full base render.
+    full_html, full_txt = compiled.render({**context, "brand": compiled.static_ctx["brand"]})
+
+    assert html == full_html
+    assert txt == full_txt
+
+
+def test_compiled_email_is_cached_and_timed():
+    clear_email_render_cache()
+    before = email_render_stats()
+
+    assert compiled_email("profiles/due_today", "en") is compiled_email("profiles/due_today", "en")
+    send_templated_email(to_email="a@example.com", template_name="profiles/due_today", context={"count": 1})
+    send_templated_email(to_email="b@example.com", template_name="profiles/due_today", context={"count": 2})
+
+    after = email_render_stats()
+    assert after["compiled"] - before["compiled"] == 1
+    assert after["rendered"] - before["rendered"] == 2
+    assert after["render_seconds"] > before["render_seconds"]
+    assert len(mail.outbox) == 2
+
+
+def test_missing_email_template_is_logged(caplog):
+    clear_email_render_cache()
+
+    with caplog.at_level("WARNING", logger="core.emailing"):
+        compiled_email("missing/template", "en")
+
+    assert "Email template not found: email/missing/template.html" in caplog.text
+    assert "Email template not found: email/missing/template.txt" in caplog.text
+
+
 def test_send_templated_email_returns_false_without_recipient():
     assert send_templated_email(to_email="", template_name="missing/template") is False
+
+
+class _FakeConnection:
+    def __init__(self, log, failures):
+        self.log = log
+        self.failures = failures
+        self.sent = []
+
+    def open(self):
+        self.log.append("open")
+
+    def close(self):
+        self.log.append("close")
+
+    def send_messages(self, messages):
+        to = messages[0].to[0]
+        failure = self.failures.pop(to, None)
+        if failure is not None:
+            raise failure
+        self.sent.extend(messages)
+        return len(messages)
+
+
+def _messages(*recipients):
+    return [EmailMessage(subject="Hi", body="Body", to=[to]) for to in recipients]
+
+
+def test_send_email_batch_reuses_connection_up_to_limit():
+    log = []
+    with patch("core.emailing.get_connection", side_effect=lambda **kw: _FakeConnection(log, {})):
+        messages = _messages("a@x.io", "b@x.io", "c@x.io", "d@x.io")
+        results = send_email_batch([*messages[:3], None, messages[3]], max_per_connection=3)
+
+    assert results == [True, True, True, False, True]
+    assert log == ["open", "close", "open", "close"]
+
+
+def test_send_email_batch_reconnects_after_dropped_connection():
+    log = []
+    failures = {
+        "b@x.io": smtplib.SMTPServerDisconnected("Connection unexpectedly closed"),
+        "c@x.io": smtplib.SMTPRecipientsRefused({"c@x.io": (550, b"No such user")}),
+    }
+    with patch("core.emailing.get_connection", side_effect=lambda **kw: _FakeConnection(log, failures)):
+        results = send_email_batch(_messages("a@x.io", "b@x.io", "c@x.io", "d@x.io"))
+
+    assert results == [True, True, False, True]
+    assert log == ["open", "close", "open", "close"]
+
+
+@pytest.fixture
+def smtp_server():
+    """Local aiosmtpd server collecting messages; for SMTP integration runs and benchmarks."""
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+
+    class Collector:
+        def __init__(self):
+            self.messages = []
+            self.sessions = set()
+
+        async def handle_DATA(self, server, session, envelope):
+            self.sessions.add(id(session))
+            self.messages.append(envelope)
+            return "250 Message accepted for delivery"
+
+    handler = Collector()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=0)
+    controller.start()
+    try:
+        with override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=controller.server.sockets[0].getsockname()[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        ):
+            yield handler
+    finally:
+        controller.stop()
+
+
+def test_send_email_batch_over_smtp(smtp_server):
+    results = send_email_batch(_messages(*[f"user{i}@x.io" for i in range(5)]), max_per_connection=2)
+
+    assert results == [True] * 5
+    assert len(smtp_server.messages) == 5
+    assert len(smtp_server.sessions) == 3
+
+
+def test_benchmark_send_email_batch_over_smtp(smtp_server, benchmark):
+    messages = _messages(*[f"user{i}@x.io" for i in range(200)])
+
+    results = benchmark(send_email_batch, messages)
+
+    assert all(results)
@@ -55,3 +55,24 @@ def test_i18n_merge_base_precedence(tmp_path):
     assert ctx["app_name"] == "Scope"
     assert ctx["footer"] == "Extra"
     i18n._load_json_file.cache_clear()
+
+
+def test_i18n_catalog_prefills_fallbacks_per_language(tmp_path):
+    locales = tmp_path / "i18n" / "locales"
+    _write_json(locales / "en" / "email" / "profiles.due_today.json", {"subject": "Tasks", "push": {"title": "Plants"}})
+    _write_json(locales / "pl" / "email" / "profiles.due_today.json", {"subject": "Zadania"})
+
+    with override_settings(BASE_DIR=tmp_path, SUPPORTED_LANGS=["en", "pl"], EMAIL_DEFAULT_LANG="en"):
+        catalog = i18n.get_catalog()
+        assert catalog.entries[("pl", "profiles.due_today.subject")] == "Zadania"
+        assert catalog.entries[("pl", "profiles.due_today.push.title")] == "Plants"
+        assert i18n.t("profiles.due_today.push.title", lang="pl-PL") == "Plants"
+        assert i18n.t("profiles.due_today.subject", lang="xx") == "Tasks"
+        assert i18n.t("profiles.due_today", lang="pl", default="Fallback") == "Fallback"
+
+        assert i18n.supported_lang(" PL ") == "pl"
+        assert i18n.supported_lang("de") == "en"
+        assert i18n.supported_lang(None) == "en"
+        assert i18n.get_catalog() is catalog
+
+    assert i18n.get_catalog() is not catalog
@@ -0,0 +1,131 @@
+import smtplib
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+
+from core.emailing import send_email_batch
+from core.models import OutboundMessage
+from core.outbox import _claim_batch, drain_outbox, enqueue_templated_email, purge_outbox
+
+
+def _enqueue_qr(to_email="user@example.com"):
+    return enqueue_templated_email(
+        to_email=to_email,
+        template_name="plant_instances/qr_code",
+        context={"qr_code": "ABC123", "plant_name": "Monstera"},
+        lang="en",
+        inline_attachments=[
+            {"content_id": "plant_qr_code", "filename": "plant-qr.png", "content": b"\x89PNG-bytes", "mimetype": "image/png"},
+        ],
+        attachments=[
+            {"filename": "report.xlsx", "content": b"PK\x03\x04xlsx", "mimetype": "application/vnd.ms-excel"},
+        ],
+    )
+
+
+def _fail_with(exc):
+    def send(messages, on_error=None, **kwargs):
+        for idx in range(len(messages)):
+            on_error(idx, exc)
+        return [False] * len(messages)
+    return send
+
+
+@pytest.mark.django_db
+def test_enqueue_stores_message_and_drain_sends_it(mailoutbox, django_capture_on_commit_callbacks):
+    with patch("core.tasks.drain_outbound_messages.delay") as mock_delay:
+        with django_capture_on_commit_callbacks(execute=True):
+            row = _enqueue_qr()
+
+    mock_delay.assert_called_once_with()
+    assert mailoutbox == []
+    assert row.status == OutboundMessage.STATUS_PENDING
+    assert row.kind == "plant_instances/qr_code"
+    assert row.to == ["user@example.com"]
+
+    assert drain_outbox() == {"sent": 1, "retried": 0, "dead": 0}
+
+    assert len(mailoutbox) == 1
+    message = mailoutbox[0]
+    assert message.subject == row.subject
+    assert message.to == ["user@example.com"]
+    assert message.alternatives[0][0] == row.body_html
+    files = {part.get_filename(): part.get_payload(decode=True) for part in message.message().walk() if part.get_filename()}
+    assert files == {"plant-qr.png": b"\x89PNG-bytes", "report.xlsx": b"PK\x03\x04xlsx"}
+
+    row.refresh_from_db()
+    assert row.status == OutboundMessage.STATUS_SENT
+    assert row.attempts == 1
+    assert row.sent_at is not None
+    # Only the envelope is kept once sent.
+    assert row.subject and row.to == ["user@example.com"]
+    assert (row.body_text, row.body_html, row.inline_attachments, row.attachments) == ("", "", [], [])
+
+
+@pytest.mark.django_db
+def test_enqueue_without_recipient_stores_nothing():
+    assert enqueue_templated_email(to_email="", template_name="plant_instances/qr_code") is None
+    assert not OutboundMessage.objects.exists()
+
+
+@pytest.mark.django_db
+@override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BASE_SECONDS=60)
+def test_failed_sends_back_off_then_dead_letter():
+    row = _enqueue_qr()
+
+    with patch("core.outbox.send_email_batch", side_effect=_fail_with(smtplib.SMTPServerDisconnected("gone"))):
+        started = timezone.now()
+        assert drain_outbox() == {"sent": 0, "retried": 1, "dead": 0}
+
+        row.refresh_from_db()
+        assert row.status == OutboundMessage.STATUS_PENDING
+        assert row.attempts == 1
+        assert row.last_error == "SMTPServerDisconnected: gone"
+        assert row.next_attempt_at >= started + timedelta(seconds=60)
+
+        # Not due yet.
+        assert drain_outbox() == {"sent": 0, "retried": 0, "dead": 0}
+
+        OutboundMessage.objects.filter(id=row.id).update(next_attempt_at=timezone.now())
+        assert drain_outbox() == {"sent": 0, "retried": 0, "dead": 1}
+
+    row.refresh_from_db()
+    assert row.status == OutboundMessage.STATUS_DEAD
+    assert row.attempts == 2
+
+
+@pytest.mark.django_db
+@override_settings(OUTBOX_BATCH_SIZE=2)
+def test_drain_sends_in_batches_and_skips_claimed_rows(mailoutbox):
+    rows = [_enqueue_qr(f"user{idx}@example.com") for idx in range(5)]
+
+    # Another worker holds the first row.
+    assert [claimed.id for claimed in _claim_batch(1, timezone.now())] == [rows[0].id]
+
+    with patch("core.outbox.send_email_batch", wraps=send_email_batch) as mock_batch:
+        assert drain_outbox() == {"sent": 4, "retried": 0, "dead": 0}
+
+    assert [len(call.args[0]) for call in mock_batch.call_args_list] == [2, 2]
+    assert sorted(message.to[0] for message in mailoutbox) == [f"user{idx}@example.com" for idx in range(1, 5)]
+    assert OutboundMessage.objects.get(id=rows[0].id).status == OutboundMessage.STATUS_PENDING
+
+
+@pytest.mark.django_db
+@override_settings(OUTBOX_RETENTION_DAYS=30)
+def test_purge_deletes_old_sent_and_dead_messages_only():
+    old = timezone.now() - timedelta(days=31)
+    sent, dead, pending, recent = (_enqueue_qr() for _ in range(4))
+    OutboundMessage.objects.filter(id=sent.id).update(status=OutboundMessage.STATUS_SENT, created_at=old)
+    OutboundMessage.objects.filter(id=dead.id).update(status=OutboundMessage.STATUS_DEAD, created_at=old)
+    OutboundMessage.objects.filter(id=pending.id).update(created_at=old)
+    OutboundMessage.objects.filter(id=recent.id).update(status=OutboundMessage.STATUS_SENT)
+
+    assert purge_outbox() == 2
+    assert set(OutboundMessage.objects.values_list("id", flat=True)) == {pending.id, recent.id}
+
+    with override_settings(OUTBOX_RETENTION_DAYS=0):
+        OutboundMessage.objects.filter(id=recent.id).update(created_at=old)
+        assert purge_outbox() == 0
@@ -87,7 +87,7 @@ def test_get_plant_by_qr_returns_404_for_other_users_plant():
 
 @pytest.mark.django_db
 @override_settings(PUBLIC_WEB_BASE="https://api.example.com")
-@patch("plant_instances.views.send_templated_email")
+@patch("plant_instances.views.enqueue_templated_email")
 def test_send_qr_email_sends_message_with_inline_qr(mock_send):
     user = User.objects.create_user(
         email="test@example.com",
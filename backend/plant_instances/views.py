@@ -11,7 +11,7 @@ from rest_framework import status
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.views import APIView
 
-from core.emailing import send_templated_email
+from core.outbox import enqueue_templated_email
 
 from .models import PlantInstance
 from .serializers import (
@@ -186,7 +186,7 @@ class PlantInstanceSendQREmailView(APIView):
             "plant_name": plant.display_name or getattr(plant.plant_definition, "name", "") or "",
         }
 
-        send_templated_email(
+        enqueue_templated_email(
             to_email=to_email,
             template_name="plant_instances/qr_code",
             subject_key=None,
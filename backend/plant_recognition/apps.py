@@ -0,0 +1,26 @@
+import logging
+
+from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PlantRecognitionConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'plant_recognition'
+
+    def ready(self):
+        # Only processes that serve scans should opt in; everything else starts
+        # without importing torch.
+        if not getattr(settings, "PLANT_RECOGNITION_WARMUP", False):
+            return
+
+        from .inference import warmup
+
+        try:
+            loaded = warmup()
+        except Exception:
+            logger.exception("Plant model warmup failed; it will load on the first scan.")
+            return
+        logger.info("Plant model %s warmed up (load %.2fs)", loaded.name, loaded.load_seconds)
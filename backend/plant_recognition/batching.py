@@ -0,0 +1,307 @@
+"""
+Batched plant-scan inference server.
+
+    python manage.py plant_inference_server --port 8765
+
+A separate process that owns the model and serves POST /predict?topk=K (body: the
+raw image bytes) on a local port; set PLANT_INFERENCE_URL and the scan view sends
+its images here instead of running the model in the Django worker.
+
+Request threads decode and preprocess their image, then hand the tensor to one
+MicroBatcher thread. That thread collects requests until it has max_batch of
+them or the first one has waited max_wait, runs a single batched forward pass and
+hands each request its own result. Concurrent scans share forward passes instead
+of fighting over CPU threads, and torch's intra-op threads are capped by the
+command. The queue is bounded: when it is full the server answers 503 at once
+rather than letting latency grow without limit.
+
+Repeat scans are answered from the scan cache (scan_cache.py) without queueing.
+
+GET /health returns the batcher's counters, the average decode / resize /
+normalize / forward time per image and the scan cache hit rate.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, UnidentifiedImageError
+
+from .preprocessing import ImageTooLarge
+
+logger = logging.getLogger(__name__)
+
+# Larger uploads are refused before they are read.
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+
+class InferenceBusy(Exception):
+    """The inference queue is full; the scan should be retried later."""
+
+
+class MicroBatcher:
+    """
+    Runs run_batch(items) -> results on one thread, over requests submitted from
+    any number of threads, max_batch items at a time.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list], list],
+        *,
+        max_batch: int = 8,
+        max_wait: float = 0.01,
+        max_queue: int = 32,
+    ):
+        self.run_batch = run_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.largest_batch = 0
+
+    def start(self) -> "MicroBatcher":
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._loop, name="plant-batcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        # Whatever is still queued won't run; don't leave its callers waiting.
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(InferenceBusy("Inference server is shutting down."))
+
+    def submit(self, item: Any, timeout: float | None = None) -> Any:
+        """Queue one item and wait for its result; raises InferenceBusy when the queue is full."""
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            raise InferenceBusy("Inference queue is full.") from None
+        return future.result(timeout)
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "rejected": self.rejected,
+                "largest_batch": self.largest_batch,
+                "queued": self._queue.qsize(),
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._run(self._collect(first))
+
+    def _run(self, batch: list) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = self.run_batch(items)
+        except Exception as exc:
+            logger.exception("Inference batch of %s failed", len(items))
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(items)
+            self.largest_batch = max(self.largest_batch, len(items))
+
+
+def _run_model_batch(items: list) -> list:
+    """items: (input tensor, topk) pairs."""
+    import torch
+
+    from .inference import predict_tensors
+
+    batch = torch.stack([tensor for tensor, _ in items])
+    return predict_tensors(batch, [topk for _, topk in items])
+
+
+class _InferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: dict, headers: dict | None = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            self._reply(404, {"detail": "Not found."})
+            return
+        from . import scan_cache
+        from .inference import stage_timings
+
+        self._reply(
+            200,
+            {
+                "status": "ok",
+                **self.server.inference.batcher.stats(),
+                "stages": stage_timings.snapshot(),
+                "scan_cache": scan_cache.stats(),
+            },
+        )
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/predict":
+            self._reply(404, {"detail": "Not found."})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_UPLOAD_BYTES:
+            self.close_connection = True
+            self._reply(413, {"detail": "Image is too large."})
+            return
+        data = self.rfile.read(length)
+
+        try:
+            topk = int(parse_qs(url.query).get("topk", ["3"])[0])
+        except ValueError:
+            topk = 3
+
+        from . import scan_cache
+        from .inference import normalize, prepare
+
+        try:
+            crop = prepare(Image.open(BytesIO(data)))
+        except (ImageTooLarge, Image.DecompressionBombError) as e:
+            self._reply(413, {"detail": str(e)})
+            return
+        except (UnidentifiedImageError, OSError, ValueError):
+            self._reply(400, {"detail": "Uploaded file is not a valid image."})
+            return
+
+        key, predictions = scan_cache.lookup(crop, topk)
+        if predictions is not None:
+            self._reply(200, {"predictions": predictions})
+            return
+
+        server = self.server.inference
+        try:
+            predictions = server.batcher.submit((normalize(crop), topk), timeout=server.request_timeout)
+        except InferenceBusy:
+            self._reply(503, {"detail": "Inference server is busy."}, headers={"Retry-After": "1"})
+            return
+        except Exception as e:
+            logger.exception("Batched plant recognition failed")
+            self._reply(500, {"detail": f"Inference failed: {e}"})
+            return
+
+        scan_cache.store(key, predictions)
+        self._reply(200, {"predictions": predictions})
+
+
+class _InferenceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class InferenceServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        *,
+        max_batch: int = 8,
+        max_wait: float = 0.01,
+        max_queue: int = 32,
+        request_timeout: float = 30.0,
+        run_batch: Callable[[list], list] = _run_model_batch,
+    ):
+        self.request_timeout = request_timeout
+        self.batcher = MicroBatcher(run_batch, max_batch=max_batch, max_wait=max_wait, max_queue=max_queue)
+
+        self._server = _InferenceHTTPServer((host, port), _InferenceHandler)
+        self._server.inference = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "InferenceServer":
+        self.batcher.start()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="plant-inference", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.batcher.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self.batcher.stop()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self.batcher.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
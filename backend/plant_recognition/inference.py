@@ -1,46 +1,117 @@
+"""
+Plant recognition inference.
+
+Nothing heavy happens at import: torch/torchvision are imported, and the model and
+class names loaded, the first time a model is needed (`registry.get()`), so web
+workers, Celery, beat and management commands that never scan a plant don't pay
+for them. Set PLANT_RECOGNITION_WARMUP to load and warm the model at startup
+instead (see apps.py); `manage.py plant_model_startup` reports what each step costs.
+
+PLANT_MODEL_BACKEND picks which artifact of PLANT_MODEL runs the forward pass:
+
+    eager         {name}_best.pth         torchvision ResNet18 + state_dict
+    torchscript   {name}_scripted.pt      traced and frozen
+    int8_static   {name}_int8_static.pt   post-training static int8 (calibrated)
+    int8_dynamic  {name}_int8_dynamic.pt  dynamic int8 on the classifier head
+    onnx          {name}.onnx             onnxruntime (optional dependency)
+    auto          the first of int8_static, onnx, torchscript, int8_dynamic, eager
+                  whose artifact is present (the default)
+
+ml/export_model.py writes the non-eager artifacts next to the weights and
+ml/benchmark_backends.py compares their accuracy and latency on the val split.
+
+Images are turned into model input by preprocessing.py; `stage_timings` keeps
+the cumulative decode / resize / normalize / forward cost of every scan.
+"""
 from __future__ import annotations
 
 import json
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import torch
-from torch import nn
-from torchvision.models import resnet18
-from torchvision import transforms
 from PIL import Image
 
+from . import preprocessing
+
+if TYPE_CHECKING:
+    from torch import nn
+
+logger = logging.getLogger(__name__)
+
 # --- Paths & device ---------------------------------------------------------
 
 BASE_DIR = Path(__file__).resolve().parent
 ARTIFACTS_DIR = BASE_DIR / "artifacts"
 
 MODEL_NAME = os.environ.get("PLANT_MODEL", "web_scrapped_resnet18_v1")
+MODEL_BACKEND = os.environ.get("PLANT_MODEL_BACKEND", "auto")
 
 WEIGHTS_PATH = ARTIFACTS_DIR / f"{MODEL_NAME}_best.pth"
 CLASSES_PATH = ARTIFACTS_DIR / f"{MODEL_NAME}_classes.json"
 
-DEVICE = torch.device("cpu")  # VPS will run CPU inference
+DEVICE_NAME = "cpu"  # VPS will run CPU inference
 
-# --- Transforms (same as validation during training) ------------------------
 
-_val_transform = transforms.Compose(
-    [
-        transforms.Resize(256),
-        transforms.CenterCrop(224),
-        transforms.ToTensor(),
-        transforms.Normalize(
-            mean=[0.485, 0.456, 0.406],
-            std=[0.229, 0.224, 0.225],
-        ),
-    ]
-)
+def weights_path(model_name: str) -> Path:
+    return ARTIFACTS_DIR / f"{model_name}_best.pth"
+
+
+def classes_path(model_name: str) -> Path:
+    return ARTIFACTS_DIR / f"{model_name}_classes.json"
+
+
+# Artifact file per backend: ARTIFACTS_DIR / f"{model_name}{suffix}".
+BACKEND_SUFFIXES = {
+    "eager": "_best.pth",
+    "torchscript": "_scripted.pt",
+    "int8_static": "_int8_static.pt",
+    "int8_dynamic": "_int8_dynamic.pt",
+    "onnx": ".onnx",
+}
+# What "auto" tries, fastest first (see ml/benchmark_backends.py).
+AUTO_BACKENDS = ("int8_static", "onnx", "torchscript", "int8_dynamic", "eager")
+
+
+def artifact_path(model_name: str, backend: str) -> Path:
+    if backend not in BACKEND_SUFFIXES:
+        raise ValueError(
+            f"Unknown plant model backend {backend!r}; "
+            f"expected one of {', '.join(BACKEND_SUFFIXES)} or auto."
+        )
+    return ARTIFACTS_DIR / f"{model_name}{BACKEND_SUFFIXES[backend]}"
+
+
+def _onnxruntime_available() -> bool:
+    import importlib.util
+
+    return importlib.util.find_spec("onnxruntime") is not None
+
+
+def resolve_backend(model_name: str, backend: Optional[str] = None) -> str:
+    """The concrete backend for PLANT_MODEL_BACKEND (or `backend`), resolving "auto"."""
+    backend = backend or MODEL_BACKEND
+    if backend != "auto":
+        artifact_path(model_name, backend)  # validates the name
+        return backend
+
+    for candidate in AUTO_BACKENDS:
+        if candidate == "onnx" and not _onnxruntime_available():
+            continue
+        if artifact_path(model_name, candidate).exists():
+            return candidate
+    return "eager"
+
 
 # --- Load class names ------------------------------------------------------
 
 
-def _load_class_names() -> list[str]:
+def _load_class_names(path: Path = CLASSES_PATH) -> list[str]:
     """
     Load the mapping index -> class label from classes.json.
 
@@ -48,10 +119,10 @@ def _load_class_names() -> list[str]:
     - a list: ["Foo", "Bar", ...]
     - a dict: {"0": "Foo", "1": "Bar", ...}
     """
-    if not CLASSES_PATH.exists():
-        raise FileNotFoundError(f"Classes file not found at {CLASSES_PATH}")
+    if not path.exists():
+        raise FileNotFoundError(f"Classes file not found at {path}")
 
-    with CLASSES_PATH.open("r", encoding="utf-8") as f:
+    with path.open("r", encoding="utf-8") as f:
         data = json.load(f)
 
     if isinstance(data, list):
@@ -61,33 +132,36 @@ def _load_class_names() -> list[str]:
     raise ValueError("Unsupported classes.json format")
 
 
-CLASS_NAMES: list[str] = _load_class_names()
-
 # --- Build and load model --------------------------------------------------
 
 
-def _build_model(num_classes: int) -> nn.Module:
+def _build_model(num_classes: int) -> "nn.Module":
     """
     Build the same ResNet18 head as in training, but without ImageNet weights.
     We only load our trained weights from state_dict.
     """
+    from torch import nn
+    from torchvision.models import resnet18
+
     model = resnet18(weights=None)
     model.fc = nn.Linear(model.fc.in_features, num_classes)
     return model
 
 
-def _load_model() -> nn.Module:
-    if not WEIGHTS_PATH.exists():
+def _load_model(model_name: str, num_classes: int, device) -> "nn.Module":
+    import torch
+
+    path = weights_path(model_name)
+    if not path.exists():
         raise FileNotFoundError(
-            f"Model weights not found at {WEIGHTS_PATH}. "
+            f"Model weights not found at {path}. "
             f"Set PLANT_MODEL env var or place the file in artifacts/."
         )
 
-    num_classes = len(CLASS_NAMES)
     model = _build_model(num_classes)
 
     try:
-        state = torch.load(WEIGHTS_PATH, map_location=DEVICE)
+        state = torch.load(path, map_location=device)
 
         if isinstance(state, dict) and "model_state" in state:
             state_dict = state["model_state"]
@@ -98,19 +172,272 @@ def _load_model() -> nn.Module:
 
     except Exception as e:
         raise RuntimeError(
-            f"Failed to load model weights from {WEIGHTS_PATH}. Error: {e}"
+            f"Failed to load model weights from {path}. Error: {e}"
         ) from e
 
-    model.to(DEVICE)
+    model.to(device)
     model.eval()
     return model
 
 
-MODEL: nn.Module = _load_model()
+class _OnnxModel:
+    """An onnxruntime session that takes and returns torch tensors, like the other backends."""
+
+    def __init__(self, path: Path):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError(
+                "PLANT_MODEL_BACKEND=onnx needs onnxruntime; pip install onnxruntime."
+            ) from e
+        import torch
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        import torch
+
+        (logits,) = self.session.run(None, {self.input_name: batch.detach().cpu().numpy()})
+        return torch.from_numpy(logits)
+
+
+def _load_backend(model_name: str, backend: str, num_classes: int, device):
+    """The forward-pass callable for one backend's artifact."""
+    import torch
+
+    if backend == "eager":
+        return _load_model(model_name, num_classes, device)
+
+    path = artifact_path(model_name, backend)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No {backend} artifact at {path}. "
+            f"Run ml/export_model.py or set PLANT_MODEL_BACKEND=eager."
+        )
+    if backend == "onnx":
+        return _OnnxModel(path)
+
+    try:
+        model = torch.jit.load(str(path), map_location=device)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load {backend} model from {path}. Error: {e}") from e
+    model.eval()
+    return model
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    name: str
+    model: Any  # callable: Nx3x224x224 tensor -> logits tensor
+    class_names: list
+    device: Any  # torch.device
+    load_seconds: float
+    backend: str = "eager"
+    # Identifies the loaded artifact file (its mtime), so caches keyed on it
+    # (scan_cache.py) don't outlive a re-export.
+    artifact_version: str = ""
+
+
+class ModelRegistry:
+    """
+    Process-wide models, loaded on first use and kept for the life of the process.
+    Concurrent first requests for a model wait for a single load.
+
+    Models are keyed by (name, backend); the backend defaults to PLANT_MODEL_BACKEND.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: dict[tuple[str, Optional[str]], LoadedModel] = {}
+
+    def get(self, model_name: Optional[str] = None, backend: Optional[str] = None) -> LoadedModel:
+        key = (model_name or MODEL_NAME, backend)
+        loaded = self._models.get(key)
+        if loaded is not None:
+            return loaded
+
+        with self._lock:
+            loaded = self._models.get(key)
+            if loaded is None:
+                loaded = self._load(*key)
+                self._models[key] = loaded
+        return loaded
+
+    def is_loaded(self, model_name: Optional[str] = None, backend: Optional[str] = None) -> bool:
+        return (model_name or MODEL_NAME, backend) in self._models
+
+    def warmup(self, model_name: Optional[str] = None, backend: Optional[str] = None) -> LoadedModel:
+        """Load the model and run one dummy forward pass, so the first scan is fast too."""
+        import torch
+
+        loaded = self.get(model_name, backend)
+        with torch.no_grad():
+            loaded.model(torch.zeros(1, 3, 224, 224, device=loaded.device))
+        return loaded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    @staticmethod
+    def _load(model_name: str, backend: Optional[str] = None) -> LoadedModel:
+        started = time.perf_counter()
+        import torch
+
+        backend = resolve_backend(model_name, backend)
+        device = torch.device(DEVICE_NAME)
+        class_names = _load_class_names(classes_path(model_name))
+        model = _load_backend(model_name, backend, len(class_names), device)
+        artifact = artifact_path(model_name, backend)
+        loaded = LoadedModel(
+            name=model_name,
+            model=model,
+            class_names=class_names,
+            device=device,
+            load_seconds=time.perf_counter() - started,
+            backend=backend,
+            artifact_version=f"{artifact.stat().st_mtime_ns:x}" if artifact.exists() else "",
+        )
+        logger.info(
+            "Loaded plant model %s backend=%s classes=%s in %.2fs",
+            model_name, backend, len(class_names), loaded.load_seconds,
+        )
+        return loaded
+
+
+registry = ModelRegistry()
+
+
+class StageTimings:
+    """Cumulative time spent in each scan stage, per image, across threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: dict[str, tuple[float, int]] = {}
+
+    @contextmanager
+    def measure(self, stage: str, count: int = 1):
+        started = time.perf_counter()
+        yield
+        self.add(stage, time.perf_counter() - started, count)
+
+    def add(self, stage: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            total, n = self._totals.get(stage, (0.0, 0))
+            self._totals[stage] = (total + seconds, n + count)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {"count": n, "total_ms": total * 1000, "avg_ms": total * 1000 / n}
+                for stage, (total, n) in self._totals.items()
+                if n
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+stage_timings = StageTimings()
+
+
+def warmup(model_name: Optional[str] = None) -> LoadedModel:
+    return registry.warmup(model_name)
+
+
+def __getattr__(name: str):
+    # The old import-time globals, now loaded on first access.
+    if name == "MODEL":
+        return registry.get().model
+    if name == "CLASS_NAMES":
+        return registry.get().class_names
+    if name == "DEVICE":
+        import torch
+
+        return torch.device(DEVICE_NAME)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # --- Public prediction API -------------------------------------------------
 
 
+def prepare(image: Image.Image) -> Image.Image:
+    """
+    The upright 224x224 RGB crop the model sees, for one freshly opened PIL image.
+    Raises preprocessing.ImageTooLarge for oversized images.
+    """
+    with stage_timings.measure("decode"):
+        image = preprocessing.decode(image)
+    with stage_timings.measure("resize"):
+        return preprocessing.resize_crop(image)
+
+
+def normalize(crop: Image.Image, out=None):
+    """The model input tensor (3x224x224) for a prepare()d crop, written into `out` when given."""
+    with stage_timings.measure("normalize"):
+        return preprocessing.to_tensor(crop, out=out)
+
+
+def preprocess(image: Image.Image, out=None):
+    """prepare() + normalize(): the model input tensor for one freshly opened PIL image."""
+    return normalize(prepare(image), out=out)
+
+
+def _clamp_topk(topk) -> int:
+    return max(1, min(int(topk), 10))
+
+
+def predict_tensors(batch, topks: List[int], model_name: Optional[str] = None) -> List[List[Dict]]:
+    """
+    One forward pass over a stacked Nx3x224x224 batch; topks holds each row's K.
+    Returns one prediction list per row, formatted like predict_topk().
+    """
+    import torch
+
+    loaded = registry.get(model_name)
+    ks = [_clamp_topk(k) for k in topks]
+
+    with torch.no_grad(), stage_timings.measure("forward", count=len(ks)):
+        logits = loaded.model(batch.to(loaded.device))
+        probs = torch.softmax(logits, dim=1)
+        top_probs, top_idxs = probs.topk(max(ks), dim=1)
+
+    results: List[List[Dict]] = []
+    for row_probs, row_idxs, k in zip(top_probs.tolist(), top_idxs.tolist(), ks):
+        rows: List[Dict] = []
+        for rank, (p, idx) in enumerate(zip(row_probs[:k], row_idxs[:k]), start=1):
+            name = loaded.class_names[idx]
+            rows.append(
+                {
+                    "id": f"ml-{idx}",
+                    "name": name,
+                    "latin": name,
+                    "score": float(p),
+                    "rank": rank,
+                }
+            )
+        results.append(rows)
+    return results
+
+
+def predict_topk_batch(images: List[Image.Image], topk: int = 3) -> List[List[Dict]]:
+    """predict_topk() for several images in one batched forward pass."""
+    import torch
+
+    if not images:
+        return []
+    size = preprocessing.CROP_SIZE
+    batch = torch.empty(len(images), 3, size, size)
+    for row, image in zip(batch, images):
+        preprocess(image, out=row)
+    return predict_tensors(batch, [topk] * len(images))
+
+
 def predict_topk(
     image: Image.Image,
     topk: int = 3,
@@ -130,25 +457,4 @@ def predict_topk(
       ...
     ]
     """
-    image = image.convert("RGB")
-    x = _val_transform(image).unsqueeze(0).to(DEVICE)
-
-    with torch.no_grad():
-        logits = MODEL(x)
-        probs = torch.softmax(logits, dim=1)[0]
-        k = max(1, min(int(topk), 10))
-        top_probs, top_idxs = probs.topk(k)
-
-    results: List[Dict] = []
-    for rank, (p, idx) in enumerate(zip(top_probs.tolist(), top_idxs.tolist()), start=1):
-        name = CLASS_NAMES[idx]
-        results.append(
-            {
-                "id": f"ml-{idx}",
-                "name": name,
-                "latin": name,
-                "score": float(p),
-                "rank": rank,
-            }
-        )
-    return results
+    return predict_topk_batch([image], topk=topk)[0]
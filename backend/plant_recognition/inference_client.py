@@ -0,0 +1,70 @@
+"""
+Client for the batched inference server (plant_recognition/batching.py).
+
+predict_remote() posts the raw upload to settings.PLANT_INFERENCE_URL and returns
+predictions in predict_topk()'s format. One pooled httpx.Client per process keeps
+connections to the server open between scans.
+"""
+from __future__ import annotations
+
+import os
+import threading
+
+import httpx
+from django.conf import settings
+
+from .batching import InferenceBusy
+from .preprocessing import ImageTooLarge
+
+
+class InferenceUnavailable(Exception):
+    """The inference server could not be reached or failed; run the scan in-process."""
+
+
+class InvalidImage(ValueError):
+    """The inference server could not decode the upload."""
+
+
+_client: httpx.Client | None = None
+_client_pid: int | None = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> httpx.Client:
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = httpx.Client(timeout=float(getattr(settings, "PLANT_INFERENCE_TIMEOUT", 10.0)))
+            _client_pid = os.getpid()
+        return _client
+
+
+def predict_remote(data: bytes, topk: int = 3, *, url: str | None = None) -> list[dict]:
+    """
+    Raises InferenceBusy when the server sheds load, InvalidImage for an image it
+    can't decode, ImageTooLarge for one over its pixel limit and InferenceUnavailable
+    for anything else.
+    """
+    base = (url or getattr(settings, "PLANT_INFERENCE_URL", "") or "").rstrip("/")
+    if not base:
+        raise InferenceUnavailable("PLANT_INFERENCE_URL is not set.")
+
+    try:
+        resp = _get_client().post(
+            f"{base}/predict",
+            params={"topk": topk},
+            content=data,
+            headers={"Content-Type": "application/octet-stream"},
+        )
+    except httpx.HTTPError as exc:
+        raise InferenceUnavailable(str(exc) or type(exc).__name__) from exc
+
+    if resp.status_code == 503:
+        raise InferenceBusy(resp.json().get("detail") or "Inference server is busy.")
+    if resp.status_code == 413:
+        raise ImageTooLarge(resp.json().get("detail") or "Image is too large.")
+    if resp.status_code == 400:
+        raise InvalidImage(resp.json().get("detail") or "Uploaded file is not a valid image.")
+    if resp.status_code != 200:
+        raise InferenceUnavailable(f"Inference server answered {resp.status_code}.")
+    return resp.json()["predictions"]
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from plant_recognition.batching import InferenceServer
+from plant_recognition.inference import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the batched plant-scan inference server: one model, dynamic micro-batching "
+        "of concurrent scans, bounded torch threads and a bounded queue (503 when full). "
+        "Point PLANT_INFERENCE_URL at it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default 127.0.0.1).")
+        parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default 8765).")
+        parser.add_argument(
+            "--max-batch",
+            type=int,
+            default=None,
+            help="Images per forward pass (default PLANT_INFERENCE_MAX_BATCH).",
+        )
+        parser.add_argument(
+            "--max-wait-ms",
+            type=float,
+            default=None,
+            help="How long the first image waits for a batch to fill (default PLANT_INFERENCE_MAX_WAIT_MS).",
+        )
+        parser.add_argument(
+            "--max-queue",
+            type=int,
+            default=None,
+            help="Queued images before new scans get 503 (default PLANT_INFERENCE_MAX_QUEUE).",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=None,
+            help="torch intra-op threads (default PLANT_INFERENCE_TORCH_THREADS).",
+        )
+
+    def handle(self, *args, **options):
+        max_batch = options["max_batch"] or settings.PLANT_INFERENCE_MAX_BATCH
+        max_wait_ms = options["max_wait_ms"]
+        if max_wait_ms is None:
+            max_wait_ms = settings.PLANT_INFERENCE_MAX_WAIT_MS
+        max_queue = options["max_queue"] or settings.PLANT_INFERENCE_MAX_QUEUE
+        threads = options["threads"] or settings.PLANT_INFERENCE_TORCH_THREADS
+        if min(max_batch, max_queue, threads) < 1 or max_wait_ms < 0:
+            raise CommandError("--max-batch, --max-queue and --threads must be positive, --max-wait-ms not negative.")
+
+        import torch
+
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # only settable before torch's first parallel work
+
+        try:
+            loaded = warmup()
+        except (FileNotFoundError, RuntimeError, ValueError) as e:
+            raise CommandError(str(e)) from e
+
+        server = InferenceServer(
+            host=options["host"],
+            port=options["port"],
+            max_batch=max_batch,
+            max_wait=max_wait_ms / 1000,
+            max_queue=max_queue,
+            request_timeout=float(settings.PLANT_INFERENCE_TIMEOUT),
+        )
+        self.stdout.write(
+            f"Plant inference server for {loaded.name} on {server.url} "
+            f"(batch {max_batch}, wait {max_wait_ms:g} ms, queue {max_queue}, threads {threads})"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import importlib
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from plant_recognition.inference import (
+    BACKEND_SUFFIXES,
+    MODEL_BACKEND,
+    MODEL_NAME,
+    preprocess,
+    registry,
+    stage_timings,
+)
+
+
+def _rss_mb() -> float | None:
+    """Current resident set size, from /proc on Linux."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Report what the plant recognition model costs at startup: whether Django setup "
+        "already imported torch, then the torch/torchvision import, model load and "
+        "warmup forward-pass times and the process RSS after each step. With --image, "
+        "also the decode / resize / normalize / forward cost of scanning that photo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default=None, help=f"Model name (default PLANT_MODEL, {MODEL_NAME}).")
+        parser.add_argument(
+            "--backend",
+            default=None,
+            choices=[*BACKEND_SUFFIXES, "auto"],
+            help=f"Model backend (default PLANT_MODEL_BACKEND, {MODEL_BACKEND}).",
+        )
+        parser.add_argument("--skip-warmup", action="store_true", help="Load the model but skip the dummy forward pass.")
+        parser.add_argument("--image", default=None, help="A photo to scan once, timing each preprocessing stage.")
+
+    def _step(self, label: str, seconds: float | None = None):
+        rss = _rss_mb()
+        parts = [f"{label:<24}"]
+        if seconds is not None:
+            parts.append(f"{seconds * 1000:9.1f} ms")
+        if rss is not None:
+            parts.append(f"rss {rss:7.1f} MB")
+        self.stdout.write("  ".join(parts))
+
+    def handle(self, *args, **options):
+        model_name = options["model"] or MODEL_NAME
+        backend = options["backend"]
+
+        preloaded = [name for name in ("torch", "torchvision") if name in sys.modules]
+        self.stdout.write(f"Model: {model_name}")
+        self.stdout.write(
+            f"Imported during Django setup: {', '.join(preloaded)}" if preloaded
+            else "Imported during Django setup: nothing (torch is lazy)"
+        )
+        self._step("django setup")
+
+        for module in ("torch", "torchvision"):
+            started = time.perf_counter()
+            importlib.import_module(module)
+            self._step(f"import {module}", time.perf_counter() - started)
+
+        if registry.is_loaded(model_name, backend):
+            self.stdout.write("Model was already loaded in this process.")
+
+        try:
+            loaded = registry.get(model_name, backend)
+        except (FileNotFoundError, RuntimeError, ValueError) as e:
+            raise CommandError(str(e)) from e
+        self.stdout.write(f"Backend: {loaded.backend}")
+        self._step(f"load model ({len(loaded.class_names)} cls)", loaded.load_seconds)
+
+        if not options["skip_warmup"]:
+            started = time.perf_counter()
+            registry.warmup(model_name, backend)
+            self._step("warmup forward", time.perf_counter() - started)
+
+        if options["image"]:
+            self._scan(options["image"], loaded)
+
+    def _scan(self, path: str, loaded):
+        import torch
+        from PIL import Image, UnidentifiedImageError
+
+        try:
+            image = Image.open(path)
+        except (OSError, UnidentifiedImageError) as e:
+            raise CommandError(f"Cannot open {path}: {e}") from e
+        self.stdout.write(f"Scan: {path} ({image.format} {image.width}x{image.height})")
+
+        stage_timings.reset()
+        try:
+            tensor = preprocess(image)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e)) from e
+        with torch.no_grad(), stage_timings.measure("forward"):
+            loaded.model(tensor.unsqueeze(0).to(loaded.device))
+
+        for stage, timing in stage_timings.snapshot().items():
+            self._step(f"  {stage}", timing["total_ms"] / 1000)
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from plant_recognition import scan_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the plant scan result cache's hits, misses and hit rate across all workers "
+        "(see plant_recognition/scan_cache.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        ttl = int(getattr(settings, "PLANT_SCAN_CACHE_TTL", 3600))
+        stats = scan_cache.stats()
+
+        self.stdout.write(f"Scan cache: {'off' if ttl <= 0 else f'ttl {ttl}s'}")
+        self.stdout.write(
+            f"hits {stats['hits']}  misses {stats['misses']}  hit rate {stats['hit_rate'] * 100:.1f}%"
+        )
+
+        if options["reset"]:
+            scan_cache.reset_stats()
+            self.stdout.write("Counters reset.")
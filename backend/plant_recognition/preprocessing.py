@@ -0,0 +1,102 @@
+"""
+Scan preprocessing: uploaded image -> normalized 3x224x224 model input.
+
+Equivalent to the training val transform (Resize(256), CenterCrop(224),
+ToTensor, Normalize) but cheap on full-resolution phone photos:
+
+- the pixel count is read from the header and checked before anything is
+  decoded, so a decompression bomb is refused instead of allocated;
+- JPEGs are decoded in draft mode: libjpeg scales by 1/2, 1/4 or 1/8 while
+  decoding, to the smallest size still >= 256 px on the short side, so a 12 MP
+  photo decodes as ~0.75 MP;
+- the EXIF orientation is applied, so portrait photos reach the model upright;
+- ToTensor + Normalize are a single addcmul from the uint8 pixels into a
+  preallocated float tensor.
+
+torch is imported on first use only (see inference.py).
+"""
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+
+from PIL import Image, ImageOps
+
+RESIZE_SIZE = 256
+CROP_SIZE = 224
+
+# Refused before decoding; PIL's own DecompressionBombError only starts at ~179 MP.
+MAX_IMAGE_PIXELS = 64_000_000
+
+# Same as validation during training.
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+class ImageTooLarge(ValueError):
+    """The image has more pixels than MAX_IMAGE_PIXELS."""
+
+
+def check_size(image: Image.Image) -> None:
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageTooLarge(
+            f"Image is {width}x{height} px; at most {MAX_IMAGE_PIXELS // 1_000_000} MP is accepted."
+        )
+
+
+def decode(image: Image.Image) -> Image.Image:
+    """
+    Decode a freshly opened image as upright RGB, at reduced resolution where the
+    format allows it. The short side stays >= RESIZE_SIZE.
+    """
+    check_size(image)
+
+    width, height = image.size
+    short = min(width, height)
+    if image.format == "JPEG" and short >= 2 * RESIZE_SIZE:
+        scale = RESIZE_SIZE / short
+        image.draft("RGB", (math.ceil(width * scale), math.ceil(height * scale)))
+
+    ImageOps.exif_transpose(image, in_place=True)
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def resize_crop(image: Image.Image) -> Image.Image:
+    """Resize(256) + CenterCrop(224), with torchvision's rounding."""
+    width, height = image.size
+    if width <= height:
+        size = (RESIZE_SIZE, int(RESIZE_SIZE * height / width))
+    else:
+        size = (int(RESIZE_SIZE * width / height), RESIZE_SIZE)
+    image = image.resize(size, Image.BILINEAR)
+
+    left = int(round((size[0] - CROP_SIZE) / 2.0))
+    top = int(round((size[1] - CROP_SIZE) / 2.0))
+    return image.crop((left, top, left + CROP_SIZE, top + CROP_SIZE))
+
+
+@lru_cache(maxsize=1)
+def _normalize_constants():
+    import torch
+
+    std = torch.tensor(IMAGENET_STD).view(3, 1, 1)
+    mean = torch.tensor(IMAGENET_MEAN).view(3, 1, 1)
+    # (x / 255 - mean) / std == x * scale + shift
+    return 1.0 / (255.0 * std), -mean / std
+
+
+def to_tensor(image: Image.Image, out=None):
+    """
+    The normalized 3xHxW float tensor for an RGB image, written into `out`
+    (e.g. one row of a preallocated batch) when given.
+    """
+    import torch
+
+    width, height = image.size
+    if out is None:
+        out = torch.empty(3, height, width)
+    pixels = torch.frombuffer(bytearray(image.tobytes()), dtype=torch.uint8)
+    pixels = pixels.view(height, width, 3).permute(2, 0, 1)
+    scale, shift = _normalize_constants()
+    return torch.addcmul(shift, pixels, scale, out=out)
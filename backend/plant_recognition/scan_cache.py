@@ -0,0 +1,115 @@
+"""
+Result cache for plant scans, keyed by a perceptual hash of the image.
+
+Users re-scan the same plant several times in a row and QA scans the same seed
+photos over and over. A scan's predictions are cached (Django cache, Redis in
+production) under a hash of the 224x224 crop the model would see, plus the loaded
+model, backend, artifact version and top-K, so a repeat, or a re-encoded or
+slightly resized copy, skips the forward pass, and a re-exported model starts
+with fresh entries.
+
+The hash is a 64-bit dHash (brightness gradients of a 9x8 grayscale thumbnail)
+followed by the 2x2 average colour at 3 bits per channel; dHash alone can't tell
+a green leaf from a red one of the same shape.
+
+Entries live PLANT_SCAN_CACHE_TTL seconds (0 disables the cache); the cache
+backend's own eviction bounds their number. Hits and misses are counted in the
+cache too, so stats() covers every worker.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image
+
+from .inference import (
+    _clamp_topk,
+    normalize,
+    predict_tensors,
+    prepare,
+    registry,
+)
+
+KEY_PREFIX = "plant_recognition:scan:"
+STATS_PREFIX = "plant_recognition:scan_stats:"
+
+HASH_SIZE = 8
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "PLANT_SCAN_CACHE_TTL", 3600))
+
+
+def image_hash(crop: Image.Image) -> str:
+    """dHash + coarse colour of a prepare()d crop."""
+    width = HASH_SIZE + 1
+    pixels = crop.convert("L").resize((width, HASH_SIZE), Image.BOX).tobytes()
+    bits = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left, right = pixels[row * width + col], pixels[row * width + col + 1]
+            bits = (bits << 1) | (left > right)
+
+    colour = crop.convert("RGB").resize((2, 2), Image.BOX).tobytes()
+    return f"{bits:016x}-" + "".join(str(value >> 5) for value in colour)
+
+
+def cache_key(crop: Image.Image, topk: int) -> str:
+    # The model that actually serves the scan, not PLANT_MODEL_BACKEND (usually "auto").
+    loaded = registry.get()
+    return (
+        f"{KEY_PREFIX}{loaded.name}:{loaded.backend}:{loaded.artifact_version}:"
+        f"{_clamp_topk(topk)}:{image_hash(crop)}"
+    )
+
+
+def _count(name: str) -> None:
+    key = f"{STATS_PREFIX}{name}"
+    if cache.add(key, 1, None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass  # evicted between add() and incr(); losing one count is fine
+
+
+def lookup(crop: Image.Image, topk: int) -> tuple[Optional[str], Optional[List[Dict]]]:
+    """
+    (key, cached predictions or None) for a prepare()d crop. The key is None when
+    the cache is disabled; pass it to store() after a miss.
+    """
+    if _ttl() <= 0:
+        return None, None
+    key = cache_key(crop, topk)
+    predictions = cache.get(key)
+    _count("hits" if predictions is not None else "misses")
+    return key, predictions
+
+
+def store(key: Optional[str], predictions: List[Dict]) -> None:
+    if key is not None:
+        cache.set(key, predictions, _ttl())
+
+
+def cached_predict_topk(image: Image.Image, topk: int = 3) -> List[Dict]:
+    """predict_topk(), served from the cache when a near-identical image was scanned recently."""
+    crop = prepare(image)
+    key, predictions = lookup(crop, topk)
+    if predictions is None:
+        predictions = predict_tensors(normalize(crop).unsqueeze(0), [topk])[0]
+        store(key, predictions)
+    return predictions
+
+
+def stats() -> Dict[str, float]:
+    counts = cache.get_many([f"{STATS_PREFIX}hits", f"{STATS_PREFIX}misses"])
+    hits = int(counts.get(f"{STATS_PREFIX}hits", 0))
+    misses = int(counts.get(f"{STATS_PREFIX}misses", 0))
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+def reset_stats() -> None:
+    cache.delete_many([f"{STATS_PREFIX}hits", f"{STATS_PREFIX}misses"])
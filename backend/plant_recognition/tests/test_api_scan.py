@@ -63,7 +63,7 @@ def test_scan_rejects_invalid_image():
 
 @pytest.mark.django_db
 @override_settings(SITE_URL="https://api.example.com", MEDIA_URL="/media/")
-@patch("plant_recognition.views.predict_topk")
+@patch("plant_recognition.views.cached_predict_topk")
 def test_scan_returns_sorted_predictions_with_matching_definition_thumb(mock_predict):
     user = User.objects.create_user(email="test@example.com", password="strong-password-123")
     PlantDefinition.objects.create(
@@ -103,7 +103,7 @@ def test_scan_returns_sorted_predictions_with_matching_definition_thumb(mock_pre
 
 @pytest.mark.django_db
 @override_settings(SITE_URL="https://api.example.com", MEDIA_URL="/media/")
-@patch("plant_recognition.views.predict_topk")
+@patch("plant_recognition.views.cached_predict_topk")
 def test_scan_matches_legacy_punctuated_external_id_by_canonical_latin(mock_predict):
     user = User.objects.create_user(email="test@example.com", password="strong-password-123")
     PlantDefinition.objects.create(
@@ -141,7 +141,7 @@ def test_scan_matches_legacy_punctuated_external_id_by_canonical_latin(mock_pred
 
 
 @pytest.mark.django_db
-@patch("plant_recognition.views.predict_topk")
+@patch("plant_recognition.views.cached_predict_topk")
 def test_scan_clamps_invalid_topk_to_default(mock_predict):
     user = User.objects.create_user(email="test@example.com", password="strong-password-123")
     mock_predict.return_value = [
@@ -161,7 +161,7 @@ def test_scan_clamps_invalid_topk_to_default(mock_predict):
 
 
 @pytest.mark.django_db
-@patch("plant_recognition.views.predict_topk")
+@patch("plant_recognition.views.cached_predict_topk")
 def test_scan_returns_500_when_inference_fails(mock_predict):
     user = User.objects.create_user(email="test@example.com", password="strong-password-123")
     mock_predict.side_effect = Exception("model unavailable")
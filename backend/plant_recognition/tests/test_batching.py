@@ -0,0 +1,198 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest.mock import patch
+
+import httpx
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from plant_recognition import preprocessing
+from plant_recognition.batching import InferenceBusy, InferenceServer, MicroBatcher
+from plant_recognition.inference import predict_topk
+from plant_recognition.inference_client import InvalidImage, predict_remote
+from plant_recognition.preprocessing import ImageTooLarge
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _jpeg(color="green", size=(64, 48)):
+    buf = BytesIO()
+    Image.new("RGB", size, color=color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    sizes = []
+
+    def run_batch(items):
+        sizes.append(len(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(run_batch, max_batch=4, max_wait=0.2, max_queue=16).start()
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(batcher.submit, range(8)))
+    finally:
+        batcher.stop()
+
+    assert results == [item * 10 for item in range(8)]
+    assert max(sizes) <= 4
+    assert len(sizes) < 8
+    assert batcher.stats()["items"] == 8
+
+
+def test_micro_batcher_rejects_work_when_queue_is_full():
+    release = threading.Event()
+    started = threading.Event()
+
+    def run_batch(items):
+        started.set()
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(run_batch, max_batch=1, max_wait=0, max_queue=1).start()
+    pool = ThreadPoolExecutor(2)
+    try:
+        running = pool.submit(batcher.submit, "running")
+        assert started.wait(5)
+        queued = pool.submit(batcher.submit, "queued")
+        for _ in range(500):
+            if batcher.stats()["queued"]:
+                break
+            time.sleep(0.01)
+
+        with pytest.raises(InferenceBusy):
+            batcher.submit("rejected")
+
+        release.set()
+        assert running.result(5) == "running"
+        assert queued.result(5) == "queued"
+    finally:
+        release.set()
+        pool.shutdown()
+        batcher.stop()
+    assert batcher.stats()["rejected"] == 1
+
+
+def test_micro_batcher_passes_batch_errors_to_every_caller():
+    def run_batch(items):
+        raise RuntimeError("forward failed")
+
+    batcher = MicroBatcher(run_batch, max_batch=2, max_wait=0.2).start()
+    try:
+        with ThreadPoolExecutor(2) as pool:
+            futures = [pool.submit(batcher.submit, item) for item in range(2)]
+            for future in futures:
+                with pytest.raises(RuntimeError, match="forward failed"):
+                    future.result(5)
+    finally:
+        batcher.stop()
+
+
+def test_inference_server_matches_in_process_predictions():
+    colors = ["green", "red", "blue", "yellow"]
+
+    with InferenceServer(port=0, max_batch=4, max_wait=0.2) as server:
+        with ThreadPoolExecutor(4) as pool:
+            remote = list(pool.map(lambda color: predict_remote(_jpeg(color), 3, url=server.url), colors))
+
+        with pytest.raises(InvalidImage):
+            predict_remote(b"not an image", 3, url=server.url)
+        stats = server.batcher.stats()
+
+    assert stats["items"] == 4
+    assert stats["batches"] < 4
+    for color, predictions in zip(colors, remote):
+        local = predict_topk(Image.open(BytesIO(_jpeg(color))), topk=3)
+        assert [p["name"] for p in predictions] == [p["name"] for p in local]
+        assert [p["score"] for p in predictions] == pytest.approx([p["score"] for p in local], abs=1e-4)
+
+
+def test_inference_server_answers_repeat_scans_from_the_cache():
+    with InferenceServer(port=0, max_batch=2, max_wait=0) as server:
+        first = predict_remote(_jpeg("green"), 2, url=server.url)
+        again = predict_remote(_jpeg("green"), 2, url=server.url)
+        health = httpx.get(f"{server.url}/health").json()
+
+    assert again == first
+    assert health["items"] == 1
+    assert health["scan_cache"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_inference_server_refuses_oversized_images_and_reports_stage_timings():
+    with InferenceServer(port=0, max_batch=2, max_wait=0) as server:
+        predict_remote(_jpeg(), 1, url=server.url)
+        with patch.object(preprocessing, "MAX_IMAGE_PIXELS", 1_000):
+            with pytest.raises(ImageTooLarge):
+                predict_remote(_jpeg(), 1, url=server.url)
+        health = httpx.get(f"{server.url}/health").json()
+
+    assert {"decode", "resize", "normalize", "forward"} <= set(health["stages"])
+    assert health["items"] == 1
+
+
+@pytest.mark.django_db
+@override_settings(PLANT_INFERENCE_URL="http://127.0.0.1:9")
+@patch("plant_recognition.views.cached_predict_topk")
+def test_scan_falls_back_to_in_process_when_server_is_down(mock_predict):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    mock_predict.return_value = [
+        {"name": "Monstera", "latin": "Monstera deliciosa", "score": 0.91, "rank": 1},
+    ]
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post(
+        reverse("plant-recognition-scan"),
+        data={"image": SimpleUploadedFile("plant.jpg", _jpeg(), content_type="image/jpeg")},
+        format="multipart",
+    )
+
+    assert response.status_code == 200
+    assert response.json()["results"][0]["external_id"] == "monstera_deliciosa"
+    mock_predict.assert_called_once()
+
+
+@pytest.mark.django_db
+@override_settings(PLANT_INFERENCE_URL="http://inference.local")
+@patch("plant_recognition.views.cached_predict_topk")
+@patch("plant_recognition.views.predict_remote")
+def test_scan_uses_server_and_passes_backpressure_on(mock_remote, mock_predict):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    mock_remote.return_value = [
+        {"name": "Ficus", "latin": "Ficus elastica", "score": 0.8, "rank": 1},
+    ]
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    def scan():
+        return client.post(
+            reverse("plant-recognition-scan"),
+            data={"image": SimpleUploadedFile("plant.jpg", _jpeg(), content_type="image/jpeg"), "topk": "2"},
+            format="multipart",
+        )
+
+    response = scan()
+    assert response.status_code == 200
+    assert mock_remote.call_args.args == (_jpeg(), 2)
+
+    mock_remote.side_effect = InferenceBusy("full")
+    response = scan()
+    assert response.status_code == 503
+    assert response["Retry-After"] == "1"
+    mock_predict.assert_not_called()
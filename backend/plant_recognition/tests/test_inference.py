@@ -0,0 +1,130 @@
+import os
+import subprocess
+import sys
+import threading
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from plant_recognition import inference
+from plant_recognition.inference import (
+    LoadedModel,
+    ModelRegistry,
+    artifact_path,
+    predict_topk,
+    registry,
+    resolve_backend,
+)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def test_django_startup_does_not_import_torch():
+    code = (
+        "import sys, django; django.setup(); "
+        "import app.urls, plant_recognition.views; "
+        "print(sorted(m for m in ('torch', 'torchvision') if m in sys.modules))"
+    )
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "app.settings", "PLANT_RECOGNITION_WARMUP": "false"}
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_registry_loads_each_model_once_under_concurrent_first_use():
+    calls = []
+
+    def fake_load(model_name, backend):
+        calls.append(model_name)
+        return LoadedModel(model_name, object(), ["Ficus"], "cpu", 0.0)
+
+    local_registry = ModelRegistry()
+    with patch.object(ModelRegistry, "_load", side_effect=fake_load):
+        threads = [threading.Thread(target=local_registry.get, args=("model-a",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        local_registry.get("model-b")
+
+    assert calls == ["model-a", "model-b"]
+    assert local_registry.is_loaded("model-a")
+    assert local_registry.get("model-a") is local_registry.get("model-a")
+
+
+def test_auto_backend_picks_the_fastest_present_artifact(tmp_path):
+    with patch.object(inference, "ARTIFACTS_DIR", tmp_path):
+        assert resolve_backend("plants", "auto") == "eager"
+
+        artifact_path("plants", "torchscript").touch()
+        assert resolve_backend("plants", "auto") == "torchscript"
+
+        artifact_path("plants", "int8_static").touch()
+        assert resolve_backend("plants", "auto") == "int8_static"
+        assert resolve_backend("plants", "eager") == "eager"
+
+        with pytest.raises(ValueError, match="Unknown plant model backend"):
+            resolve_backend("plants", "tensorrt")
+
+
+def test_torchscript_backend_matches_eager(tmp_path):
+    import torch
+
+    eager = registry.get(inference.MODEL_NAME, "eager")
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(eager.model, torch.zeros(1, 3, 224, 224)).eval())
+    torch.jit.save(scripted, str(tmp_path / f"{eager.name}_scripted.pt"))
+    (tmp_path / f"{eager.name}_classes.json").write_bytes(inference.classes_path(eager.name).read_bytes())
+
+    local_registry = ModelRegistry()
+    with patch.object(inference, "ARTIFACTS_DIR", tmp_path):
+        loaded = local_registry.get(eager.name, "auto")
+
+        with pytest.raises(FileNotFoundError, match="No onnx artifact"):
+            local_registry.get(eager.name, "onnx")
+
+    assert loaded.backend == "torchscript"
+    batch = torch.rand(2, 3, 224, 224)
+    with torch.no_grad():
+        assert torch.allclose(loaded.model(batch), eager.model(batch), atol=1e-4)
+
+
+def test_predict_topk_loads_model_on_first_use():
+    predictions = predict_topk(Image.new("RGB", (320, 240), color="green"), topk=3)
+
+    assert registry.is_loaded()
+    assert [p["rank"] for p in predictions] == [1, 2, 3]
+    assert all(p["name"] in inference.CLASS_NAMES for p in predictions)
+    assert predictions[0]["score"] >= predictions[-1]["score"]
+
+
+def test_app_ready_warms_model_only_when_enabled():
+    config = apps.get_app_config("plant_recognition")
+
+    with patch("plant_recognition.inference.warmup") as mock_warmup:
+        config.ready()
+        mock_warmup.assert_not_called()
+
+        with override_settings(PLANT_RECOGNITION_WARMUP=True):
+            config.ready()
+        mock_warmup.assert_called_once_with()
+
+
+def test_plant_model_startup_command_reports_each_step():
+    out = StringIO()
+    call_command("plant_model_startup", stdout=out)
+
+    output = out.getvalue()
+    assert "import torch" in output
+    assert "Backend: " in output
+    assert "load model" in output
+    assert "warmup forward" in output
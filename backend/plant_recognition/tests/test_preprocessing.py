@@ -0,0 +1,116 @@
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+import torch
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+from torchvision import transforms
+
+from plant_recognition import preprocessing
+from plant_recognition.inference import preprocess, stage_timings
+from plant_recognition.preprocessing import ImageTooLarge, decode
+
+User = get_user_model()
+
+
+def _encode(image, format, **kwargs):
+    buf = BytesIO()
+    image.save(buf, format=format, **kwargs)
+    buf.seek(0)
+    return buf
+
+
+def _noise(size):
+    generator = torch.Generator().manual_seed(0)
+    pixels = torch.randint(0, 256, (size[1], size[0], 3), dtype=torch.uint8, generator=generator)
+    return Image.fromarray(pixels.numpy())
+
+
+def test_preprocess_matches_the_training_val_transform():
+    val_transform = transforms.Compose(
+        [
+            transforms.Resize(256),
+            transforms.CenterCrop(224),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=preprocessing.IMAGENET_MEAN, std=preprocessing.IMAGENET_STD),
+        ]
+    )
+    for size in [(401, 333), (300, 500)]:
+        data = _encode(_noise(size), "PNG").getvalue()
+
+        expected = val_transform(Image.open(BytesIO(data)).convert("RGB"))
+        tensor = preprocess(Image.open(BytesIO(data)))
+
+        assert tensor.shape == (3, 224, 224)
+        assert torch.allclose(tensor, expected, atol=1e-5)
+
+
+def test_preprocess_writes_into_a_preallocated_row():
+    batch = torch.zeros(2, 3, 224, 224)
+
+    result = preprocess(Image.open(_encode(_noise((320, 240)), "JPEG")), out=batch[1])
+
+    assert result.data_ptr() == batch[1].data_ptr()
+    assert batch[1].abs().sum() > 0
+    assert batch[0].abs().sum() == 0
+
+
+def test_large_jpegs_are_decoded_in_draft_mode_near_the_resize_size():
+    image = decode(Image.open(_encode(Image.new("RGB", (2048, 1536), "green"), "JPEG")))
+
+    assert image.size == (512, 384)
+    assert image.mode == "RGB"
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise
+    photo = _encode(Image.new("RGB", (640, 480), "green"), "JPEG", exif=exif)
+
+    assert decode(Image.open(photo)).size == (480, 640)
+
+
+def test_images_over_the_pixel_limit_are_refused_before_decoding():
+    image = Image.open(_encode(Image.new("RGB", (200, 100)), "PNG"))
+
+    with patch.object(preprocessing, "MAX_IMAGE_PIXELS", 10_000):
+        with pytest.raises(ImageTooLarge):
+            decode(image)
+
+    assert image.tile  # still undecoded
+
+
+def test_preprocess_records_stage_timings():
+    stage_timings.reset()
+
+    preprocess(Image.open(_encode(_noise((320, 240)), "JPEG")))
+
+    snapshot = stage_timings.snapshot()
+    assert set(snapshot) == {"decode", "resize", "normalize"}
+    assert all(stage["count"] == 1 and stage["total_ms"] >= 0 for stage in snapshot.values())
+
+
+@pytest.mark.django_db
+def test_scan_of_an_oversized_image_returns_413():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with patch.object(preprocessing, "MAX_IMAGE_PIXELS", 1_000):
+        response = client.post(
+            reverse("plant-recognition-scan"),
+            data={
+                "image": SimpleUploadedFile(
+                    "plant.jpg",
+                    _encode(Image.new("RGB", (64, 48), "green"), "JPEG").getvalue(),
+                    content_type="image/jpeg",
+                )
+            },
+            format="multipart",
+        )
+
+    assert response.status_code == 413
@@ -0,0 +1,91 @@
+from dataclasses import replace
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image, ImageDraw
+
+from plant_recognition import scan_cache
+from plant_recognition.inference import predict_topk, prepare, registry
+from plant_recognition.scan_cache import cached_predict_topk, image_hash
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _photo(color="green", size=(640, 480)):
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((size[0] // 4, size[1] // 5, size[0] * 3 // 4, size[1] * 4 // 5), fill=color)
+    draw.rectangle((0, size[1] * 3 // 4, size[0] // 3, size[1]), fill="brown")
+    return image
+
+
+def _jpeg(image, quality=90):
+    buf = BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    buf.seek(0)
+    return Image.open(buf)
+
+
+def test_hash_matches_near_duplicates_only():
+    original = image_hash(prepare(_jpeg(_photo())))
+
+    assert image_hash(prepare(_jpeg(_photo(), quality=70))) == original
+    assert image_hash(prepare(_jpeg(_photo(size=(1280, 960))))) == original
+    assert image_hash(prepare(_jpeg(_photo("red")))) != original
+    assert image_hash(prepare(_jpeg(_photo().transpose(Image.FLIP_LEFT_RIGHT)))) != original
+
+
+def test_repeat_scan_skips_the_forward_pass():
+    with patch.object(scan_cache, "predict_tensors", wraps=scan_cache.predict_tensors) as forward:
+        first = cached_predict_topk(_jpeg(_photo()), topk=3)
+        again = cached_predict_topk(_jpeg(_photo(), quality=75), topk=3)
+        other_k = cached_predict_topk(_jpeg(_photo()), topk=2)
+
+    assert again == first
+    assert first == predict_topk(_jpeg(_photo()), topk=3)
+    assert [p["name"] for p in other_k] == [p["name"] for p in first[:2]]
+    assert forward.call_count == 2
+    assert scan_cache.stats() == {"hits": 1, "misses": 2, "hit_rate": pytest.approx(1 / 3)}
+
+
+def test_reexported_model_does_not_reuse_old_entries():
+    loaded = registry.get()
+    assert loaded.backend in scan_cache.cache_key(prepare(_photo()), 3)
+    cached_predict_topk(_jpeg(_photo()), topk=3)
+
+    reexported = replace(loaded, artifact_version=f"{loaded.artifact_version}1")
+    with patch.object(registry, "get", return_value=reexported):
+        with patch.object(scan_cache, "predict_tensors", wraps=scan_cache.predict_tensors) as forward:
+            cached_predict_topk(_jpeg(_photo()), topk=3)
+
+    assert forward.call_count == 1
+
+
+@override_settings(PLANT_SCAN_CACHE_TTL=0)
+def test_cache_can_be_disabled():
+    with patch.object(scan_cache, "predict_tensors", wraps=scan_cache.predict_tensors) as forward:
+        cached_predict_topk(_jpeg(_photo()), topk=3)
+        cached_predict_topk(_jpeg(_photo()), topk=3)
+
+    assert forward.call_count == 2
+    assert scan_cache.stats()["hits"] == 0
+
+
+def test_plant_scan_cache_command_reports_and_resets_hit_rate():
+    cached_predict_topk(_jpeg(_photo()), topk=1)
+    cached_predict_topk(_jpeg(_photo()), topk=1)
+
+    out = StringIO()
+    call_command("plant_scan_cache", "--reset", stdout=out)
+
+    assert "hits 1  misses 1  hit rate 50.0%" in out.getvalue()
+    assert scan_cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0}
@@ -12,7 +12,10 @@ from rest_framework import status
 from .utils import normalize_plant_key
 from plant_definitions.utils import map_plant_definitions_by_keys
 
-from .inference import predict_topk
+from .batching import InferenceBusy
+from .inference_client import InferenceUnavailable, InvalidImage, predict_remote
+from .preprocessing import ImageTooLarge
+from .scan_cache import cached_predict_topk
 from .serializers import PlantRecognitionResultSerializer
 
 logger = logging.getLogger(__name__)
@@ -58,6 +61,24 @@ def _abs_media_url(request, value) -> str | None:
     return request.build_absolute_uri(rel) if request else rel
 
 
+def _predict(file, image, topk: int) -> list[dict]:
+    """
+    Predictions from the batched inference server when PLANT_INFERENCE_URL is set,
+    falling back to running the model in this process if it can't be reached.
+    Both paths serve repeat scans from the scan cache (scan_cache.py).
+    """
+    if getattr(settings, "PLANT_INFERENCE_URL", ""):
+        file.seek(0)
+        try:
+            return predict_remote(file.read(), topk)
+        except InferenceUnavailable as e:
+            if not getattr(settings, "PLANT_INFERENCE_FALLBACK", True):
+                raise
+            logger.warning("Inference server unavailable (%s); scanning in-process", e)
+
+    return cached_predict_topk(image, topk=topk)
+
+
 class PlantRecognitionView(APIView):
     """
     POST /api/plant-recognition/scan/
@@ -99,6 +120,11 @@ class PlantRecognitionView(APIView):
                 {"detail": "Uploaded file is not a valid image."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        except Image.DecompressionBombError:
+            return Response(
+                {"detail": "Image is too large."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
 
         try:
             topk_raw = request.data.get("topk", "3")
@@ -107,7 +133,23 @@ class PlantRecognitionView(APIView):
             topk = 3
 
         try:
-            predictions = predict_topk(image, topk=topk)
+            predictions = _predict(file, image, topk)
+        except InferenceBusy:
+            return Response(
+                {"detail": "Plant recognition is busy, please try again."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+        except InvalidImage:
+            return Response(
+                {"detail": "Uploaded file is not a valid image."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except ImageTooLarge:
+            return Response(
+                {"detail": "Image is too large."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
         except Exception as e:
             logger.exception("Plant recognition failed")
             return Response(
@@ -10,7 +10,7 @@ class ProfileSettingsAdmin(admin.ModelAdmin):
 
 @admin.register(ProfileNotifications)
 class ProfileNotificationsAdmin(admin.ModelAdmin):
-    list_display = ("user", "email_daily", "email_hour", "email_24h", "push_daily", "push_hour", "push_24h", "updated_at")
+    list_display = ("user", "email_daily", "email_hour", "email_24h", "push_daily", "push_hour", "push_24h", "email_next_fire_utc", "push_next_fire_utc", "updated_at")
     list_select_related = ("user",)
     search_fields = ("user__email",)
     readonly_fields = ("created_at", "updated_at")
@@ -0,0 +1,134 @@
+"""
+A local stand-in for the FCM v1 send endpoint, for tests and push benchmarks.
+
+    with StubFcmServer(latency=0.02) as stub:
+        transport = AsyncPushTransport(endpoint=stub.url, project_id="stub")
+
+Answers POST /v1/projects/<project>/messages:send like FCM does: 200 with a message
+name, or 404 UNREGISTERED for tokens starting with `unregistered_prefix`. Keeps
+connections alive (HTTP/1.1) and records how many requests, connections and
+concurrent requests it saw.
+"""
+from __future__ import annotations
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Small responses on a kept-alive connection would otherwise wait on Nagle.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.stub._connection_opened()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        # Headers and body in one write.
+        self._headers_buffer.append(b"\r\n" + body)
+        self.flush_headers()
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            message = json.loads(self.rfile.read(length) or b"{}").get("message") or {}
+        except ValueError:
+            self._reply(400, {"error": {"code": 400, "message": "Invalid JSON payload", "status": "INVALID_ARGUMENT"}})
+            return
+
+        if not self.path.endswith("/messages:send"):
+            self._reply(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        stub._request_started()
+        try:
+            if stub.latency:
+                time.sleep(stub.latency)
+            token = str(message.get("token") or "")
+            if token.startswith(stub.unregistered_prefix):
+                self._reply(404, {"error": {
+                    "code": 404,
+                    "message": "Requested entity was not found.",
+                    "status": "NOT_FOUND",
+                    "details": [{
+                        "@type": "type.googleapis.com/google.firebase.fcm.v1.FcmError",
+                        "errorCode": "UNREGISTERED",
+                    }],
+                }})
+            else:
+                project = self.path.removeprefix("/v1/").removesuffix("/messages:send")
+                self._reply(200, {"name": f"{project}/messages/{stub.requests}"})
+        finally:
+            stub._request_finished()
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for a whole pool of clients connecting at once.
+    request_queue_size = 1024
+
+
+class StubFcmServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, unregistered_prefix: str = "unregistered"):
+        self.latency = latency
+        self.unregistered_prefix = unregistered_prefix
+        self.requests = 0
+        self.connections = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+        self._server = _StubHTTPServer((host, port), _StubHandler)
+        self._server.stub = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def _request_started(self):
+        with self._lock:
+            self.requests += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+
+    def _request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def start(self) -> "StubFcmServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fcm-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
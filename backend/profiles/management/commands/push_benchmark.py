@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles.fcm_stub import StubFcmServer
+from profiles.push import AsyncPushTransport, ThreadPoolPushTransport
+
+HTTP_TRANSPORTS = {
+    ThreadPoolPushTransport.name: ThreadPoolPushTransport,
+    AsyncPushTransport.name: AsyncPushTransport,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure push throughput (pushes/sec) of the HTTP push transports against the "
+        "local FCM stub server, or run the stub server on its own with --serve."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--transport",
+            choices=sorted(HTTP_TRANSPORTS),
+            action="append",
+            help="Transport to measure; repeat for several (default: all).",
+        )
+        parser.add_argument("--tokens", type=int, default=2000, help="Pushes per run (default 2000).")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Requests in flight per transport (default PUSH_MAX_CONCURRENCY).",
+        )
+        parser.add_argument(
+            "--latency-ms",
+            type=float,
+            default=20.0,
+            help="Simulated FCM response time of the in-process stub (default 20).",
+        )
+        parser.add_argument(
+            "--endpoint",
+            default="",
+            help="Benchmark against this FCM-compatible endpoint instead of an in-process stub.",
+        )
+        parser.add_argument("--serve", action="store_true", help="Only run the stub server until interrupted.")
+        parser.add_argument("--port", type=int, default=9099, help="Port of the stub server for --serve.")
+
+    def handle(self, *args, **options):
+        tokens = options["tokens"]
+        if tokens < 1:
+            raise CommandError("--tokens must be at least 1.")
+        latency = max(options["latency_ms"], 0.0) / 1000
+
+        if options["serve"]:
+            stub = StubFcmServer(host="0.0.0.0", port=options["port"], latency=latency)
+            self.stdout.write(f"FCM stub listening on {stub.url} (latency {options['latency_ms']:g} ms)")
+            try:
+                stub.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            return
+
+        stub = None
+        endpoint = options["endpoint"]
+        if not endpoint:
+            stub = StubFcmServer(latency=latency).start()
+            endpoint = stub.url
+
+        try:
+            for name in options["transport"] or sorted(HTTP_TRANSPORTS):
+                self._run(name, endpoint, tokens, options["concurrency"])
+        finally:
+            if stub is not None:
+                stub.stop()
+
+    def _run(self, name, endpoint, tokens, concurrency):
+        transport = HTTP_TRANSPORTS[name](
+            endpoint=endpoint,
+            project_id="benchmark",
+            service_account_path="",
+            max_concurrency=concurrency,
+        )
+        try:
+            # Warm-up opens the pooled connections.
+            transport.send_multicast([f"warmup-{i}" for i in range(transport.max_concurrency)], "Benchmark", "Warm-up", {})
+
+            started = time.perf_counter()
+            result = transport.send_multicast([f"token-{i}" for i in range(tokens)], "Benchmark", "Push", {"kind": "benchmark"})
+            elapsed = time.perf_counter() - started
+        finally:
+            transport.close()
+
+        self.stdout.write(
+            f"{name:<8} concurrency={transport.max_concurrency:<4} pushes={tokens} "
+            f"ok={result.success_count} failed={result.failure_count} "
+            f"elapsed={elapsed:.2f}s rate={tokens / elapsed:,.0f}/s"
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:23
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0010_alter_profilesettings_background'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilesettings',
+            name='readings_retention_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Keep raw sensor readings this many days before compacting them into daily rollups. Empty uses READINGS_RAW_RETENTION_DAYS.', null=True, validators=[django.core.validators.MinValueValidator(7), django.core.validators.MaxValueValidator(3650)]),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:33
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from profiles.scheduling import next_fire_utc
+
+
+def schedule_existing_notifications(apps, schema_editor):
+    ProfileNotifications = apps.get_model("profiles", "ProfileNotifications")
+    now = timezone.now()
+
+    rows = []
+    for pn in ProfileNotifications.objects.all().iterator():
+        if pn.email_daily or pn.email_24h:
+            pn.email_next_fire_utc = next_fire_utc(pn.timezone, pn.email_hour, pn.email_minute, now)
+        if pn.push_daily or pn.push_24h:
+            pn.push_next_fire_utc = next_fire_utc(pn.timezone, pn.push_hour, pn.push_minute, now)
+        rows.append(pn)
+
+    ProfileNotifications.objects.bulk_update(
+        rows, ["email_next_fire_utc", "push_next_fire_utc"], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0011_profilesettings_readings_retention_days'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilenotifications',
+            name='email_next_fire_utc',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='profilenotifications',
+            name='push_next_fire_utc',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(schedule_existing_notifications, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
+from .scheduling import next_fire_utc
+
 User = settings.AUTH_USER_MODEL
 
 LANG_CHOICES = [
@@ -55,6 +57,13 @@ class ProfileSettings(TimeStampedModel):
     background = models.CharField(max_length=3, choices=BACKGROUND_CHOICES, default="bg1")
     fab_position = models.CharField(max_length=5, choices=FAB_CHOICES, default="right")
 
+    readings_retention_days = models.PositiveIntegerField(
+        null=True, blank=True,
+        validators=[MinValueValidator(7), MaxValueValidator(3650)],
+        help_text="Keep raw sensor readings this many days before compacting them into daily "
+                  "rollups. Empty uses READINGS_RAW_RETENTION_DAYS.",
+    )
+
     def __str__(self) -> str:
         return f"ProfileSettings<{self.user}>"
 
@@ -74,9 +83,77 @@ class ProfileNotifications(TimeStampedModel):
     push_minute = models.IntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(59)])
     push_24h = models.BooleanField(default=False)
 
+    # Next UTC instant each channel fires (null when the channel is off); kept in sync
+    # on save and advanced by the beat tick, see profiles/scheduling.py.
+    email_next_fire_utc = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
+    push_next_fire_utc = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
+
+    SCHEDULE_FIELDS = frozenset({
+        "timezone",
+        "email_daily", "email_24h", "email_hour", "email_minute",
+        "push_daily", "push_24h", "push_hour", "push_minute",
+    })
+    NEXT_FIRE_FIELDS = ("email_next_fire_utc", "push_next_fire_utc")
+
     def __str__(self) -> str:
         return f"ProfileNotifications<{self.user}>"
 
+    @property
+    def email_enabled(self) -> bool:
+        return bool(self.email_daily or self.email_24h)
+
+    @property
+    def push_enabled(self) -> bool:
+        return bool(self.push_daily or self.push_24h)
+
+    def next_email_fire(self, after):
+        if not self.email_enabled:
+            return None
+        return next_fire_utc(self.timezone, self.email_hour, self.email_minute, after)
+
+    def next_push_fire(self, after):
+        if not self.push_enabled:
+            return None
+        return next_fire_utc(self.timezone, self.push_hour, self.push_minute, after)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_schedule = instance._schedule_values()
+        return instance
+
+    def _schedule_values(self) -> dict:
+        loaded = self.__dict__
+        return {name: loaded[name] for name in self.SCHEDULE_FIELDS if name in loaded}
+
+    def _schedule_changed(self, fields) -> bool:
+        # Unsaved rows and fields that weren't loaded count as changed.
+        if self._state.adding:
+            return True
+        loaded = getattr(self, "_loaded_schedule", {})
+        current = self._schedule_values()
+        return any(name not in loaded or loaded[name] != current.get(name) for name in fields)
+
+    def reschedule(self, after=None) -> None:
+        after = after or timezone.now()
+        self.email_next_fire_utc = self.next_email_fire(after)
+        self.push_next_fire_utc = self.next_push_fire(after)
+
+    def save(self, *args, **kwargs):
+        # Only a schedule change moves the next fire times; saving e.g. after the
+        # tick advanced them must not pull them back to "now".
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            if self._schedule_changed(self.SCHEDULE_FIELDS):
+                self.reschedule()
+        else:
+            changed = self.SCHEDULE_FIELDS.intersection(update_fields)
+            if changed and self._schedule_changed(changed):
+                self.reschedule()
+                kwargs["update_fields"] = {*update_fields, *self.NEXT_FIRE_FIELDS}
+        super().save(*args, **kwargs)
+        self._loaded_schedule = self._schedule_values()
+
 
 class NotificationDeliveryLog(models.Model):
     CHANNEL_EMAIL = "email"
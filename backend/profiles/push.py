@@ -1,12 +1,38 @@
+"""
+FCM sending.
+
+send_fcm_multicast() goes through a pluggable transport, picked by
+settings.PUSH_TRANSPORT:
+
+- "sdk" (default): firebase_admin's send_each_for_multicast.
+- "threads": the FCM v1 HTTP API over one pooled httpx.Client, fanned out on a
+  thread pool of PUSH_MAX_CONCURRENCY workers.
+- "async": the FCM v1 HTTP API over PUSH_MAX_CONCURRENCY persistent HTTP/2
+  connections driven by a background event loop.
+
+Both HTTP transports keep at most PUSH_MAX_CONCURRENCY requests in flight and
+keep their clients, and so their open connections, for the life of the worker
+process. settings.FCM_ENDPOINT can point them at the local stub server in
+profiles/fcm_stub.py for offline tests and benchmarks.
+"""
 from __future__ import annotations
 
+import asyncio
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
 
 import firebase_admin
+import httpx
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from firebase_admin import credentials, messaging
 
+DEFAULT_FCM_ENDPOINT = "https://fcm.googleapis.com"
+FCM_SCOPE = "https://www.googleapis.com/auth/firebase.messaging"
+
 _app = None
 
 def _get_firebase_app():
@@ -47,6 +73,271 @@ class MulticastResultLike:
     success_count: int
     failure_count: int
 
+    @classmethod
+    def from_responses(cls, responses: list[SendResponseLike]) -> "MulticastResultLike":
+        success_count = sum(1 for r in responses if r.success)
+        return cls(
+            responses=responses,
+            success_count=success_count,
+            failure_count=len(responses) - success_count,
+        )
+
+
+class FcmSendError(Exception):
+    """A failed FCM v1 send; the message carries the FCM error code (e.g. UNREGISTERED)."""
+
+    def __init__(self, message: str, status: int | None = None, code: str | None = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def looks_unregistered(exc: Exception) -> bool:
+    """Whether a per-token send error means the token is gone and should be deactivated."""
+    msg = str(exc).lower()
+    return (
+        "not registered" in msg
+        or "unregistered" in msg
+        or "registration-token-not-registered" in msg
+        or "requested entity was not found" in msg
+    )
+
+
+class PushTransport:
+    name = ""
+
+    def send_multicast(self, tokens: list[str], title: str, body: str, data: dict[str, str]) -> MulticastResultLike | Any:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SdkPushTransport(PushTransport):
+    """
+    Works across Firebase Admin SDK versions:
+    - Prefer messaging.send_each_for_multicast (newer SDKs)
+    - Fallback to messaging.send (per-token) if multicast APIs aren't available
+    """
+    name = "sdk"
+
+    def send_multicast(self, tokens, title, body, data):
+        _get_firebase_app()
+
+        if hasattr(messaging, "send_each_for_multicast"):
+            msg = messaging.MulticastMessage(
+                tokens=tokens,
+                notification=messaging.Notification(title=title, body=body),
+                data=data,
+            )
+            return messaging.send_each_for_multicast(msg)
+
+        responses: list[SendResponseLike] = []
+        for t in tokens:
+            msg = messaging.Message(
+                token=t,
+                notification=messaging.Notification(title=title, body=body),
+                data=data,
+            )
+            try:
+                messaging.send(msg)
+                responses.append(SendResponseLike(success=True, exception=None))
+            except Exception as e:
+                responses.append(SendResponseLike(success=False, exception=e))
+
+        return MulticastResultLike.from_responses(responses)
+
+
+class _FcmHttpTransport(PushTransport):
+    """Shared FCM v1 HTTP plumbing: endpoint, OAuth token, message and error format."""
+
+    def __init__(
+        self,
+        endpoint: str | None = None,
+        project_id: str | None = None,
+        service_account_path: str | None = None,
+        max_concurrency: int | None = None,
+        timeout: float | None = None,
+    ):
+        self.endpoint = (endpoint or getattr(settings, "FCM_ENDPOINT", "") or DEFAULT_FCM_ENDPOINT).rstrip("/")
+        self.max_concurrency = max(1, int(max_concurrency or getattr(settings, "PUSH_MAX_CONCURRENCY", 50)))
+        self.timeout = float(timeout or getattr(settings, "PUSH_HTTP_TIMEOUT", 10))
+
+        if service_account_path is None:
+            service_account_path = os.environ.get("FCM_SERVICE_ACCOUNT_PATH", "").strip()
+
+        self._credentials = None
+        self._credentials_lock = threading.Lock()
+        if service_account_path:
+            from google.oauth2 import service_account
+
+            self._credentials = service_account.Credentials.from_service_account_file(
+                service_account_path, scopes=[FCM_SCOPE]
+            )
+            project_id = project_id or self._credentials.project_id
+        elif self.endpoint == DEFAULT_FCM_ENDPOINT:
+            raise RuntimeError("FCM_SERVICE_ACCOUNT_PATH is not set")
+
+        project_id = project_id or getattr(settings, "FCM_PROJECT_ID", "")
+        if not project_id:
+            raise ImproperlyConfigured("FCM project id is unknown; set FCM_PROJECT_ID.")
+        self.url = f"{self.endpoint}/v1/projects/{project_id}/messages:send"
+
+    def _headers(self) -> dict[str, str]:
+        if self._credentials is None:
+            return {}
+        with self._credentials_lock:
+            if not self._credentials.valid:
+                from google.auth.transport.requests import Request
+
+                self._credentials.refresh(Request())
+            return {"Authorization": f"Bearer {self._credentials.token}"}
+
+    @staticmethod
+    def _message(token: str, title: str, body: str, data: dict[str, str]) -> dict:
+        return {
+            "message": {
+                "token": token,
+                "notification": {"title": title, "body": body},
+                "data": data,
+            }
+        }
+
+    @staticmethod
+    def _response(resp: httpx.Response) -> SendResponseLike:
+        if resp.status_code == 200:
+            return SendResponseLike(success=True)
+
+        try:
+            error = resp.json().get("error") or {}
+        except ValueError:
+            error = {}
+        codes = [
+            d["errorCode"] for d in error.get("details", [])
+            if isinstance(d, dict) and d.get("errorCode")
+        ]
+        code = codes[0] if codes else error.get("status")
+        message = " ".join(str(part) for part in (resp.status_code, code, error.get("message") or resp.reason_phrase) if part)
+        return SendResponseLike(success=False, exception=FcmSendError(message, status=resp.status_code, code=code))
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+
+
+class ThreadPoolPushTransport(_FcmHttpTransport):
+    name = "threads"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._client = httpx.Client(http2=True, limits=self._limits(), timeout=self.timeout)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="fcm-push")
+
+    def _post(self, headers: dict, payload: dict) -> SendResponseLike:
+        try:
+            return self._response(self._client.post(self.url, headers=headers, json=payload))
+        except httpx.HTTPError as exc:
+            return SendResponseLike(success=False, exception=FcmSendError(str(exc) or type(exc).__name__))
+
+    def send_multicast(self, tokens, title, body, data):
+        headers = self._headers()
+        responses = list(self._executor.map(
+            lambda token: self._post(headers, self._message(token, title, body, data)),
+            tokens,
+        ))
+        return MulticastResultLike.from_responses(responses)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._client.close()
+
+
+class AsyncPushTransport(_FcmHttpTransport):
+    """
+    PUSH_MAX_CONCURRENCY lanes on a background event loop, each a persistent
+    httpx.AsyncClient with its own connection, pulling tokens off one queue. Lanes
+    outperform a single shared AsyncClient, whose pool bookkeeping dominates once
+    dozens of requests are in flight.
+    """
+    name = "async"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fcm-push-loop", daemon=True)
+        self._thread.start()
+        # Created on the loop thread, which owns them.
+        self._clients: list[httpx.AsyncClient] = []
+
+    async def _post(self, client: httpx.AsyncClient, headers: dict, payload: dict) -> SendResponseLike:
+        try:
+            return self._response(await client.post(self.url, headers=headers, json=payload))
+        except httpx.HTTPError as exc:
+            return SendResponseLike(success=False, exception=FcmSendError(str(exc) or type(exc).__name__))
+
+    async def _send_all(self, headers, tokens, title, body, data) -> list[SendResponseLike]:
+        if not self._clients:
+            limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+            self._clients = [
+                httpx.AsyncClient(http2=True, limits=limits, timeout=self.timeout)
+                for _ in range(self.max_concurrency)
+            ]
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(tokens):
+            queue.put_nowait(item)
+        responses: list[SendResponseLike | None] = [None] * len(tokens)
+
+        async def lane(client):
+            while not queue.empty():
+                idx, token = queue.get_nowait()
+                responses[idx] = await self._post(client, headers, self._message(token, title, body, data))
+
+        await asyncio.gather(*(lane(client) for client in self._clients[:len(tokens)]))
+        return responses
+
+    def send_multicast(self, tokens, title, body, data):
+        headers = self._headers()
+        future = asyncio.run_coroutine_threadsafe(self._send_all(headers, tokens, title, body, data), self._loop)
+        return MulticastResultLike.from_responses(future.result())
+
+    async def _close_clients(self):
+        await asyncio.gather(*(client.aclose() for client in self._clients))
+        self._clients = []
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._close_clients(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+PUSH_TRANSPORTS = {
+    SdkPushTransport.name: SdkPushTransport,
+    ThreadPoolPushTransport.name: ThreadPoolPushTransport,
+    AsyncPushTransport.name: AsyncPushTransport,
+}
+
+_transport: PushTransport | None = None
+_transport_pid: int | None = None
+_transport_lock = threading.Lock()
+
+
+def get_push_transport() -> PushTransport:
+    """
+    The process-wide transport for settings.PUSH_TRANSPORT. Built lazily, and again
+    after a fork, so every Celery worker process gets its own client and connections.
+    """
+    global _transport, _transport_pid
+    with _transport_lock:
+        if _transport is None or _transport_pid != os.getpid():
+            name = (getattr(settings, "PUSH_TRANSPORT", "") or SdkPushTransport.name).strip().lower()
+            transport_cls = PUSH_TRANSPORTS.get(name)
+            if transport_cls is None:
+                raise ImproperlyConfigured(f"Unknown PUSH_TRANSPORT {name!r}; use one of {sorted(PUSH_TRANSPORTS)}.")
+            _transport = transport_cls()
+            _transport_pid = os.getpid()
+        return _transport
+
 
 def send_fcm_multicast(
     tokens: list[str],
@@ -55,11 +346,7 @@ def send_fcm_multicast(
     data: dict[str, str] | None = None,
 ) -> MulticastResultLike | Any:
     """
-    Sends push notifications to multiple tokens.
-
-    Works across Firebase Admin SDK versions:
-    - Prefer messaging.send_each_for_multicast (newer SDKs)
-    - Fallback to messaging.send (per-token) if multicast APIs aren't available
+    Sends push notifications to multiple tokens through the configured transport.
 
     Returns an object with:
     - .responses
@@ -70,39 +357,5 @@ def send_fcm_multicast(
     if not tokens:
         return MulticastResultLike(responses=[], success_count=0, failure_count=0)
 
-    _get_firebase_app()
-
     payload_data = {str(k): str(v) for k, v in (data or {}).items() if v is not None}
-
-    if hasattr(messaging, "send_each_for_multicast"):
-        msg = messaging.MulticastMessage(
-            tokens=tokens,
-            notification=messaging.Notification(title=title, body=body),
-            data=payload_data,
-        )
-        resp = messaging.send_each_for_multicast(msg)
-        return resp
-
-    responses: list[SendResponseLike] = []
-    success_count = 0
-    failure_count = 0
-
-    for t in tokens:
-        msg = messaging.Message(
-            token=t,
-            notification=messaging.Notification(title=title, body=body),
-            data=payload_data,
-        )
-        try:
-            messaging.send(msg)
-            success_count += 1
-            responses.append(SendResponseLike(success=True, exception=None))
-        except Exception as e:
-            failure_count += 1
-            responses.append(SendResponseLike(success=False, exception=e))
-
-    return MulticastResultLike(
-        responses=responses,
-        success_count=success_count,
-        failure_count=failure_count,
-    )
+    return get_push_transport().send_multicast(tokens, title, body, payload_data)
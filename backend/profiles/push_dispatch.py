@@ -0,0 +1,82 @@
+"""
+Cross-user push batching.
+
+Users who get byte-identical pushes (same language, same count) share one FCM
+multicast instead of one request each. Pushes are queued with `add()` under a
+caller-chosen key and sent on `flush()`: grouped by (title, body, data), split
+into multicasts of at most FCM_MULTICAST_LIMIT tokens, with per-token results
+mapped back to the keys and unregistered tokens deactivated.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Hashable
+
+from .models import PushDevice
+from .push import looks_unregistered, send_fcm_multicast
+
+logger = logging.getLogger(__name__)
+
+# FCM rejects multicast messages with more tokens than this.
+FCM_MULTICAST_LIMIT = 500
+
+
+def _payload_key(title: str, body: str, data: dict[str, str] | None) -> tuple:
+    return title, body, tuple(sorted((str(k), str(v)) for k, v in (data or {}).items() if v is not None))
+
+
+class PushDispatcher:
+    def __init__(self, batch_size: int = FCM_MULTICAST_LIMIT):
+        self.batch_size = max(1, min(int(batch_size), FCM_MULTICAST_LIMIT))
+        # payload key -> [(token, owner key)]
+        self._pending: dict[tuple, list[tuple[str, Hashable]]] = {}
+
+    def add(self, key: Hashable, tokens: list[str], title: str, body: str, data: dict[str, str] | None = None) -> None:
+        targets = self._pending.setdefault(_payload_key(title, body, data), [])
+        targets.extend((token, key) for token in tokens if token)
+
+    def flush(self) -> dict[Hashable, int]:
+        """
+        Send everything queued. Returns {key: delivered token count}; keys whose
+        pushes all failed map to 0.
+        """
+        pending, self._pending = self._pending, {}
+
+        sent: dict[Hashable, int] = {}
+        bad_tokens: list[str] = []
+        calls = 0
+
+        for (title, body, data_items), targets in pending.items():
+            for _, key in targets:
+                sent.setdefault(key, 0)
+
+            for start in range(0, len(targets), self.batch_size):
+                batch = targets[start:start + self.batch_size]
+                tokens = [token for token, _ in batch]
+                calls += 1
+
+                try:
+                    resp = send_fcm_multicast(tokens=tokens, title=title, body=body, data=dict(data_items))
+                except Exception:
+                    logger.exception("FCM multicast send raised tokens=%s", len(tokens))
+                    continue
+
+                responses = getattr(resp, "responses", None)
+                if responses is None:
+                    logger.warning("FCM multicast response missing expected attrs: %r", resp)
+                    continue
+
+                for (token, key), r in zip(batch, responses):
+                    if getattr(r, "success", False):
+                        sent[key] += 1
+                        continue
+                    exc = getattr(r, "exception", None)
+                    if exc and looks_unregistered(exc):
+                        bad_tokens.append(token)
+
+        if bad_tokens:
+            PushDevice.objects.filter(token__in=bad_tokens).update(is_active=False)
+
+        if calls:
+            logger.info("push dispatch payloads=%s multicasts=%s keys=%s", len(pending), calls, len(sent))
+        return sent
@@ -0,0 +1,60 @@
+"""
+Due-time math for the daily task notifications.
+
+Every ProfileNotifications row stores the next UTC instant its email and push
+notifications fire, so the per-minute beat tick is one indexed range query instead
+of converting every user's clock. Local times are resolved per calendar date, which
+keeps the fire time on the user's wall clock across DST changes:
+
+- a time inside the spring-forward gap (e.g. 02:30) fires at the same offset it had
+  before the jump, i.e. 03:30 local;
+- an ambiguous autumn time fires at its first occurrence.
+"""
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.utils import timezone
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:  # pragma: no cover
+    ZoneInfo = None
+
+DEFAULT_TZ = "Europe/Warsaw"
+
+
+def safe_zoneinfo(tz_name: Optional[str]):
+    tz_name = tz_name or DEFAULT_TZ
+
+    if ZoneInfo is None:
+        return timezone.get_current_timezone()
+
+    try:
+        return ZoneInfo(tz_name)
+    except Exception:
+        try:
+            return ZoneInfo(DEFAULT_TZ)
+        except Exception:
+            return timezone.get_current_timezone()
+
+
+def fire_time_on(tz_name: Optional[str], hour: int, minute: int, local_date) -> datetime:
+    """UTC instant of hour:minute on local_date in the given timezone."""
+    tzinfo = safe_zoneinfo(tz_name)
+    local = datetime.combine(local_date, time(int(hour), int(minute)), tzinfo=tzinfo)
+    return local.astimezone(dt_timezone.utc)
+
+
+def next_fire_utc(tz_name: Optional[str], hour: int, minute: int, after: datetime) -> datetime:
+    """First UTC instant at or after `after` when the local clock shows hour:minute."""
+    tzinfo = safe_zoneinfo(tz_name)
+    local_date = after.astimezone(tzinfo).date()
+
+    # Two days always suffice; the third covers a wall time skipped by a DST jump.
+    for offset in range(3):
+        fire = fire_time_on(tz_name, hour, minute, local_date + timedelta(days=offset))
+        if fire >= after:
+            return fire
+    return fire
@@ -37,6 +37,7 @@ class ProfileSettingsSerializer(serializers.ModelSerializer):
             "tile_motive",
             "background",
             "fab_position",
+            "readings_retention_days",
         ]
 
     def validate_language(self, v):
@@ -1,108 +1,121 @@
 from __future__ import annotations
 
 import logging
-from datetime import timedelta
-from typing import Optional
+import secrets
+from datetime import date, datetime, timedelta
 
 from core.i18n import t
 
-from celery import shared_task
-from django.conf import settings
+from celery import group, shared_task
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError, models, transaction
+from django.core.cache import cache
+from django.db import models
 from django.utils import timezone
 
-try:
-    from zoneinfo import ZoneInfo
-except Exception:  # pragma: no cover
-    ZoneInfo = None
-
 from reminders.models import ReminderTask
-from core.emailing import send_templated_email
+from core.caching import delete_if_equal
+from core.emailing import build_templated_email, email_render_stats, send_email_batch
 from .models import ProfileNotifications, NotificationDeliveryLog, PushDevice
-from .push import send_fcm_multicast
-from .utils import build_reminders_link
+from .push_dispatch import PushDispatcher
+from .scheduling import safe_zoneinfo as _safe_zoneinfo
+from .utils import build_reminders_link, languages_for_users
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
-DEFAULT_TZ = "Europe/Warsaw"
-
-
-def _safe_zoneinfo(tz_name: Optional[str]):
-    tz_name = tz_name or DEFAULT_TZ
-
-    if ZoneInfo is None:
-        return timezone.get_current_timezone()
-
-    try:
-        return ZoneInfo(tz_name)
-    except Exception:
-        try:
-            return ZoneInfo(DEFAULT_TZ)
-        except Exception:
-            return timezone.get_current_timezone()
+# Fire times missed by up to this much (worker down, slow tick) are still sent.
+MISSED_FIRE_GRACE = timedelta(minutes=10)
+
+# Due users per send_daily_notifications_chunk subtask.
+NOTIFICATION_CHUNK_SIZE = 200
+
+TICK_LOCK_KEY = "profiles:daily-notifications:tick-lock"
+# Outlives any sane tick; only matters if a worker dies while holding the lock.
+TICK_LOCK_TTL = 5 * 60
+
+
+class _DueBatch:
+    """
+    Everything one chunk needs about a set of due users, loaded up front: pending
+    task counts per (user, due date), delivery logs already written, languages,
+    active Android tokens. Emails and pushes are queued and sent together at the end, and delivery
+    logs for what got sent are written in one go.
+    """
+
+    def __init__(self, user_ids, local_dates, push_user_ids=()):
+        user_ids = set(user_ids)
+        local_dates = set(local_dates)
+        due_dates = local_dates | {d - timedelta(days=1) for d in local_dates}
+
+        self.due_counts = {
+            (row["user_id"], row["due_date"]): row["count"]
+            for row in (
+                ReminderTask.objects
+                .filter(user_id__in=user_ids, status="pending", due_date__in=due_dates)
+                .order_by()
+                .values("user_id", "due_date")
+                .annotate(count=models.Count("id"))
+            )
+        }
+        self.sent = set(
+            NotificationDeliveryLog.objects
+            .filter(user_id__in=user_ids, local_date__in=local_dates)
+            .values_list("user_id", "channel", "kind", "local_date")
+        )
+        self.langs = languages_for_users(user_ids)
 
+        self.tokens: dict[int, list[str]] = {}
+        if push_user_ids:
+            for user_id, token in PushDevice.objects.filter(
+                user_id__in=set(push_user_ids),
+                is_active=True,
+                platform=PushDevice.PLATFORM_ANDROID,
+            ).values_list("user_id", "token"):
+                self.tokens.setdefault(user_id, []).append(token)
 
-def _matches_minute(now_local, hour: int, minute: int) -> bool:
-    try:
-        return now_local.hour == int(hour) and now_local.minute == int(minute)
-    except Exception:
-        return False
+        self.emails: list[tuple] = []
+        self.pushes = PushDispatcher()
+        self.logs: list[NotificationDeliveryLog] = []
 
+    def due_count(self, user_id: int, due_date) -> int:
+        return self.due_counts.get((user_id, due_date), 0)
 
-def _count_due_on_date(user_id: int, due_date) -> int:
-    return ReminderTask.objects.filter(
-        user_id=user_id,
-        status="pending",
-        due_date=due_date,
-    ).count()
+    def lang(self, user_id: int) -> str:
+        return self.langs[user_id]
 
+    def should_send(self, user_id: int, channel: str, kind: str, local_date) -> bool:
+        return (user_id, channel, kind, local_date) not in self.sent
 
-def _should_send(user_id: int, channel: str, kind: str, local_date) -> bool:
-    return not NotificationDeliveryLog.objects.filter(
-        user_id=user_id,
-        channel=channel,
-        kind=kind,
-        local_date=local_date,
-    ).exists()
+    def android_tokens(self, user_id: int) -> list[str]:
+        return self.tokens.get(user_id, [])
 
+    def queue_email(self, key: tuple, msg) -> None:
+        if msg is not None:
+            self.emails.append((key, msg))
 
-def _log_sent(user_id: int, channel: str, kind: str, local_date) -> None:
-    try:
-        with transaction.atomic():
-            NotificationDeliveryLog.objects.create(
-                user_id=user_id,
-                channel=channel,
-                kind=kind,
-                local_date=local_date,
-            )
-    except IntegrityError:
-        pass
-
+    def mark_sent(self, user_id: int, channel: str, kind: str, local_date) -> None:
+        self.sent.add((user_id, channel, kind, local_date))
+        self.logs.append(NotificationDeliveryLog(
+            user_id=user_id,
+            channel=channel,
+            kind=kind,
+            local_date=local_date,
+        ))
 
-def _get_user_lang(user) -> str:
-    default = getattr(settings, "EMAIL_DEFAULT_LANG", "en") or "en"
-    try:
-        ps = getattr(user, "profile_settings", None)
-        if ps and getattr(ps, "language", None):
-            lang = str(ps.language).strip().lower()
-            supported = set(getattr(settings, "SUPPORTED_LANGS", [])) or {default}
-            return lang if lang in supported else default
-    except Exception:
-        pass
-    return default
+    def write_logs(self) -> None:
+        if self.logs:
+            NotificationDeliveryLog.objects.bulk_create(self.logs, ignore_conflicts=True)
+            self.logs = []
 
 
-def _send_email_due_today(user, due_count: int) -> bool:
+def _build_email_due_today(user, due_count: int, lang: str):
     if not user.email:
-        return False
+        return None
 
-    lang = _get_user_lang(user)
     line1 = t("profiles.due_today.line1", lang=lang, default="").format(count=due_count)
     link = build_reminders_link()
 
-    send_templated_email(
+    return build_templated_email(
         to_email=user.email,
         subject_key="profiles.due_today.subject",
         template_name="profiles/due_today",
@@ -114,18 +127,16 @@ def _send_email_due_today(user, due_count: int) -> bool:
             "link": link,
         },
     )
-    return True
 
 
-def _send_email_overdue_1d(user, overdue_count: int) -> bool:
+def _build_email_overdue_1d(user, overdue_count: int, lang: str):
     if not user.email:
-        return False
+        return None
 
-    lang = _get_user_lang(user)
     line1 = t("profiles.overdue_1d.line1", lang=lang, default="").format(count=overdue_count)
     link = build_reminders_link()
 
-    send_templated_email(
+    return build_templated_email(
         to_email=user.email,
         subject_key="profiles.overdue_1d.subject",
         template_name="profiles/overdue_1d",
@@ -137,12 +148,9 @@ def _send_email_overdue_1d(user, overdue_count: int) -> bool:
             "link": link,
         },
     )
-    return True
-
 
-def _get_push_due_today_text(user, due_count: int) -> tuple[str, str]:
-    lang = _get_user_lang(user)
 
+def _get_push_due_today_text(lang: str, due_count: int) -> tuple[str, str]:
     title = t(
         "profiles.due_today.push_title",
         lang=lang,
@@ -158,9 +166,7 @@ def _get_push_due_today_text(user, due_count: int) -> tuple[str, str]:
     return title, body
 
 
-def _get_push_overdue_1d_text(user, overdue_count: int) -> tuple[str, str]:
-    lang = _get_user_lang(user)
-
+def _get_push_overdue_1d_text(lang: str, overdue_count: int) -> tuple[str, str]:
     title = t(
         "profiles.overdue_1d.push_title",
         lang=lang,
@@ -176,144 +182,261 @@ def _get_push_overdue_1d_text(user, overdue_count: int) -> tuple[str, str]:
     return title, body
 
 
-def _get_android_tokens(user_id: int) -> list[str]:
-    return list(
-        PushDevice.objects.filter(
-            user_id=user_id,
-            is_active=True,
-            platform=PushDevice.PLATFORM_ANDROID,
-        ).values_list("token", flat=True)
-    )
+def _queue_email_notifications(batch: _DueBatch, pn, user, local_date) -> None:
+    yesterday = local_date - timedelta(days=1)
+    channel = NotificationDeliveryLog.CHANNEL_EMAIL
 
+    if pn.email_daily:
+        if batch.should_send(user.id, channel, NotificationDeliveryLog.KIND_DUE_TODAY, local_date):
+            due_count = batch.due_count(user.id, local_date)
+            if due_count > 0:
+                batch.queue_email(
+                    (user.id, NotificationDeliveryLog.KIND_DUE_TODAY, local_date),
+                    _build_email_due_today(user, due_count, batch.lang(user.id)),
+                )
 
-def _looks_unregistered(exc: Exception) -> bool:
-    msg = str(exc).lower()
-    return (
-        "not registered" in msg
-        or "unregistered" in msg
-        or "registration-token-not-registered" in msg
-        or "requested entity was not found" in msg
-    )
+    if pn.email_24h:
+        if batch.should_send(user.id, channel, NotificationDeliveryLog.KIND_OVERDUE_1D, local_date):
+            overdue_count = batch.due_count(user.id, yesterday)
+            if overdue_count > 0:
+                batch.queue_email(
+                    (user.id, NotificationDeliveryLog.KIND_OVERDUE_1D, local_date),
+                    _build_email_overdue_1d(user, overdue_count, batch.lang(user.id)),
+                )
 
 
-def _send_push_and_deactivate_bad_tokens(tokens: list[str], title: str, body: str, data: dict[str, str]) -> int:
-    tokens = [t for t in tokens if t]
-    if not tokens:
-        return 0
+def _send_queued_emails(batch: _DueBatch) -> None:
+    keys = [key for key, _ in batch.emails]
+    results = send_email_batch([msg for _, msg in batch.emails])
+    batch.emails = []
 
-    try:
-        resp = send_fcm_multicast(tokens=tokens, title=title, body=body, data=data)
-    except Exception:
-        logger.exception("FCM multicast send raised")
-        return 0
+    for (user_id, kind, local_date), sent in zip(keys, results):
+        if sent:
+            batch.mark_sent(user_id, NotificationDeliveryLog.CHANNEL_EMAIL, kind, local_date)
+
+
+def _queue_push_notifications(batch: _DueBatch, pn, user, local_date, fire_utc) -> None:
+    yesterday = local_date - timedelta(days=1)
+    channel = NotificationDeliveryLog.CHANNEL_PUSH
+
+    if pn.push_daily:
+        should = batch.should_send(user.id, channel, NotificationDeliveryLog.KIND_DUE_TODAY, local_date)
+        due_count = batch.due_count(user.id, local_date) if should else 0
+        tokens = batch.android_tokens(user.id) if (should and due_count > 0) else []
+
+        logger.info(
+            "push_due_today user=%s tz=%s fire_utc=%s local_date=%s should_send=%s due=%s tokens=%s",
+            user.id,
+            pn.timezone,
+            fire_utc.isoformat(),
+            local_date,
+            should,
+            due_count,
+            len(tokens),
+        )
+
+        if should and due_count > 0:
+            title, body = _get_push_due_today_text(batch.lang(user.id), due_count)
+            batch.pushes.add(
+                (user.id, NotificationDeliveryLog.KIND_DUE_TODAY, local_date),
+                tokens=tokens,
+                title=title,
+                body=body,
+                data={"kind": "due_today", "route": "Home"},
+            )
+
+    if pn.push_24h:
+        if batch.should_send(user.id, channel, NotificationDeliveryLog.KIND_OVERDUE_1D, local_date):
+            overdue_count = batch.due_count(user.id, yesterday)
+            if overdue_count > 0:
+                title, body = _get_push_overdue_1d_text(batch.lang(user.id), overdue_count)
+                batch.pushes.add(
+                    (user.id, NotificationDeliveryLog.KIND_OVERDUE_1D, local_date),
+                    tokens=batch.android_tokens(user.id),
+                    title=title,
+                    body=body,
+                    data={"kind": "overdue_1d", "route": "Home"},
+                )
 
-    success_count = getattr(resp, "success_count", None)
-    responses = getattr(resp, "responses", None)
 
-    if success_count is None or responses is None:
-        logger.warning("FCM multicast response missing expected attrs: %r", resp)
-        return 0
+def _send_queued_pushes(batch: _DueBatch) -> None:
+    for (user_id, kind, local_date), sent in batch.pushes.flush().items():
+        logger.info("push_%s result user=%s sent=%s", kind, user_id, sent)
+        if sent > 0:
+            batch.mark_sent(user_id, NotificationDeliveryLog.CHANNEL_PUSH, kind, local_date)
 
-    bad_tokens: list[str] = []
-    for idx, r in enumerate(responses):
-        ok = getattr(r, "success", False)
-        exc = getattr(r, "exception", None)
-        if not ok and exc and _looks_unregistered(exc):
-            bad_tokens.append(tokens[idx])
 
-    if bad_tokens:
-        PushDevice.objects.filter(token__in=bad_tokens).update(is_active=False)
+def _advance_schedules(advances) -> None:
+    """
+    advances: (field, pk, fired_at, next_fire) tuples. Users sharing a fire time are
+    moved in one UPDATE, conditional on the value we read so a settings change saved
+    while the tick was sending keeps its freshly computed fire time.
+    """
+    groups: dict[tuple, list[int]] = {}
+    for field, pk, fired_at, next_fire in advances:
+        groups.setdefault((field, fired_at, next_fire), []).append(pk)
 
-    return int(success_count)
+    for (field, fired_at, next_fire), pks in groups.items():
+        ProfileNotifications.objects.filter(pk__in=pks, **{field: fired_at}).update(**{field: next_fire})
+
+
+def _send_due(sends) -> None:
+    """sends: (channel, pn, local_date, fire_utc) tuples for one chunk of users."""
+    if not sends:
+        return
+
+    batch = _DueBatch(
+        user_ids=[pn.user_id for _, pn, _, _ in sends],
+        local_dates=[local_date for _, _, local_date, _ in sends],
+        push_user_ids=[pn.user_id for channel, pn, _, _ in sends if channel == NotificationDeliveryLog.CHANNEL_PUSH],
+    )
+    render_before = email_render_stats()
+    try:
+        for channel, pn, local_date, fire_utc in sends:
+            if channel == NotificationDeliveryLog.CHANNEL_EMAIL:
+                _queue_email_notifications(batch, pn, pn.user, local_date)
+            else:
+                _queue_push_notifications(batch, pn, pn.user, local_date, fire_utc)
+
+        render_after = email_render_stats()
+        logger.info(
+            "daily notification chunk users=%s emails=%s rendered=%s render_ms=%.1f compile_ms=%.1f",
+            len({pn.user_id for _, pn, _, _ in sends}),
+            len(batch.emails),
+            render_after["rendered"] - render_before["rendered"],
+            (render_after["render_seconds"] - render_before["render_seconds"]) * 1000,
+            (render_after["compile_seconds"] - render_before["compile_seconds"]) * 1000,
+        )
+        # The chunk's emails share one SMTP connection; identical pushes go out
+        # as shared multicasts.
+        _send_queued_emails(batch)
+        _send_queued_pushes(batch)
+    finally:
+        batch.write_logs()
 
 
 @shared_task(bind=True, ignore_result=True)
-def check_and_send_daily_task_notifications(self):
+def send_daily_notifications_chunk(self, sends):
+    """
+    Send the daily notifications for one chunk of due users.
+
+    sends: [profile_notifications_id, channel, local_date ISO, fire time ISO] rows,
+    as dispatched by check_and_send_daily_task_notifications. Settings are re-read,
+    so a channel switched off since the tick is skipped; delivery logs keep a
+    redelivered chunk from sending twice.
+    """
+    notifications = (
+        ProfileNotifications.objects
+        .select_related("user")
+        .only(
+            "id", "timezone",
+            "email_daily", "email_24h",
+            "push_daily", "push_24h",
+            "user__id", "user__email",
+        )
+        .in_bulk({row[0] for row in sends})
+    )
+
+    due = []
+    for pn_id, channel, local_date, fire_utc in sends:
+        pn = notifications.get(pn_id)
+        if pn is None:  # user deleted since the tick
+            continue
+        due.append((channel, pn, date.fromisoformat(local_date), datetime.fromisoformat(fire_utc)))
+
+    _send_due(due)
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _dispatch_due_notifications() -> int:
+    """
+    Select the due users, hand them to send_daily_notifications_chunk in chunks of
+    NOTIFICATION_CHUNK_SIZE users and advance their schedules. Returns the number
+    of dispatched chunks.
+    """
     now_utc = timezone.now()
+    window_end = now_utc.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    oldest_sendable = window_end - timedelta(minutes=1) - MISSED_FIRE_GRACE
 
     notif_qs = (
         ProfileNotifications.objects
-        .select_related("user")
         .filter(
-            models.Q(email_daily=True) |
-            models.Q(push_daily=True) |
-            models.Q(email_24h=True) |
-            models.Q(push_24h=True)
+            models.Q(email_next_fire_utc__lt=window_end) |
+            models.Q(push_next_fire_utc__lt=window_end)
         )
         .only(
-            "id", "timezone",
+            "id", "user", "timezone",
             "email_daily", "email_24h", "email_hour", "email_minute",
             "push_daily", "push_24h", "push_hour", "push_minute",
-            "user__id", "user__email",
+            "email_next_fire_utc", "push_next_fire_utc",
         )
+        .order_by("id")
     )
 
+    sends_by_pn: dict[int, list] = {}
+    advances = []  # (field, pk, fired_at, next_fire)
     for pn in notif_qs:
         tzinfo = _safe_zoneinfo(pn.timezone)
-        now_local = now_utc.astimezone(tzinfo)
-        local_date = now_local.date()
-        yesterday = local_date - timedelta(days=1)
-
-        user = pn.user
-
-        email_time_match = _matches_minute(now_local, pn.email_hour, pn.email_minute)
-        push_time_match = _matches_minute(now_local, pn.push_hour, pn.push_minute)
-
-        if pn.email_daily and email_time_match:
-            if _should_send(user.id, NotificationDeliveryLog.CHANNEL_EMAIL, NotificationDeliveryLog.KIND_DUE_TODAY, local_date):
-                due_count = _count_due_on_date(user.id, local_date)
-                if due_count > 0 and _send_email_due_today(user, due_count):
-                    _log_sent(user.id, NotificationDeliveryLog.CHANNEL_EMAIL, NotificationDeliveryLog.KIND_DUE_TODAY, local_date)
-
-        if pn.email_24h and email_time_match:
-            if _should_send(user.id, NotificationDeliveryLog.CHANNEL_EMAIL, NotificationDeliveryLog.KIND_OVERDUE_1D, local_date):
-                overdue_count = _count_due_on_date(user.id, yesterday)
-                if overdue_count > 0 and _send_email_overdue_1d(user, overdue_count):
-                    _log_sent(user.id, NotificationDeliveryLog.CHANNEL_EMAIL, NotificationDeliveryLog.KIND_OVERDUE_1D, local_date)
-
-        if pn.push_daily and push_time_match:
-            should = _should_send(user.id, NotificationDeliveryLog.CHANNEL_PUSH, NotificationDeliveryLog.KIND_DUE_TODAY, local_date)
-            due_count = _count_due_on_date(user.id, local_date) if should else 0
-            tokens = _get_android_tokens(user.id) if (should and due_count > 0) else []
-
-            logger.info(
-                "push_due_today user=%s tz=%s now_local=%s local_date=%s match=%s should_send=%s due=%s tokens=%s",
-                user.id,
-                pn.timezone,
-                now_local.isoformat(),
-                local_date,
-                push_time_match,
-                should,
-                due_count,
-                len(tokens),
-            )
 
-            if should and due_count > 0:
-                title, body = _get_push_due_today_text(user, due_count)
+        email_fire = pn.email_next_fire_utc
+        if email_fire is not None and email_fire < window_end:
+            if email_fire >= oldest_sendable:
+                sends_by_pn.setdefault(pn.pk, []).append([
+                    pn.pk, NotificationDeliveryLog.CHANNEL_EMAIL,
+                    email_fire.astimezone(tzinfo).date().isoformat(), email_fire.isoformat(),
+                ])
+            else:
+                logger.warning("daily email fire missed user=%s fire_utc=%s", pn.user_id, email_fire.isoformat())
+            advances.append(("email_next_fire_utc", pn.pk, email_fire, pn.next_email_fire(after=window_end)))
+
+        push_fire = pn.push_next_fire_utc
+        if push_fire is not None and push_fire < window_end:
+            if push_fire >= oldest_sendable:
+                sends_by_pn.setdefault(pn.pk, []).append([
+                    pn.pk, NotificationDeliveryLog.CHANNEL_PUSH,
+                    push_fire.astimezone(tzinfo).date().isoformat(), push_fire.isoformat(),
+                ])
+            else:
+                logger.warning("daily push fire missed user=%s fire_utc=%s", pn.user_id, push_fire.isoformat())
+            advances.append(("push_next_fire_utc", pn.pk, push_fire, pn.next_push_fire(after=window_end)))
+
+    chunks = [
+        [row for user_sends in chunk for row in user_sends]
+        for chunk in _chunks(list(sends_by_pn.values()), NOTIFICATION_CHUNK_SIZE)
+    ]
+    if chunks:
+        group(send_daily_notifications_chunk.s(chunk) for chunk in chunks).apply_async()
+
+    _advance_schedules(advances)
+    return len(chunks)
 
-                sent = _send_push_and_deactivate_bad_tokens(
-                    tokens=tokens,
-                    title=title,
-                    body=body,
-                    data={"kind": "due_today", "route": "Home"},
-                )
-                logger.info("push_due_today result user=%s sent=%s", user.id, sent)
-
-                if sent > 0:
-                    _log_sent(user.id, NotificationDeliveryLog.CHANNEL_PUSH, NotificationDeliveryLog.KIND_DUE_TODAY, local_date)
-
-        if pn.push_24h and push_time_match:
-            if _should_send(user.id, NotificationDeliveryLog.CHANNEL_PUSH, NotificationDeliveryLog.KIND_OVERDUE_1D, local_date):
-                overdue_count = _count_due_on_date(user.id, yesterday)
-                if overdue_count > 0:
-                    tokens = _get_android_tokens(user.id)
-                    title, body = _get_push_overdue_1d_text(user, overdue_count)
-
-                    sent = _send_push_and_deactivate_bad_tokens(
-                        tokens=tokens,
-                        title=title,
-                        body=body,
-                        data={"kind": "overdue_1d", "route": "Home"},
-                    )
-                    if sent > 0:
-                        _log_sent(user.id, NotificationDeliveryLog.CHANNEL_PUSH, NotificationDeliveryLog.KIND_OVERDUE_1D, local_date)
+
+@shared_task(bind=True, ignore_result=True)
+def check_and_send_daily_task_notifications(self):
+    """
+    Runs every minute. Picks the users whose email/push fire time falls before the
+    end of the current minute (one range query on the indexed next-fire columns),
+    fans the sending out to send_daily_notifications_chunk subtasks and moves each
+    fired channel to its next local occurrence.
+
+    A cache lock (atomic cache.add, Redis in production) keeps an overrunning tick
+    and the next one from selecting the same users; the skipped tick's users are
+    picked up by the following one, within MISSED_FIRE_GRACE.
+    """
+    lock_token = secrets.randbits(62)
+    if not cache.add(TICK_LOCK_KEY, lock_token, TICK_LOCK_TTL):
+        logger.warning("daily notification tick skipped: previous tick still running")
+        return
+
+    try:
+        chunks = _dispatch_due_notifications()
+        if chunks:
+            logger.info("daily notification tick dispatched chunks=%s", chunks)
+    finally:
+        # Compare-and-delete in one step: if this tick outran TICK_LOCK_TTL, the
+        # lock may already belong to the next tick.
+        delete_if_equal(cache, TICK_LOCK_KEY, lock_token)
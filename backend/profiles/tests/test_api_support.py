@@ -6,6 +6,8 @@ from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 
+from core.models import OutboundMessage
+from core.outbox import drain_outbox
 from profiles.models import SupportMessage
 
 User = get_user_model()
@@ -23,7 +25,7 @@ def test_support_contact_requires_authentication():
 
 @pytest.mark.django_db
 @override_settings(SUPPORT_INBOX_EMAIL="support@example.com")
-@patch("profiles.views_support.send_templated_email")
+@patch("profiles.views_support.enqueue_templated_email")
 def test_support_contact_creates_message_and_sends_admin_and_user_copy(mock_send):
     user = User.objects.create_user(
         email="test@example.com",
@@ -64,7 +66,7 @@ def test_support_contact_creates_message_and_sends_admin_and_user_copy(mock_send
 
 @pytest.mark.django_db
 @override_settings(SUPPORT_INBOX_EMAIL="support@example.com")
-@patch("profiles.views_support.send_templated_email")
+@patch("profiles.views_support.enqueue_templated_email")
 def test_support_contact_can_skip_user_copy(mock_send):
     user = User.objects.create_user(
         email="test@example.com",
@@ -111,7 +113,7 @@ def test_support_contact_rejects_blank_message():
 
 @pytest.mark.django_db
 @override_settings(SUPPORT_INBOX_EMAIL="", DEFAULT_FROM_EMAIL="fallback@example.com")
-@patch("profiles.views_support.send_templated_email")
+@patch("profiles.views_support.enqueue_templated_email")
 def test_support_contact_falls_back_to_default_from_email(mock_send):
     user = User.objects.create_user(
         email="test@example.com",
@@ -157,7 +159,7 @@ def test_support_contact_returns_500_when_no_support_email_is_configured():
 
 @pytest.mark.django_db
 @override_settings(SUPPORT_INBOX_EMAIL="support@example.com")
-@patch("profiles.views_support.send_templated_email")
+@patch("profiles.views_support.enqueue_templated_email")
 def test_support_bug_creates_message_and_sends_emails(mock_send):
     user = User.objects.create_user(
         email="test@example.com",
@@ -194,7 +196,7 @@ def test_support_bug_creates_message_and_sends_emails(mock_send):
 
 @pytest.mark.django_db
 @override_settings(SUPPORT_INBOX_EMAIL="support@example.com")
-@patch("profiles.views_support.send_templated_email")
+@patch("profiles.views_support.enqueue_templated_email")
 def test_support_bug_returns_500_if_email_send_fails(mock_send):
     user = User.objects.create_user(
         email="test@example.com",
@@ -217,3 +219,30 @@ def test_support_bug_returns_500_if_email_send_fails(mock_send):
     assert response.status_code == 500
     assert data["status"] == "error"
     assert data["message"] == "Failed to send bug report email."
+    # The message is written in the same transaction as the outbox rows.
+    assert not SupportMessage.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+@override_settings(SUPPORT_INBOX_EMAIL="support@example.com")
+def test_support_contact_queues_emails_in_outbox_instead_of_sending(mailoutbox):
+    user = User.objects.create_user(
+        email="test@example.com",
+        password="strong-password-123",
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post(
+        reverse("profile-support-contact"),
+        data={"subject": "Help", "message": "Please help.", "copy_to_user": True},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert mailoutbox == []
+    assert [row.to for row in OutboundMessage.objects.all()] == [["support@example.com"], ["test@example.com"]]
+
+    drain_outbox()
+    assert [message.to for message in mailoutbox] == [["support@example.com"], ["test@example.com"]]
+    assert mailoutbox[0].reply_to == ["test@example.com"]
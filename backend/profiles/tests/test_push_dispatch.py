@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from profiles.models import PushDevice
+from profiles.push_dispatch import PushDispatcher
+
+User = get_user_model()
+
+
+def _fake_multicast(tokens, title, body, data):
+    return SimpleNamespace(responses=[
+        SimpleNamespace(success=False, exception=Exception("Requested entity was not found."))
+        if token.startswith("stale") else SimpleNamespace(success=True, exception=None)
+        for token in tokens
+    ])
+
+
+@pytest.mark.django_db
+@patch("profiles.push_dispatch.send_fcm_multicast", side_effect=_fake_multicast)
+def test_dispatcher_groups_identical_payloads_across_users(mock_fcm):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    PushDevice.objects.create(user=user, token="stale-1")
+    PushDevice.objects.create(user=user, token="ok-1")
+
+    dispatcher = PushDispatcher(batch_size=3)
+    data = {"kind": "due_today", "route": "Home"}
+    dispatcher.add("a", ["ok-1", "stale-1"], "Plant tasks", "You have 1 task", data)
+    dispatcher.add("b", ["ok-2", ""], "Plant tasks", "You have 1 task", dict(reversed(data.items())))
+    dispatcher.add("c", ["ok-3"], "Plant tasks", "You have 1 task", data)
+    dispatcher.add("d", ["ok-4"], "Plant tasks", "You have 2 tasks", data)
+
+    sent = dispatcher.flush()
+
+    assert sent == {"a": 1, "b": 1, "c": 1, "d": 1}
+    # 4 tokens of the first payload in batches of 3, plus the second payload.
+    assert [len(call.kwargs["tokens"]) for call in mock_fcm.call_args_list] == [3, 1, 1]
+    assert list(PushDevice.objects.filter(is_active=False).values_list("token", flat=True)) == ["stale-1"]
+    assert dispatcher.flush() == {}
+
+
+@pytest.mark.django_db
+@patch("profiles.push_dispatch.send_fcm_multicast", side_effect=RuntimeError("FCM down"))
+def test_dispatcher_reports_zero_for_failed_multicast(mock_fcm):
+    dispatcher = PushDispatcher()
+    dispatcher.add("a", ["token"], "Title", "Body")
+
+    assert dispatcher.flush() == {"a": 0}
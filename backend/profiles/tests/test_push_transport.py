@@ -0,0 +1,51 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import override_settings
+
+from profiles import push
+from profiles.fcm_stub import StubFcmServer
+from profiles.push import AsyncPushTransport, SdkPushTransport, ThreadPoolPushTransport, looks_unregistered
+
+
+@pytest.fixture
+def stub():
+    with StubFcmServer(latency=0.01) as server:
+        yield server
+
+
+@pytest.mark.parametrize("transport_cls", [ThreadPoolPushTransport, AsyncPushTransport])
+def test_http_transport_maps_results_and_bounds_concurrency(stub, transport_cls):
+    transport = transport_cls(endpoint=stub.url, project_id="stub", service_account_path="", max_concurrency=4)
+    tokens = [f"token-{i}" for i in range(18)] + ["unregistered-1", "unregistered-2"]
+    try:
+        first = transport.send_multicast(tokens, "Plant tasks", "You have 1 task", {"kind": "due_today"})
+        second = transport.send_multicast(tokens[:8], "Plant tasks", "You have 1 task", {})
+    finally:
+        transport.close()
+
+    assert (first.success_count, first.failure_count) == (18, 2)
+    assert [r.success for r in first.responses[-3:]] == [True, False, False]
+    assert looks_unregistered(first.responses[-1].exception)
+    assert second.success_count == 8
+    assert stub.requests == 28
+    assert stub.max_in_flight <= 4
+    # Connections are kept alive and reused across calls.
+    assert stub.connections <= 4
+
+
+def test_push_transport_follows_settings(monkeypatch):
+    monkeypatch.setattr(push, "_transport", None)
+    with override_settings(PUSH_TRANSPORT="sdk"):
+        assert isinstance(push.get_push_transport(), SdkPushTransport)
+
+    monkeypatch.setattr(push, "_transport", None)
+    with override_settings(PUSH_TRANSPORT="carrier-pigeon"):
+        with pytest.raises(ImproperlyConfigured):
+            push.get_push_transport()
+
+
+def test_push_benchmark_command_runs_against_stub(capsys):
+    call_command("push_benchmark", transport=["async"], tokens=20, concurrency=4, latency_ms=0)
+
+    assert "async" in capsys.readouterr().out
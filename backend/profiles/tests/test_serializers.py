@@ -194,3 +194,11 @@ def test_support_bug_serializer_rejects_blank_description():
 
     assert serializer.is_valid() is False
     assert "description" in serializer.errors
+
+
+@pytest.mark.parametrize("value", [3, 5000, "forever"])
+def test_profile_settings_serializer_rejects_invalid_readings_retention_days(value):
+    serializer = ProfileSettingsSerializer(data={"readings_retention_days": value}, partial=True)
+
+    assert serializer.is_valid() is False
+    assert "readings_retention_days" in serializer.errors
@@ -0,0 +1,190 @@
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from app.celery import celery_app
+
+from locations.models import Location
+from plant_instances.models import PlantInstance
+from profiles.models import NotificationDeliveryLog, ProfileNotifications
+from profiles.scheduling import next_fire_utc
+from profiles.tasks import TICK_LOCK_KEY, check_and_send_daily_task_notifications
+from reminders.models import Reminder, ReminderTask
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def eager_chunks():
+    # Run the dispatched chunk subtasks inline.
+    cache.clear()
+    celery_app.conf.task_always_eager = True
+    yield
+    celery_app.conf.task_always_eager = False
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+def _user_with_pending_task(email, due_date):
+    user = User.objects.create_user(email=email, password="strong-password-123")
+    location = Location.objects.create(user=user, name="Living room", category="indoor")
+    plant = PlantInstance.objects.create(user=user, location=location, display_name="Monstera")
+    reminder = Reminder.objects.create(
+        user=user, plant=plant, type="water", start_date=due_date, interval_value=7,
+    )
+    ReminderTask.objects.create(reminder=reminder, user=user, due_date=due_date, status="pending")
+    return user
+
+
+def _schedule(user, after, **fields):
+    pn = user.profile_notifications
+    for name, value in fields.items():
+        setattr(pn, name, value)
+    pn.save(update_fields=list(fields))
+    # Saving schedules from the real clock; pin it to the test's timeline instead.
+    pn.reschedule(after=after)
+    pn.save(update_fields=ProfileNotifications.NEXT_FIRE_FIELDS)
+    return pn
+
+
+def test_next_fire_follows_local_clock_across_dst():
+    # Europe/Warsaw switches to CEST at 02:00 on 2026-03-29.
+    assert next_fire_utc("Europe/Warsaw", 12, 0, _utc(2026, 3, 28, 9)) == _utc(2026, 3, 28, 11)
+    assert next_fire_utc("Europe/Warsaw", 12, 0, _utc(2026, 3, 28, 11, 0, 1)) == _utc(2026, 3, 29, 10)
+    # 02:30 does not exist that night; it fires an hour into the new offset.
+    assert next_fire_utc("Europe/Warsaw", 2, 30, _utc(2026, 3, 28, 12)) == _utc(2026, 3, 29, 1, 30)
+    assert next_fire_utc("Not/AZone", 12, 0, _utc(2026, 7, 1, 0)) == _utc(2026, 7, 1, 10)
+
+
+@pytest.mark.django_db
+def test_saving_schedule_fields_recomputes_next_fire():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    pn = user.profile_notifications
+    assert pn.email_next_fire_utc is not None
+    assert pn.push_next_fire_utc is not None
+
+    pn.push_daily = False
+    pn.push_24h = False
+    pn.email_hour = 7
+    pn.save(update_fields=["push_daily", "push_24h", "email_hour"])
+
+    pn.refresh_from_db()
+    assert pn.push_next_fire_utc is None
+    assert pn.email_next_fire_utc == next_fire_utc(pn.timezone, 7, 0, pn.updated_at)
+
+
+@pytest.mark.django_db
+def test_saving_without_schedule_changes_keeps_next_fire():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    pn = _schedule(user, _utc(2026, 3, 28, 10), email_hour=18)
+
+    pn = ProfileNotifications.objects.get(user=user)
+    pn.email_hour = 18
+    pn.save()
+    pn.save(update_fields=["email_hour", "push_minute"])
+
+    pn.refresh_from_db()
+    assert pn.email_next_fire_utc == _utc(2026, 3, 28, 17)
+    assert pn.push_next_fire_utc == _utc(2026, 3, 28, 11)
+
+
+@pytest.mark.django_db
+def test_tick_sends_due_email_and_advances_schedule(mailoutbox):
+    now = _utc(2026, 3, 28, 11, 0, 20)
+    user = _user_with_pending_task("due@example.com", date(2026, 3, 28))
+    _schedule(user, _utc(2026, 3, 28, 10), email_hour=12, email_minute=0, push_daily=False)
+    idle = User.objects.create_user(email="idle@example.com", password="strong-password-123")
+    _schedule(idle, _utc(2026, 3, 28, 10), email_hour=18, email_minute=0, push_daily=False)
+
+    with patch("profiles.tasks.timezone.now", return_value=now):
+        check_and_send_daily_task_notifications.apply()
+        check_and_send_daily_task_notifications.apply()
+
+    assert [message.to for message in mailoutbox] == [["due@example.com"]]
+    assert NotificationDeliveryLog.objects.filter(
+        user=user, channel="email", kind="due_today", local_date=date(2026, 3, 28)
+    ).exists()
+
+    pn = ProfileNotifications.objects.get(user=user)
+    # The next day is already on summer time.
+    assert pn.email_next_fire_utc == _utc(2026, 3, 29, 10)
+    assert ProfileNotifications.objects.get(user=idle).email_next_fire_utc == _utc(2026, 3, 28, 17)
+
+
+@pytest.mark.django_db
+def test_tick_skips_fire_times_older_than_grace(mailoutbox):
+    user = _user_with_pending_task("late@example.com", date(2026, 3, 28))
+    _schedule(user, _utc(2026, 3, 28, 6), email_hour=8, email_minute=0, push_daily=False)
+
+    with patch("profiles.tasks.timezone.now", return_value=_utc(2026, 3, 28, 11)):
+        check_and_send_daily_task_notifications.apply()
+
+    assert mailoutbox == []
+    assert ProfileNotifications.objects.get(user=user).email_next_fire_utc == _utc(2026, 3, 29, 6)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("due_users", [1, 4])
+@patch("profiles.push_dispatch.send_fcm_multicast")
+def test_tick_query_count_does_not_grow_with_due_users(mock_fcm, due_users, django_assert_num_queries, mailoutbox):
+    mock_fcm.side_effect = lambda tokens, **kwargs: SimpleNamespace(
+        responses=[SimpleNamespace(success=True, exception=None) for _ in tokens],
+    )
+    for idx in range(due_users):
+        user = _user_with_pending_task(f"user{idx}@example.com", date(2026, 3, 28))
+        user.push_devices.create(token=f"token-{idx}")
+        _schedule(user, _utc(2026, 3, 28, 10), email_hour=12, push_hour=12, email_24h=True, push_24h=True)
+
+    # tick: due-set select, one schedule update per channel;
+    # chunk: settings, task counts, delivery logs, languages, push tokens, log insert
+    with patch("profiles.tasks.timezone.now", return_value=_utc(2026, 3, 28, 11)):
+        with django_assert_num_queries(9):
+            check_and_send_daily_task_notifications.apply()
+
+    assert len(mailoutbox) == due_users
+    # Every user gets the same "1 task due" push, so they share one multicast.
+    assert mock_fcm.call_count == 1
+    assert len(mock_fcm.call_args.kwargs["tokens"]) == due_users
+    assert NotificationDeliveryLog.objects.count() == 2 * due_users
+
+
+@pytest.mark.django_db
+@patch("profiles.tasks.NOTIFICATION_CHUNK_SIZE", 2)
+@patch("profiles.tasks.group")
+def test_tick_dispatches_due_users_in_chunks(mock_group):
+    for idx in range(5):
+        user = User.objects.create_user(email=f"user{idx}@example.com", password="strong-password-123")
+        _schedule(user, _utc(2026, 3, 28, 10), email_hour=12, push_hour=12)
+
+    with patch("profiles.tasks.timezone.now", return_value=_utc(2026, 3, 28, 11)):
+        check_and_send_daily_task_notifications.apply()
+
+    mock_group.return_value.apply_async.assert_called_once()
+    chunks = [signature.args[0] for signature in mock_group.call_args.args[0]]
+    assert [len({row[0] for row in chunk}) for chunk in chunks] == [2, 2, 1]
+    assert sum(len(chunk) for chunk in chunks) == 10
+    assert not cache.get(TICK_LOCK_KEY)
+
+
+@pytest.mark.django_db
+def test_tick_is_skipped_while_previous_tick_holds_lock(mailoutbox):
+    user = _user_with_pending_task("due@example.com", date(2026, 3, 28))
+    _schedule(user, _utc(2026, 3, 28, 10), email_hour=12, email_minute=0, push_daily=False)
+    cache.add(TICK_LOCK_KEY, "other-tick", 60)
+
+    with patch("profiles.tasks.timezone.now", return_value=_utc(2026, 3, 28, 11)):
+        check_and_send_daily_task_notifications.apply()
+    assert mailoutbox == []
+    assert ProfileNotifications.objects.get(user=user).email_next_fire_utc == _utc(2026, 3, 28, 11)
+
+    cache.delete(TICK_LOCK_KEY)
+    with patch("profiles.tasks.timezone.now", return_value=_utc(2026, 3, 28, 11, 1)):
+        check_and_send_daily_task_notifications.apply()
+    assert len(mailoutbox) == 1
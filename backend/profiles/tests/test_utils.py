@@ -1,6 +1,11 @@
+import pytest
+from django.contrib.auth import get_user_model
 from django.test import override_settings
 
-from profiles.utils import build_mobile_deeplink, build_reminders_link, build_web_fallback
+from profiles.models import ProfileSettings
+from profiles.utils import build_mobile_deeplink, build_reminders_link, build_web_fallback, languages_for_users
+
+User = get_user_model()
 
 
 @override_settings(DEEP_LINK_SCHEME="flovers", DEEP_LINK_HOST="")
@@ -43,3 +48,21 @@ def test_build_reminders_link_uses_mobile_deeplink_when_deeplink_disabled():
     link = build_reminders_link()
 
     assert link == "flovers://home"
+
+
+@pytest.mark.django_db
+@override_settings(SUPPORTED_LANGS=["en", "pl"], EMAIL_DEFAULT_LANG="en")
+def test_languages_for_users_resolves_many_users_in_one_query(django_assert_num_queries):
+    polish = User.objects.create_user(email="pl@example.com", password="strong-password-123")
+    german = User.objects.create_user(email="de@example.com", password="strong-password-123")
+    bare = User.objects.create_user(email="bare@example.com", password="strong-password-123")
+    ProfileSettings.objects.filter(user=polish).update(language="pl")
+    ProfileSettings.objects.filter(user=german).update(language="de")
+    ProfileSettings.objects.filter(user=bare).delete()
+
+    with django_assert_num_queries(1):
+        langs = languages_for_users([polish.id, german.id, bare.id])
+
+    assert langs == {polish.id: "pl", german.id: "en", bare.id: "en"}
+    with django_assert_num_queries(0):
+        assert languages_for_users([]) == {}
@@ -2,6 +2,10 @@ from urllib.parse import urlencode
 
 from django.conf import settings
 
+from core.i18n import supported_lang
+
+from .models import ProfileSettings
+
 
 def _deeplink_base() -> str:
     scheme = getattr(settings, "DEEP_LINK_SCHEME", "flovers").strip()
@@ -37,4 +41,17 @@ def build_reminders_link() -> str:
     """
     if getattr(settings, "DEEP_LINK_ENABLED", True):
         return build_web_fallback("home", {})
-    return build_mobile_deeplink("home", {})
\ No newline at end of file
+    return build_mobile_deeplink("home", {})
+
+
+def languages_for_users(user_ids) -> dict[int, str]:
+    """
+    {user_id: supported language} for many users in one query; users without
+    profile settings get the default email language.
+    """
+    user_ids = set(user_ids)
+    langs = dict.fromkeys(user_ids, supported_lang(None))
+    if user_ids:
+        for user_id, language in ProfileSettings.objects.filter(user_id__in=user_ids).values_list("user_id", "language"):
+            langs[user_id] = supported_lang(language)
+    return langs
@@ -3,11 +3,12 @@ from __future__ import annotations
 import logging
 
 from django.conf import settings
+from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework import status
 
-from core.emailing import send_templated_email
+from core.outbox import enqueue_templated_email
 from .models import SupportMessage
 from .views import ok, err
 from .serializers_support import SupportContactSerializer, SupportBugSerializer
@@ -48,16 +49,6 @@ class SupportContactView(APIView):
         body = ser.validated_data["message"]
         copy_to_user = ser.validated_data.get("copy_to_user", True)
 
-        SupportMessage.objects.create(
-            user=request.user,
-            kind=SupportMessage.KIND_CONTACT,
-            subject=subject,
-            body=body,
-            copy_to_user=copy_to_user,
-            user_email=request.user.email or "",
-            user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:255],
-        )
-
         admin_email = _support_admin_email()
         if not admin_email:
             return err("Support inbox is not configured.", code=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -65,34 +56,45 @@ class SupportContactView(APIView):
         user_lang = _get_user_lang(request.user)
 
         try:
-            send_templated_email(
-                to_email=admin_email,
-                template_name="profiles/support_contact_admin",
-                subject_key="profiles.support_contact_admin.subject",
-                lang=ADMIN_LANG,
-                reply_to=[request.user.email] if request.user.email else None,
-                context={
-                    "user": request.user,
-                    "subject": subject,
-                    "body": body,
-                },
-            )
-
-            if copy_to_user and request.user.email:
-                send_templated_email(
-                    to_email=request.user.email,
-                    template_name="profiles/support_copy",
-                    subject_key="profiles.support_copy.subject",
-                    lang=user_lang,
+            with transaction.atomic():
+                SupportMessage.objects.create(
+                    user=request.user,
+                    kind=SupportMessage.KIND_CONTACT,
+                    subject=subject,
+                    body=body,
+                    copy_to_user=copy_to_user,
+                    user_email=request.user.email or "",
+                    user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:255],
+                )
+
+                enqueue_templated_email(
+                    to_email=admin_email,
+                    template_name="profiles/support_contact_admin",
+                    subject_key="profiles.support_contact_admin.subject",
+                    lang=ADMIN_LANG,
+                    reply_to=[request.user.email] if request.user.email else None,
                     context={
                         "user": request.user,
                         "subject": subject,
                         "body": body,
-                        "kind": "contact",
                     },
                 )
+
+                if copy_to_user and request.user.email:
+                    enqueue_templated_email(
+                        to_email=request.user.email,
+                        template_name="profiles/support_copy",
+                        subject_key="profiles.support_copy.subject",
+                        lang=user_lang,
+                        context={
+                            "user": request.user,
+                            "subject": subject,
+                            "body": body,
+                            "kind": "contact",
+                        },
+                    )
         except Exception:
-            logger.exception("SupportContactView email send failed user=%s", request.user.id)
+            logger.exception("SupportContactView email enqueue failed user=%s", request.user.id)
             return err("Failed to send support email.", code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         return ok("Message sent.", data={}, code=status.HTTP_200_OK)
@@ -112,16 +114,6 @@ class SupportBugView(APIView):
         description = ser.validated_data["description"]
         copy_to_user = ser.validated_data.get("copy_to_user", True)
 
-        SupportMessage.objects.create(
-            user=request.user,
-            kind=SupportMessage.KIND_BUG,
-            subject=subject,
-            body=description,
-            copy_to_user=copy_to_user,
-            user_email=request.user.email or "",
-            user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:255],
-        )
-
         admin_email = _support_admin_email()
         if not admin_email:
             return err("Support inbox is not configured.", code=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -136,35 +128,46 @@ class SupportBugView(APIView):
         }
 
         try:
-            send_templated_email(
-                to_email=admin_email,
-                template_name="profiles/support_bug_admin",
-                subject_key="profiles.support_bug_admin.subject",
-                lang=ADMIN_LANG,
-                reply_to=[request.user.email] if request.user.email else None,
-                context={
-                    "user": request.user,
-                    "subject": subject,
-                    "body": description,
-                    "meta": meta,
-                },
-            )
-
-            if copy_to_user and request.user.email:
-                send_templated_email(
-                    to_email=request.user.email,
-                    template_name="profiles/support_copy",
-                    subject_key="profiles.support_copy.subject",
-                    lang=user_lang,
+            with transaction.atomic():
+                SupportMessage.objects.create(
+                    user=request.user,
+                    kind=SupportMessage.KIND_BUG,
+                    subject=subject,
+                    body=description,
+                    copy_to_user=copy_to_user,
+                    user_email=request.user.email or "",
+                    user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:255],
+                )
+
+                enqueue_templated_email(
+                    to_email=admin_email,
+                    template_name="profiles/support_bug_admin",
+                    subject_key="profiles.support_bug_admin.subject",
+                    lang=ADMIN_LANG,
+                    reply_to=[request.user.email] if request.user.email else None,
                     context={
                         "user": request.user,
                         "subject": subject,
                         "body": description,
-                        "kind": "bug",
+                        "meta": meta,
                     },
                 )
+
+                if copy_to_user and request.user.email:
+                    enqueue_templated_email(
+                        to_email=request.user.email,
+                        template_name="profiles/support_copy",
+                        subject_key="profiles.support_copy.subject",
+                        lang=user_lang,
+                        context={
+                            "user": request.user,
+                            "subject": subject,
+                            "body": description,
+                            "kind": "bug",
+                        },
+                    )
         except Exception:
-            logger.exception("SupportBugView email send failed user=%s", request.user.id)
+            logger.exception("SupportBugView email enqueue failed user=%s", request.user.id)
             return err("Failed to send bug report email.", code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         return ok("Bug report sent.", data={}, code=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ReadingDevice, Reading, AccountSecret
+from .models import ReadingDevice, Reading, AccountSecret, ReadingRollup
 
 @admin.register(ReadingDevice)
 class ReadingDeviceAdmin(admin.ModelAdmin):
@@ -17,3 +17,8 @@ class ReadingAdmin(admin.ModelAdmin):
 class AccountSecretAdmin(admin.ModelAdmin):
     list_display = ("user", "rotated_at")
     search_fields = ("user__email",)
+
+@admin.register(ReadingRollup)
+class ReadingRollupAdmin(admin.ModelAdmin):
+    list_display = ("id", "device", "day", "moisture_count", "dirty_since", "compacted_at", "updated_at")
+    list_filter = ("device",)
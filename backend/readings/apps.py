@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class ReadingsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "readings"
+
+    def ready(self) -> None:
+        # Import signals so cached IoT credentials are invalidated on change
+        from . import signals  # noqa: F401
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import hmac
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import AccountSecret, ReadingDevice
+from .utils import hash_account_secret
+
+CREDENTIALS_CACHE_PREFIX = "readings:cred:"
+
+# Device fields the IoT endpoints read right after resolving credentials.
+# Anything else is loaded lazily (deferred) from the database when accessed.
+CACHED_DEVICE_FIELDS = (
+    "id",
+    "user_id",
+    "device_key",
+    "device_name",
+    "plant_name",
+    "interval_hours",
+    "is_active",
+    "sensors",
+    "moisture_alert_enabled",
+    "moisture_alert_threshold",
+    "moisture_alert_active",
+    "pump_included",
+    "automatic_pump_launch",
+    "pump_threshold_pct",
+)
+
+
+def _cache_ttl() -> int:
+    return int(getattr(settings, "READINGS_CREDENTIALS_CACHE_TTL", 60))
+
+
+def _cache_key(device_key: str) -> str:
+    return f"{CREDENTIALS_CACHE_PREFIX}{device_key}"
+
+
+def _device_from_cache(entry: dict) -> ReadingDevice:
+    return ReadingDevice.from_db(
+        "default",
+        list(CACHED_DEVICE_FIELDS),
+        [entry["fields"][name] for name in CACHED_DEVICE_FIELDS],
+    )
+
+
+def _cache_device(device: ReadingDevice, secret_hash: str) -> None:
+    cache.set(
+        _cache_key(device.device_key),
+        {
+            "secret_hash": secret_hash,
+            "fields": {name: getattr(device, name) for name in CACHED_DEVICE_FIELDS},
+        },
+        _cache_ttl(),
+    )
+
+
+def resolve_device(secret_str: str, device_key: str) -> tuple[bool, ReadingDevice | None]:
+    """
+    Resolve an IoT device from its account secret and device key.
+
+    Returns (secret_ok, device):
+      - (False, None)   the secret does not belong to any account
+      - (True, None)    valid secret, but no such device for that account
+      - (True, device)  resolved device (possibly built from the cache)
+
+    Hits are served from the Django cache without touching the database. A miss costs
+    one indexed query on (device_key, secret_hash); only unknown devices need a second
+    query to tell an invalid secret apart from a missing device.
+    """
+    secret_hash = hash_account_secret(secret_str)
+
+    entry = cache.get(_cache_key(device_key))
+    if entry and hmac.compare_digest(entry["secret_hash"], secret_hash):
+        return True, _device_from_cache(entry)
+
+    device = (
+        ReadingDevice.objects
+        .filter(
+            device_key=device_key,
+            user__readings_secret__secret_hash=secret_hash,
+        )
+        .first()
+    )
+    if device is not None:
+        _cache_device(device, secret_hash)
+        return True, device
+
+    secret_ok = AccountSecret.objects.filter(secret_hash=secret_hash).exists()
+    return secret_ok, None
+
+
+def resolve_account_user_id(secret_str: str) -> int | None:
+    return (
+        AccountSecret.objects
+        .filter(secret_hash=hash_account_secret(secret_str))
+        .values_list("user_id", flat=True)
+        .first()
+    )
+
+
+def invalidate_device_credentials(*device_keys: str) -> None:
+    keys = [_cache_key(k) for k in device_keys if k]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_user_credentials(user_id: int) -> None:
+    invalidate_device_credentials(
+        *ReadingDevice.objects.filter(user_id=user_id).values_list("device_key", flat=True)
+    )
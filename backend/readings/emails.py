@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from django.conf import settings
 
-from core.emailing import send_templated_email
+from core.outbox import enqueue_templated_email
 from core.i18n import t
 
 
@@ -46,7 +46,7 @@ def send_device_code_email(*, user, device, code_text: str) -> bool:
         default="Before uploading it to your ESP32, fill in your WiFi SSID and password in the code.",
     )
 
-    return send_templated_email(
+    queued = enqueue_templated_email(
         to_email=user.email,
         subject_key="readings.device_code.subject",
         template_name="readings/device_code",
@@ -68,4 +68,5 @@ def send_device_code_email(*, user, device, code_text: str) -> bool:
                 "mimetype": "text/x-arduino",
             }
         ],
-    )
\ No newline at end of file
+    )
+    return queued is not None
@@ -0,0 +1,299 @@
+"""
+Streaming builders for the readings export email.
+
+Rows are read from the database already in export order with .iterator(), so no
+model instances or row lists pile up in memory:
+
+- xlsx: rows are spooled to a temporary file while column widths are measured, then
+  written to an openpyxl write-only workbook (which needs the widths before the
+  first row).
+- csv: every sheet is streamed straight into its own gzipped CSV attachment.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import tempfile
+from io import BytesIO
+
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Lower
+from django.utils import timezone
+
+EXPORT_FORMAT_XLSX = "xlsx"
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMATS = (EXPORT_FORMAT_XLSX, EXPORT_FORMAT_CSV)
+
+EXPORT_CHUNK_SIZE = 2000
+# Spooled rows stay in memory up to this size, then move to a temp file on disk.
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_GZIP_MIMETYPE = "application/gzip"
+
+READINGS_HEADERS = [
+    "Plant Name",
+    "Location",
+    "Device Name",
+    "Temperature",
+    "Humidity",
+    "Light",
+    "Soil Moisture",
+    "Created At",
+]
+
+TASKS_HEADERS = [
+    "Plant Name",
+    "Location",
+    "Device Name",
+    "Source",
+    "Status",
+    "Requested At",
+    "Delivered At",
+    "Executed At",
+    "Cancelled At",
+    "Moisture At Request",
+    "Threshold At Request",
+    "Error Message",
+]
+
+
+def _format_dt_local(dt):
+    if not dt:
+        return ""
+    return timezone.localtime(dt).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def export_ordering(sort_key: str, sort_dir: str, ts_field: str) -> list:
+    """
+    ORDER BY for a Reading/PumpTask queryset, matching the export's sort options:
+      - name:     plant name, device name, timestamp
+      - location: location, plant name, device name, timestamp
+      - lastRead: timestamp
+    """
+    def text(field):
+        return Coalesce(Lower(f"device__{field}"), Value(""))
+
+    if sort_key == "name":
+        keys = [text("plant_name"), text("device_name"), F(ts_field)]
+    elif sort_key == "location":
+        keys = [text("plant_location"), text("plant_name"), text("device_name"), F(ts_field)]
+    else:  # lastRead / task timestamp
+        keys = [F(ts_field)]
+
+    keys.append(F("id"))
+    if sort_dir == "desc":
+        return [key.desc() for key in keys]
+    return [key.asc() for key in keys]
+
+
+def reading_rows(readings_qs, sort_key: str, sort_dir: str):
+    rows = (
+        readings_qs
+        .order_by(*export_ordering(sort_key, sort_dir, "timestamp"))
+        .values_list(
+            "device__plant_name",
+            "device__plant_location",
+            "device__device_name",
+            "temperature",
+            "humidity",
+            "light",
+            "moisture",
+            "timestamp",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for plant_name, location, device_name, temperature, humidity, light, moisture, ts in rows:
+        yield [
+            plant_name or "",
+            location or "",
+            device_name or "",
+            temperature,
+            humidity,
+            light,
+            moisture,
+            _format_dt_local(ts),
+        ]
+
+
+def pump_task_rows(pump_tasks_qs, sort_key: str, sort_dir: str):
+    rows = (
+        pump_tasks_qs
+        .order_by(*export_ordering(sort_key, sort_dir, "requested_at"))
+        .values_list(
+            "device__plant_name",
+            "device__plant_location",
+            "device__device_name",
+            "source",
+            "status",
+            "requested_at",
+            "delivered_at",
+            "executed_at",
+            "cancelled_at",
+            "moisture_at_request",
+            "threshold_at_request",
+            "error_message",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for (
+        plant_name, location, device_name, source, status, requested_at, delivered_at,
+        executed_at, cancelled_at, moisture_at_request, threshold_at_request, error_message,
+    ) in rows:
+        yield [
+            plant_name or "",
+            location or "",
+            device_name or "",
+            source or "",
+            status or "",
+            _format_dt_local(requested_at),
+            _format_dt_local(delivered_at),
+            _format_dt_local(executed_at),
+            _format_dt_local(cancelled_at),
+            moisture_at_request,
+            threshold_at_request,
+            error_message or "",
+        ]
+
+
+class _SpooledSheet:
+    """
+    Rows of one sheet buffered as JSON lines in a spooled temp file, with the widest
+    value per column tracked while the rows go in.
+    """
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.widths = [len(header) for header in headers]
+        self.count = 0
+        self._file = tempfile.SpooledTemporaryFile(
+            max_size=SPOOL_MAX_MEMORY, mode="w+", encoding="utf-8"
+        )
+
+    def extend(self, rows):
+        for row in rows:
+            for idx, value in enumerate(row):
+                width = len(str(value or ""))
+                if width > self.widths[idx]:
+                    self.widths[idx] = width
+            self._file.write(json.dumps(row))
+            self._file.write("\n")
+            self.count += 1
+
+    def column_widths(self):
+        return [min(max(width + 2, 12), 42) for width in self.widths]
+
+    def rows(self):
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+
+def _write_sheet(wb, title: str, sheet: _SpooledSheet):
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    ws = wb.create_sheet(title)
+    for idx, width in enumerate(sheet.column_widths(), start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    header = []
+    for value in sheet.headers:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
+
+    for row in sheet.rows():
+        ws.append(row)
+
+
+def build_xlsx_export(readings, pump_tasks) -> tuple[bytes, int, int]:
+    """
+    Write-only workbook with a "Readings" and a "Watering Tasks" sheet.
+    Takes row iterables; returns (xlsx bytes, reading count, task count).
+    """
+    from openpyxl import Workbook
+
+    readings_sheet = _SpooledSheet(READINGS_HEADERS)
+    tasks_sheet = _SpooledSheet(TASKS_HEADERS)
+    try:
+        readings_sheet.extend(readings)
+        tasks_sheet.extend(pump_tasks)
+
+        wb = Workbook(write_only=True)
+        _write_sheet(wb, "Readings", readings_sheet)
+        _write_sheet(wb, "Watering Tasks", tasks_sheet)
+
+        stream = BytesIO()
+        wb.save(stream)
+        return stream.getvalue(), readings_sheet.count, tasks_sheet.count
+    finally:
+        readings_sheet.close()
+        tasks_sheet.close()
+
+
+def build_csv_gzip(headers, rows) -> tuple[bytes, int]:
+    """Gzipped UTF-8 (with BOM, for Excel) CSV. Returns (bytes, row count)."""
+    stream = BytesIO()
+    count = 0
+    with gzip.GzipFile(fileobj=stream, mode="wb") as gz:
+        text = io.TextIOWrapper(gz, encoding="utf-8-sig", newline="")
+        writer = csv.writer(text)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(["" if value is None else value for value in row])
+            count += 1
+        text.flush()
+        text.detach()
+    return stream.getvalue(), count
+
+
+def build_readings_export(
+    readings_qs,
+    pump_tasks_qs,
+    *,
+    sort_key: str,
+    sort_dir: str,
+    export_format: str,
+    filename_stem: str,
+) -> tuple[list[dict], int, int]:
+    """
+    Build the export attachments for enqueue_templated_email.
+    Returns (attachments, reading count, watering task count).
+    """
+    readings = reading_rows(readings_qs, sort_key, sort_dir)
+    pump_tasks = pump_task_rows(pump_tasks_qs, sort_key, sort_dir)
+
+    if export_format == EXPORT_FORMAT_CSV:
+        readings_csv, readings_count = build_csv_gzip(READINGS_HEADERS, readings)
+        tasks_csv, tasks_count = build_csv_gzip(TASKS_HEADERS, pump_tasks)
+        attachments = [
+            {
+                "filename": f"{filename_stem}.csv.gz",
+                "content": readings_csv,
+                "mimetype": CSV_GZIP_MIMETYPE,
+            },
+            {
+                "filename": f"{filename_stem}-watering-tasks.csv.gz",
+                "content": tasks_csv,
+                "mimetype": CSV_GZIP_MIMETYPE,
+            },
+        ]
+        return attachments, readings_count, tasks_count
+
+    xlsx_bytes, readings_count, tasks_count = build_xlsx_export(readings, pump_tasks)
+    attachments = [
+        {
+            "filename": f"{filename_stem}.xlsx",
+            "content": xlsx_bytes,
+            "mimetype": XLSX_MIMETYPE,
+        }
+    ]
+    return attachments, readings_count, tasks_count
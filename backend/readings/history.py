@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import math
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import Reading
+from .rollups import daily_rollups
+
+# History bucketing engines:
+#   - "rollup": day range bucketed in SQL, week/month served from ReadingRollup (default)
+#   - "db":     every range bucketed in SQL with TruncHour/TruncDay
+#   - "python": raw readings loaded and binned in Python (original implementation)
+HISTORY_ENGINES = {"rollup", "db", "python"}
+
+
+def history_engine() -> str:
+    engine = getattr(settings, "READINGS_HISTORY_ENGINE", "rollup")
+    return engine if engine in HISTORY_ENGINES else "rollup"
+
+
+def _empty_bin():
+    return {"sum": 0.0, "cnt": 0, "min": None, "max": None}
+
+
+def _bin_index(range_str: str, ts_local, span_from, bin_count: int):
+    if range_str == "day":
+        return ts_local.hour  # 0..23
+    if range_str == "week":
+        idx = (ts_local.date() - span_from.date()).days  # 0..6 ideally
+    else:  # month
+        idx = ts_local.day - 1  # 0..(days-1)
+    if idx < 0 or idx >= bin_count:
+        return None
+    return idx
+
+
+def python_bins(device, metrics, range_str: str, span_from, span_to, bin_count: int):
+    """
+    Load every raw reading in the span and bin it in Python.
+    """
+    bins = {metric: [_empty_bin() for _ in range(bin_count)] for metric in metrics}
+
+    qs = device.readings.filter(
+        timestamp__gte=span_from,
+        timestamp__lte=span_to,
+    ).order_by("timestamp")
+
+    for rec in qs:
+        ts_local = timezone.localtime(rec.timestamp)
+        idx = _bin_index(range_str, ts_local, span_from, bin_count)
+        if idx is None:
+            continue
+
+        for metric in metrics:
+            val = getattr(rec, metric, None)
+            if val is None:
+                continue
+
+            try:
+                val_f = float(val)
+            except (TypeError, ValueError):
+                continue
+
+            if not math.isfinite(val_f):
+                continue
+
+            b = bins[metric][idx]
+            b["sum"] += val_f
+            b["cnt"] += 1
+            b["min"] = val_f if b["min"] is None else min(b["min"], val_f)
+            b["max"] = val_f if b["max"] is None else max(b["max"], val_f)
+
+    return bins
+
+
+def _bucket_aggregates(metrics) -> dict:
+    aggregates = {}
+    for metric in metrics:
+        aggregates[f"{metric}_sum"] = Sum(metric)
+        aggregates[f"{metric}_cnt"] = Count(metric)
+        aggregates[f"{metric}_min"] = Min(metric)
+        aggregates[f"{metric}_max"] = Max(metric)
+    return aggregates
+
+
+def _fill_bin(bins, metrics, idx: int, row) -> None:
+    for metric in metrics:
+        cnt = row[f"{metric}_cnt"]
+        total = row[f"{metric}_sum"]
+        if not cnt or total is None or not math.isfinite(total):
+            continue
+
+        bins[metric][idx] = {
+            "sum": total,
+            "cnt": cnt,
+            "min": row[f"{metric}_min"],
+            "max": row[f"{metric}_max"],
+        }
+
+
+def db_bins(device, metrics, range_str: str, span_from, span_to, bin_count: int):
+    """
+    Bucket readings in SQL (TruncHour for day, TruncDay otherwise, in the current
+    timezone) so only one aggregated row per bucket leaves the database.
+    """
+    tz = timezone.get_current_timezone()
+    trunc = TruncHour if range_str == "day" else TruncDay
+
+    rows = (
+        device.readings
+        .filter(timestamp__gte=span_from, timestamp__lte=span_to)
+        .annotate(bucket=trunc("timestamp", tzinfo=tz))
+        .values("bucket")
+        .annotate(**_bucket_aggregates(metrics))
+        .order_by("bucket")
+    )
+
+    bins = {metric: [_empty_bin() for _ in range(bin_count)] for metric in metrics}
+
+    for row in rows:
+        idx = _bin_index(range_str, timezone.localtime(row["bucket"], tz), span_from, bin_count)
+        if idx is not None:
+            _fill_bin(bins, metrics, idx, row)
+
+    return bins
+
+
+def hourly_bins_by_device(device_ids, metrics, span_from, span_to, bin_count: int):
+    """
+    Hourly bins for many devices with one grouped query.
+
+    Bucket i covers [span_from + i hours, span_from + (i + 1) hours) in elapsed time;
+    span_from must be a whole UTC hour. Hours are truncated in UTC, so a DST change
+    can neither merge two hours into one bucket nor leave a gap.
+    Returns {device_id: {metric: [bin, ...]}} with an entry for every device id.
+    """
+    rows = (
+        Reading.objects
+        .filter(device_id__in=device_ids, timestamp__gte=span_from, timestamp__lte=span_to)
+        .annotate(bucket=TruncHour("timestamp", tzinfo=dt_timezone.utc))
+        .values("device_id", "bucket")
+        .annotate(**_bucket_aggregates(metrics))
+        .order_by("device_id", "bucket")
+    )
+
+    bins_by_device = {
+        device_id: {metric: [_empty_bin() for _ in range(bin_count)] for metric in metrics}
+        for device_id in device_ids
+    }
+
+    span_from_utc = span_from.astimezone(dt_timezone.utc)
+    for row in rows:
+        # Subtract in UTC: aware datetimes sharing a ZoneInfo subtract as wall-clock time.
+        idx = (row["bucket"].astimezone(dt_timezone.utc) - span_from_utc) // timedelta(hours=1)
+        if 0 <= idx < bin_count:
+            _fill_bin(bins_by_device[row["device_id"]], metrics, idx, row)
+
+    return bins_by_device
+
+
+def rollup_bins(device, metrics, first_day, bin_count: int):
+    """
+    Daily bins (week/month) served from ReadingRollup with a single indexed query.
+    """
+    last_day = first_day + timedelta(days=bin_count - 1)
+    rollups = daily_rollups(device, first_day, last_day)
+
+    bins = {metric: [] for metric in metrics}
+    for i in range(bin_count):
+        rollup = rollups.get(first_day + timedelta(days=i))
+
+        for metric in metrics:
+            count = getattr(rollup, f"{metric}_count", 0) if rollup else 0
+            if not count:
+                bins[metric].append(_empty_bin())
+                continue
+
+            bins[metric].append({
+                "sum": getattr(rollup, f"{metric}_sum"),
+                "cnt": count,
+                "min": getattr(rollup, f"{metric}_min"),
+                "max": getattr(rollup, f"{metric}_max"),
+            })
+
+    return bins
+
+
+def history_bins(device, metrics, range_str: str, span_from, span_to, bin_count: int):
+    """
+    Return {metric: [bin, ...]} for the span using the configured engine.
+    Each bin is {"sum", "cnt", "min", "max"}.
+    """
+    engine = history_engine()
+
+    if engine == "python":
+        return python_bins(device, metrics, range_str, span_from, span_to, bin_count)
+
+    if engine == "rollup" and range_str != "day":
+        return rollup_bins(device, metrics, span_from.date(), bin_count)
+
+    return db_bins(device, metrics, range_str, span_from, span_to, bin_count)
+
+
+def bin_values(bins, stat: str) -> list[float]:
+    values = []
+    for b in bins:
+        if not b["cnt"]:
+            values.append(0.0)
+        elif stat == "max":
+            values.append(round(b["max"], 2))
+        elif stat == "min":
+            values.append(round(b["min"], 2))
+        else:
+            values.append(round(b["sum"] / b["cnt"], 2))
+    return values
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .credentials import invalidate_device_credentials
+from .models import ReadingDevice, Reading
+
+READING_METRIC_FIELDS = ("temperature", "humidity", "light", "moisture")
+
+
+def _metric_values(metrics: dict) -> dict:
+    return {field: metrics.get(field) for field in READING_METRIC_FIELDS}
+
+
+def apply_moisture_alert_transition(device: ReadingDevice, moisture_value):
+    """
+    Update device.moisture_alert_active for one moisture sample.
+
+    Returns the moisture value when the device crosses into the low-moisture
+    state (an alert should be sent), otherwise None. The device is not saved.
+    """
+    if (
+        moisture_value is not None
+        and device.moisture_alert_enabled
+        and device.moisture_alert_threshold is not None
+    ):
+        try:
+            moisture_f = float(moisture_value)
+            threshold_f = float(device.moisture_alert_threshold)
+        except (TypeError, ValueError):
+            return None
+
+        if moisture_f < threshold_f:
+            if not device.moisture_alert_active:
+                device.moisture_alert_active = True
+                return moisture_f
+        elif device.moisture_alert_active:
+            device.moisture_alert_active = False
+    elif device.moisture_alert_active and (
+        not device.moisture_alert_enabled or device.moisture_alert_threshold is None
+    ):
+        device.moisture_alert_active = False
+
+    return None
+
+
+def upsert_reading(device: ReadingDevice, timestamp, metrics: dict) -> None:
+    """
+    Insert or overwrite the reading for (device, timestamp) in one statement.
+
+    Uses INSERT ... ON CONFLICT (device_id, timestamp) DO UPDATE on PostgreSQL
+    and SQLite. Backends without conflict targets fall back to update_or_create.
+    """
+    upsert_readings([(device, timestamp, metrics)])
+
+
+def upsert_readings(rows, batch_size: int = 500) -> None:
+    """
+    upsert_reading() for many (device, timestamp, metrics) rows, batch_size rows
+    per statement.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+
+    if connection.features.supports_update_conflicts_with_target:
+        Reading.objects.bulk_create(
+            [
+                Reading(device=device, timestamp=timestamp, **_metric_values(metrics))
+                for device, timestamp, metrics in rows
+            ],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["device", "timestamp"],
+            update_fields=list(READING_METRIC_FIELDS),
+        )
+        return
+
+    with transaction.atomic():
+        for device, timestamp, metrics in rows:
+            Reading.objects.update_or_create(
+                device=device,
+                timestamp=timestamp,
+                defaults=_metric_values(metrics),
+            )
+
+
+def touch_readings_changed(device_ids) -> None:
+    """Record that the devices' raw readings changed (see ReadingDevice.readings_changed_at)."""
+    ReadingDevice.objects.filter(pk__in=list(device_ids)).update(readings_changed_at=timezone.now())
+
+
+def update_device_snapshot(device: ReadingDevice, read_at, metrics: dict) -> bool:
+    """
+    Store metrics as the device's latest snapshot unless a newer reading is already there.
+
+    Runs a single conditional UPDATE ... WHERE last_read_at <= read_at, so a late
+    out-of-order sample cannot overwrite a newer snapshot and no row lock is held.
+    Either way readings_changed_at is bumped (a second UPDATE for late samples).
+    Returns True when the snapshot was updated.
+    """
+    snapshot = _metric_values(metrics)
+    now = timezone.now()
+
+    updated = (
+        ReadingDevice.objects
+        .filter(pk=device.pk)
+        .filter(Q(last_read_at__isnull=True) | Q(last_read_at__lte=read_at))
+        .update(
+            last_read_at=read_at,
+            latest_snapshot=snapshot,
+            readings_changed_at=now,
+            updated_at=now,
+        )
+    )
+
+    if updated:
+        device.last_read_at = read_at
+        device.latest_snapshot = snapshot
+    else:
+        touch_readings_changed([device.pk])
+
+    return bool(updated)
+
+
+def record_moisture_alert_state(device: ReadingDevice, moisture_value):
+    """
+    Apply the moisture alert transition and persist it with a compare-and-set UPDATE.
+
+    Only the request that actually flips moisture_alert_active gets the alert value
+    back, so concurrent ingests for the same device send at most one alert.
+    """
+    return record_moisture_alert_states(device, [moisture_value])
+
+
+def record_moisture_alert_states(device: ReadingDevice, moisture_values):
+    """
+    record_moisture_alert_state() for several samples, replayed in order.
+
+    Returns the moisture value of the last crossing into the low-moisture state
+    when the device is still low after the last sample, otherwise None. A batch
+    that recovers and drops again ends where it started; nothing is written then,
+    but the new crossing is still reported.
+    """
+    previous = device.moisture_alert_active
+    alert_moisture_value = None
+    for moisture_value in moisture_values:
+        crossed_value = apply_moisture_alert_transition(device, moisture_value)
+        if crossed_value is not None:
+            alert_moisture_value = crossed_value
+
+    if not device.moisture_alert_active:
+        alert_moisture_value = None
+
+    if device.moisture_alert_active == previous:
+        return alert_moisture_value
+
+    flipped = (
+        ReadingDevice.objects
+        .filter(pk=device.pk, moisture_alert_active=previous)
+        .update(moisture_alert_active=device.moisture_alert_active)
+    )
+
+    # The cached credentials carry moisture_alert_active; drop them either way so
+    # the next request sees the stored state.
+    invalidate_device_credentials(device.device_key)
+
+    if not flipped:
+        device.moisture_alert_active = previous
+        return None
+
+    return alert_moisture_value
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from readings.retention import (
+    apply_retention,
+    compact_expired_readings,
+    retention_cutoff,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compact raw readings older than the retention period into daily rollups and "
+        "delete them in batches (per-user ProfileSettings.readings_retention_days, "
+        "otherwise READINGS_RAW_RETENTION_DAYS)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Ignore the configured policies and compact everything older than this many days.",
+        )
+        parser.add_argument(
+            "--user",
+            type=int,
+            default=None,
+            help="Only compact readings of this user id (requires --days).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Raw readings picked up per batch (default READINGS_RETENTION_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches per policy (default: until done).",
+        )
+
+    def handle(self, *args, **options):
+        days = options.get("days")
+        user_id = options.get("user")
+        batch_size = options.get("batch_size")
+        max_batches = options.get("max_batches")
+
+        if user_id is not None and days is None:
+            raise CommandError("--user requires --days.")
+        if days is not None and days < 1:
+            raise CommandError("--days must be at least 1.")
+
+        if days is None:
+            removed = apply_retention(max_batches=max_batches)
+        else:
+            readings_filter = Q(device__user_id=user_id) if user_id is not None else Q()
+            removed = compact_expired_readings(
+                readings_filter,
+                retention_cutoff(days),
+                batch_size=batch_size,
+                max_batches=max_batches,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Compacted and removed {removed} raw readings."))
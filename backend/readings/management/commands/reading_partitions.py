@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from readings.partitions import (
+    PARTITION_MONTHS_AHEAD,
+    convert_to_partitioned,
+    ensure_partitions,
+    is_partitioned,
+    list_partitions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage monthly range partitions of the readings table (PostgreSQL only). "
+        "Without options, creates missing partitions for the coming months."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Rebuild the existing readings table as a partitioned table (locks it while copying).",
+        )
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=PARTITION_MONTHS_AHEAD,
+            help=f"Create partitions this many months ahead (default {PARTITION_MONTHS_AHEAD}).",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Reading partitioning requires PostgreSQL.")
+
+        months_ahead = max(int(options.get("months_ahead") or 0), 0)
+
+        if options.get("convert"):
+            copied = convert_to_partitioned(months_ahead=months_ahead)
+            self.stdout.write(f"Copied {copied} readings into the partitioned table.")
+        elif not is_partitioned():
+            raise CommandError("The readings table is not partitioned yet; run with --convert first.")
+        else:
+            created = ensure_partitions(months_ahead=months_ahead)
+            self.stdout.write(f"Created {created} partitions.")
+
+        partitions = sorted(list_partitions())
+        if partitions:
+            first, last = partitions[0], partitions[-1]
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(partitions)} monthly partitions: {first[0]}-{first[1]:02d} .. {last[0]}-{last[1]:02d}"
+            ))
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from readings.models import AccountSecret
+from readings.utils import hash_account_secret
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute AccountSecret.secret_hash with the current READINGS_SECRET_HASH_KEY "
+        "(or SECRET_KEY when that is unset). Run it after rotating either key, otherwise "
+        "every IoT device is refused with 403."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows written per UPDATE batch (default 500).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the secrets whose stored hash is stale.",
+        )
+
+    def handle(self, *args, **options):
+        stale = []
+        total = 0
+        for account_secret in AccountSecret.objects.only("id", "secret", "secret_hash").iterator():
+            total += 1
+            secret_hash = hash_account_secret(account_secret.secret)
+            if account_secret.secret_hash != secret_hash:
+                account_secret.secret_hash = secret_hash
+                stale.append(account_secret)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(stale)} of {total} account secrets have a stale hash.")
+            return
+
+        AccountSecret.objects.bulk_update(stale, ["secret_hash"], batch_size=max(1, options["batch_size"]))
+        self.stdout.write(self.style.SUCCESS(f"Rehashed {len(stale)} of {total} account secrets."))
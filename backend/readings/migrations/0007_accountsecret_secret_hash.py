@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 19:06
+
+from django.db import migrations, models
+
+from readings.utils import hash_account_secret
+
+
+def backfill_secret_hash(apps, schema_editor):
+    AccountSecret = apps.get_model("readings", "AccountSecret")
+    for acct in AccountSecret.objects.all().iterator():
+        acct.secret_hash = hash_account_secret(acct.secret)
+        acct.save(update_fields=["secret_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0006_readingdevice_send_email_watering_notifications_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accountsecret',
+            name='secret_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_secret_hash, migrations.RunPython.noop),
+    ]
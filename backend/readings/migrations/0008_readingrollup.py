@@ -0,0 +1,70 @@
+# Generated by Django 5.2 on 2026-10-17 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_existing_days_dirty(apps, schema_editor):
+    """
+    Create dirty rollup rows for every (device, local day) that already has readings.
+    The refresh task (or the history endpoint) fills in the stats.
+    """
+    Reading = apps.get_model("readings", "Reading")
+    ReadingRollup = apps.get_model("readings", "ReadingRollup")
+
+    tz = timezone.get_default_timezone()
+    now = timezone.now()
+    device_days = set()
+    for device_id, ts in Reading.objects.values_list("device_id", "timestamp").iterator(chunk_size=2000):
+        device_days.add((device_id, timezone.localtime(ts, tz).date()))
+
+    ReadingRollup.objects.bulk_create(
+        [
+            ReadingRollup(device_id=device_id, day=day, dirty_since=now)
+            for device_id, day in sorted(device_days)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0007_accountsecret_secret_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('temperature_sum', models.FloatField(default=0.0)),
+                ('temperature_count', models.PositiveIntegerField(default=0)),
+                ('humidity_min', models.FloatField(blank=True, null=True)),
+                ('humidity_max', models.FloatField(blank=True, null=True)),
+                ('humidity_sum', models.FloatField(default=0.0)),
+                ('humidity_count', models.PositiveIntegerField(default=0)),
+                ('light_min', models.FloatField(blank=True, null=True)),
+                ('light_max', models.FloatField(blank=True, null=True)),
+                ('light_sum', models.FloatField(default=0.0)),
+                ('light_count', models.PositiveIntegerField(default=0)),
+                ('moisture_min', models.FloatField(blank=True, null=True)),
+                ('moisture_max', models.FloatField(blank=True, null=True)),
+                ('moisture_sum', models.FloatField(default=0.0)),
+                ('moisture_count', models.PositiveIntegerField(default=0)),
+                ('dirty_since', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='readings.readingdevice')),
+            ],
+            options={
+                'ordering': ('-day',),
+                'indexes': [models.Index(fields=['dirty_since'], name='readings_re_dirty_s_812657_idx')],
+                'unique_together': {('device', 'day')},
+            },
+        ),
+        migrations.RunPython(mark_existing_days_dirty, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0008_readingrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readingrollup',
+            name='compacted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0009_readingrollup_compacted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readingdevice',
+            name='readings_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from .utils import hash_account_secret
+
 
 def _generate_device_key(length: int = 8) -> str:
     import secrets
@@ -17,11 +19,20 @@ class AccountSecret(models.Model):
         related_name="readings_secret",
     )
     secret = models.CharField(max_length=64)
+    # Keyed hash of `secret`, used by the IoT endpoints to resolve credentials via an index.
+    secret_hash = models.CharField(max_length=64, db_index=True, blank=True, default="", editable=False)
     rotated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"AccountSecret<{self.user_id}>"
 
+    def save(self, *args, **kwargs):
+        self.secret_hash = hash_account_secret(self.secret)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "secret" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "secret_hash"}
+        super().save(*args, **kwargs)
+
 
 class ReadingDevice(models.Model):
     user = models.ForeignKey(
@@ -70,6 +81,9 @@ class ReadingDevice(models.Model):
 
     last_read_at = models.DateTimeField(null=True, blank=True)
     latest_snapshot = models.JSONField(null=True, blank=True)
+    # Bumped whenever any of the device's raw readings is written or deleted,
+    # including late samples that leave the snapshot alone (dashboard ETag).
+    readings_changed_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
@@ -201,4 +215,58 @@ class Reading(models.Model):
         ordering = ("-timestamp",)
 
     def __str__(self):
-        return f"Reading<{self.device_id}@{self.timestamp.isoformat()}>"
\ No newline at end of file
+        return f"Reading<{self.device_id}@{self.timestamp.isoformat()}>"
+
+
+class ReadingRollup(models.Model):
+    """
+    Per-device, per-local-day aggregates of Reading rows (local day in settings.TIME_ZONE).
+
+    Ingest only marks a day as dirty; stats are recomputed from raw readings by the
+    refresh task, or on read by the history endpoint. Once retention compacts a day
+    (see readings/retention.py) the rollup is the only copy of that day's data.
+    """
+
+    device = models.ForeignKey(
+        ReadingDevice,
+        on_delete=models.CASCADE,
+        related_name="rollups",
+    )
+    day = models.DateField()
+
+    temperature_min = models.FloatField(null=True, blank=True)
+    temperature_max = models.FloatField(null=True, blank=True)
+    temperature_sum = models.FloatField(default=0.0)
+    temperature_count = models.PositiveIntegerField(default=0)
+
+    humidity_min = models.FloatField(null=True, blank=True)
+    humidity_max = models.FloatField(null=True, blank=True)
+    humidity_sum = models.FloatField(default=0.0)
+    humidity_count = models.PositiveIntegerField(default=0)
+
+    light_min = models.FloatField(null=True, blank=True)
+    light_max = models.FloatField(null=True, blank=True)
+    light_sum = models.FloatField(default=0.0)
+    light_count = models.PositiveIntegerField(default=0)
+
+    moisture_min = models.FloatField(null=True, blank=True)
+    moisture_max = models.FloatField(null=True, blank=True)
+    moisture_sum = models.FloatField(default=0.0)
+    moisture_count = models.PositiveIntegerField(default=0)
+
+    # Set when readings of this day changed after the last refresh.
+    dirty_since = models.DateTimeField(null=True, blank=True)
+    # Set once retention has compacted this day: raw readings were folded in and deleted,
+    # so the stats above are authoritative and late readings are merged into them.
+    compacted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("device", "day"),)
+        ordering = ("-day",)
+        indexes = [
+            models.Index(fields=["dirty_since"]),
+        ]
+
+    def __str__(self):
+        return f"ReadingRollup<{self.device_id}@{self.day.isoformat()}>"
@@ -1,20 +1,42 @@
 from __future__ import annotations
 
 import logging
+from datetime import timezone as dt_timezone
 
-from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
 from core.emailing import send_templated_email
-from core.i18n import t
+from core.i18n import supported_lang, t
 from profiles.models import PushDevice
-from profiles.push import send_fcm_multicast
+from profiles.push import looks_unregistered, send_fcm_multicast
 
 from .models import ReadingDevice
 from .utils import build_readings_link
 
 logger = logging.getLogger(__name__)
 
+CHANNEL_EMAIL = "email"
+CHANNEL_PUSH = "push"
+NOTIFICATION_CHANNELS = (CHANNEL_EMAIL, CHANNEL_PUSH)
+
+KIND_MOISTURE_ALERT = "moisture_alert"
+KIND_WATERING_COMPLETED = "watering_completed"
+
+NOTIFICATION_DEDUPE_TTL = 60 * 60
+
+
+def claim_device_notification(device_id: int, kind: str, now=None) -> bool:
+    """
+    Claim the (device_id, kind, UTC hour) notification slot.
+
+    Returns False if that notification was already sent (or is being sent) this hour.
+    Uses cache.add, which is atomic on Redis, so concurrent workers can't both win.
+    """
+    now = now or timezone.now()
+    hour = now.astimezone(dt_timezone.utc).strftime("%Y%m%d%H")
+    return cache.add(f"readings:notify:{kind}:{device_id}:{hour}", 1, NOTIFICATION_DEDUPE_TTL)
+
 
 def _format_metric(value) -> str:
     try:
@@ -28,16 +50,11 @@ def _format_metric(value) -> str:
 
 
 def _get_user_lang(user) -> str:
-    default = getattr(settings, "EMAIL_DEFAULT_LANG", "en") or "en"
     try:
         ps = getattr(user, "profile_settings", None)
-        if ps and getattr(ps, "language", None):
-            lang = str(ps.language).strip().lower()
-            supported = set(getattr(settings, "SUPPORTED_LANGS", [])) or {default}
-            return lang if lang in supported else default
     except Exception:
-        pass
-    return default
+        ps = None
+    return supported_lang(getattr(ps, "language", None))
 
 
 def _get_android_tokens(user_id: int) -> list[str]:
@@ -50,16 +67,6 @@ def _get_android_tokens(user_id: int) -> list[str]:
     )
 
 
-def _looks_unregistered(exc: Exception) -> bool:
-    msg = str(exc).lower()
-    return (
-        "not registered" in msg
-        or "unregistered" in msg
-        or "registration-token-not-registered" in msg
-        or "requested entity was not found" in msg
-    )
-
-
 def _send_push_and_deactivate_bad_tokens(
     tokens: list[str],
     title: str,
@@ -70,11 +77,7 @@ def _send_push_and_deactivate_bad_tokens(
     if not tokens:
         return 0
 
-    try:
-        resp = send_fcm_multicast(tokens=tokens, title=title, body=body, data=data)
-    except Exception:
-        logger.exception("FCM multicast send raised")
-        return 0
+    resp = send_fcm_multicast(tokens=tokens, title=title, body=body, data=data)
 
     success_count = getattr(resp, "success_count", None)
     responses = getattr(resp, "responses", None)
@@ -87,7 +90,7 @@ def _send_push_and_deactivate_bad_tokens(
     for idx, r in enumerate(responses):
         ok = getattr(r, "success", False)
         exc = getattr(r, "exception", None)
-        if not ok and exc and _looks_unregistered(exc):
+        if not ok and exc and looks_unregistered(exc):
             bad_tokens.append(tokens[idx])
 
     if bad_tokens:
@@ -186,18 +189,27 @@ def _send_moisture_alert_push(device: ReadingDevice, moisture_value: float) -> i
         title=title,
         body=body,
         data={
-            "kind": "moisture_alert",
+            "kind": KIND_MOISTURE_ALERT,
             "route": "Readings",
             "deviceId": str(device.id),
         },
     )
 
 
-def send_moisture_alert_notifications(*, device_id: int, moisture_value: float) -> None:
+def send_moisture_alert_notifications(
+    *,
+    device_id: int,
+    moisture_value: float,
+    channels=NOTIFICATION_CHANNELS,
+) -> list[str]:
+    """
+    Send the low-moisture alert on the given channels.
+    Returns the channels that failed, so the caller can retry just those.
+    """
     try:
         device = (
             ReadingDevice.objects
-            .select_related("user")
+            .select_related("user", "user__profile_settings")
             .get(id=device_id)
         )
     except ReadingDevice.DoesNotExist:
@@ -205,17 +217,25 @@ def send_moisture_alert_notifications(*, device_id: int, moisture_value: float)
             "Moisture alert notification skipped; device %s no longer exists",
             device_id,
         )
-        return
+        return []
 
-    try:
-        _send_moisture_alert_email(device, moisture_value)
-    except Exception:
-        logger.exception("Failed to send moisture alert email for device=%s", device_id)
+    failed = []
 
-    try:
-        _send_moisture_alert_push(device, moisture_value)
-    except Exception:
-        logger.exception("Failed to send moisture alert push for device=%s", device_id)
+    if CHANNEL_EMAIL in channels:
+        try:
+            _send_moisture_alert_email(device, moisture_value)
+        except Exception:
+            logger.exception("Failed to send moisture alert email for device=%s", device_id)
+            failed.append(CHANNEL_EMAIL)
+
+    if CHANNEL_PUSH in channels:
+        try:
+            _send_moisture_alert_push(device, moisture_value)
+        except Exception:
+            logger.exception("Failed to send moisture alert push for device=%s", device_id)
+            failed.append(CHANNEL_PUSH)
+
+    return failed
 
 
 def _watering_source_label(source: str | None, lang: str) -> str:
@@ -354,7 +374,7 @@ def _send_watering_completed_push(device: ReadingDevice, source: str | None = No
         title=title,
         body=body,
         data={
-            "kind": "watering_completed",
+            "kind": KIND_WATERING_COMPLETED,
             "route": "Readings",
             "deviceId": str(device.id),
             "source": source_value,
@@ -362,11 +382,20 @@ def _send_watering_completed_push(device: ReadingDevice, source: str | None = No
     )
 
 
-def send_watering_completed_notifications(*, device_id: int, source: str | None = None) -> None:
+def send_watering_completed_notifications(
+    *,
+    device_id: int,
+    source: str | None = None,
+    channels=NOTIFICATION_CHANNELS,
+) -> list[str]:
+    """
+    Send the watering-completed notification on the given channels.
+    Returns the channels that failed, so the caller can retry just those.
+    """
     try:
         device = (
             ReadingDevice.objects
-            .select_related("user")
+            .select_related("user", "user__profile_settings")
             .get(id=device_id)
         )
     except ReadingDevice.DoesNotExist:
@@ -374,20 +403,28 @@ def send_watering_completed_notifications(*, device_id: int, source: str | None
             "Watering completed notification skipped; device %s no longer exists",
             device_id,
         )
-        return
-
-    try:
-        _send_watering_completed_email(device, source)
-    except Exception:
-        logger.exception(
-            "Failed to send watering completed email for device=%s",
-            device_id,
-        )
-
-    try:
-        _send_watering_completed_push(device, source)
-    except Exception:
-        logger.exception(
-            "Failed to send watering completed push for device=%s",
-            device_id,
-        )
\ No newline at end of file
+        return []
+
+    failed = []
+
+    if CHANNEL_EMAIL in channels:
+        try:
+            _send_watering_completed_email(device, source)
+        except Exception:
+            logger.exception(
+                "Failed to send watering completed email for device=%s",
+                device_id,
+            )
+            failed.append(CHANNEL_EMAIL)
+
+    if CHANNEL_PUSH in channels:
+        try:
+            _send_watering_completed_push(device, source)
+        except Exception:
+            logger.exception(
+                "Failed to send watering completed push for device=%s",
+                device_id,
+            )
+            failed.append(CHANNEL_PUSH)
+
+    return failed
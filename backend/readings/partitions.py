@@ -0,0 +1,272 @@
+"""
+Native monthly range partitioning of readings_reading on PostgreSQL.
+
+Optional (settings.READINGS_PARTITIONED). `manage.py reading_partitions --convert`
+rebuilds the table as `PARTITION BY RANGE ("timestamp")` with one partition per UTC
+month plus a default partition, so retention can drop an expired month instead of
+deleting its rows one by one. Partitioned tables need the partition key in every
+unique constraint, so the primary key becomes (id, timestamp); ids still come from
+one sequence and stay unique.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Reading
+from .rollups import _day_bounds, compact_device_days
+
+PARTITION_MONTHS_AHEAD = 3
+
+_PARTITION_RE = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def _table() -> str:
+    return Reading._meta.db_table
+
+
+def _q(name: str) -> str:
+    return connection.ops.quote_name(name)
+
+
+def partition_name(year: int, month: int) -> str:
+    return f"{_table()}_p{year:04d}{month:02d}"
+
+
+def default_partition_name() -> str:
+    return f"{_table()}_default"
+
+
+def month_start(year: int, month: int) -> datetime:
+    return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(year: int, month: int) -> tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def month_range(start: datetime, end: datetime):
+    """(year, month) for every UTC month from start's month through end's month."""
+    start = start.astimezone(dt_timezone.utc)
+    end = end.astimezone(dt_timezone.utc)
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = next_month(year, month)
+
+
+def _months_ahead(now: datetime, months: int) -> datetime:
+    now = now.astimezone(dt_timezone.utc)
+    year, month = now.year, now.month
+    for _ in range(months):
+        year, month = next_month(year, month)
+    return month_start(year, month)
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [_table()],
+        )
+        return cursor.fetchone() is not None
+
+
+def partitioning_enabled() -> bool:
+    return bool(getattr(settings, "READINGS_PARTITIONED", False)) and is_partitioned()
+
+
+def list_partitions() -> dict[tuple[int, int], str]:
+    """Monthly partitions of the readings table keyed by (year, month)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [_table()],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = _PARTITION_RE.search(name)
+        if match:
+            partitions[(int(match.group(1)), int(match.group(2)))] = name
+    return partitions
+
+
+def _create_month_partition(cursor, year: int, month: int, existing) -> bool:
+    if (year, month) in existing:
+        return False
+
+    table, name, default = _table(), partition_name(year, month), default_partition_name()
+    lower = month_start(year, month)
+    upper = month_start(*next_month(year, month))
+
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {_q(default)} WHERE {_q('timestamp')} >= %s AND {_q('timestamp')} < %s)",
+        [lower, upper],
+    )
+    if cursor.fetchone()[0]:
+        # Rows for this month landed in the default partition; PostgreSQL refuses to
+        # create an overlapping partition, so move them into a table and attach it.
+        cursor.execute(f"CREATE TABLE {_q(name)} (LIKE {_q(table)} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {_q(default)} "
+            f"WHERE {_q('timestamp')} >= %s AND {_q('timestamp')} < %s RETURNING *) "
+            f"INSERT INTO {_q(name)} SELECT * FROM moved",
+            [lower, upper],
+        )
+        cursor.execute(
+            f"ALTER TABLE {_q(table)} ATTACH PARTITION {_q(name)} FOR VALUES FROM (%s) TO (%s)",
+            [lower, upper],
+        )
+    else:
+        cursor.execute(
+            f"CREATE TABLE {_q(name)} PARTITION OF {_q(table)} FOR VALUES FROM (%s) TO (%s)",
+            [lower, upper],
+        )
+
+    existing[(year, month)] = name
+    return True
+
+
+def ensure_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD, now: datetime | None = None) -> int:
+    """Create monthly partitions through `months_ahead` months from now. Returns how many were created."""
+    now = now or timezone.now()
+
+    created = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        existing = list_partitions()
+        for ym in month_range(now, _months_ahead(now, months_ahead)):
+            created += _create_month_partition(cursor, *ym, existing)
+    return created
+
+
+def convert_to_partitioned(months_ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+    """
+    Rebuild the readings table as a monthly range-partitioned table, keeping all rows,
+    indexes, constraints and the id sequence. Runs in one transaction and holds an
+    exclusive lock on the table while copying. Returns the number of copied rows.
+    """
+    if connection.vendor != "postgresql":
+        raise RuntimeError("Reading partitioning requires PostgreSQL.")
+    if is_partitioned():
+        return 0
+
+    table = _table()
+    legacy = f"{table}_legacy"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            # NOT NULL (contype 'n' on PostgreSQL 18+) is already copied by LIKE.
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'c', 'x')",
+            [table],
+        )
+        constraints = cursor.fetchall()
+        constraint_names = {name for name, _, _ in constraints}
+
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE tablename = %s AND schemaname = current_schema()",
+            [table],
+        )
+        indexes = [(name, sql) for name, sql in cursor.fetchall() if name not in constraint_names]
+
+        cursor.execute(
+            "SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'",
+            [table],
+        )
+        is_identity = bool(cursor.fetchone()[0])
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {_q(table)} RENAME TO {_q(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {_q(table)} (LIKE {_q(legacy)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE ({_q('timestamp')})"
+        )
+        cursor.execute(f"CREATE TABLE {_q(default_partition_name())} PARTITION OF {_q(table)} DEFAULT")
+
+        cursor.execute(f"SELECT MIN({_q('timestamp')}), MAX(id) FROM {_q(legacy)}")
+        oldest, max_id = cursor.fetchone()
+        now = timezone.now()
+        existing: dict = {}
+        for ym in month_range(oldest or now, _months_ahead(now, months_ahead)):
+            _create_month_partition(cursor, *ym, existing)
+
+        cursor.execute(f"INSERT INTO {_q(table)} SELECT * FROM {_q(legacy)}")
+        copied = cursor.rowcount
+
+        if sequence and not is_identity:
+            # Serial column: keep the sequence alive when the legacy table goes away.
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+        cursor.execute(f"DROP TABLE {_q(legacy)}")
+
+        if not sequence or is_identity:
+            sequence = _q(f"{table}_id_seq")
+            cursor.execute(f"CREATE SEQUENCE {sequence}")
+            cursor.execute(f"ALTER TABLE {_q(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {_q(table)}.id")
+        if max_id:
+            cursor.execute("SELECT setval(%s, %s)", [sequence, max_id])
+
+        for name, kind, definition in constraints:
+            if kind == "p":
+                definition = f"PRIMARY KEY (id, {_q('timestamp')})"
+            cursor.execute(f"ALTER TABLE {_q(table)} ADD CONSTRAINT {_q(name)} {definition}")
+        for _, sql in indexes:
+            cursor.execute(sql)
+
+    return copied
+
+
+def drop_expired_partitions(cutoff: datetime) -> int:
+    """
+    Drop monthly partitions that end on or before cutoff, compacting their days into
+    rollups first. Returns the number of raw readings removed.
+    """
+    removed = 0
+    tz = timezone.get_default_timezone()
+
+    for (year, month), name in sorted(list_partitions().items()):
+        lower = month_start(year, month)
+        upper = month_start(*next_month(year, month))
+        if upper > cutoff:
+            continue
+
+        with transaction.atomic():
+            month_readings = Reading.objects.filter(timestamp__gte=lower, timestamp__lt=upper)
+            device_days = set(
+                month_readings
+                .annotate(day=TruncDate("timestamp", tzinfo=tz))
+                .values_list("device_id", "day")
+                .distinct()
+            )
+
+            # Local days wholly inside the partition disappear with it; days that
+            # straddle a month boundary are deleted row by row.
+            inside, straddling = set(), set()
+            for device_id, day in device_days:
+                start, end = _day_bounds(day)
+                (inside if start >= lower and end <= upper else straddling).add((device_id, day))
+
+            removed += month_readings.count()
+            compact_device_days(inside, delete_raw=False)
+            compact_device_days(straddling)
+
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {_q(name)}")
+
+    return removed
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from profiles.models import ProfileSettings
+
+from .models import Reading, ReadingDevice
+from .partitions import drop_expired_partitions, partitioning_enabled
+from .rollups import compact_device_days, rollup_day
+
+
+def default_retention_days() -> int:
+    """Global raw-reading retention in days; 0 keeps raw readings forever."""
+    return max(int(getattr(settings, "READINGS_RAW_RETENTION_DAYS", 0) or 0), 0)
+
+
+def retention_batch_size() -> int:
+    return max(int(getattr(settings, "READINGS_RETENTION_BATCH_SIZE", 5000) or 5000), 1)
+
+
+def retention_policies() -> dict[int, Q]:
+    """
+    Group device owners by effective retention: {days: Q(...) matching their readings}.
+
+    Users with ProfileSettings.readings_retention_days get their own value, everyone
+    else the global default. Groups with 0 days (keep forever) are left out.
+    """
+    overrides: dict[int, list[int]] = {}
+    for user_id, days in (
+        ProfileSettings.objects
+        .filter(readings_retention_days__isnull=False)
+        .values_list("user_id", "readings_retention_days")
+    ):
+        overrides.setdefault(days, []).append(user_id)
+
+    policies = {
+        days: Q(device__user_id__in=user_ids)
+        for days, user_ids in overrides.items()
+        if days > 0
+    }
+
+    default_days = default_retention_days()
+    if default_days:
+        overridden = [user_id for user_ids in overrides.values() for user_id in user_ids]
+        default_q = ~Q(device__user_id__in=overridden)
+        policies[default_days] = (policies[default_days] | default_q) if default_days in policies else default_q
+
+    return policies
+
+
+def longest_retention_days() -> int | None:
+    """
+    The longest effective retention of any device owner, or None when someone keeps
+    raw readings forever (or nobody has a policy at all).
+    """
+    default_days = default_retention_days()
+    overrides = dict(
+        ProfileSettings.objects
+        .filter(readings_retention_days__isnull=False)
+        .values_list("user_id", "readings_retention_days")
+    )
+
+    owners = set(ReadingDevice.objects.values_list("user_id", flat=True).distinct())
+    days = [overrides.get(user_id, default_days) for user_id in owners]
+    if not days or not all(days):
+        return None
+    return max(days)
+
+
+def retention_cutoff(days: int, today: date | None = None) -> datetime:
+    """Start of the first local day (settings.TIME_ZONE) that is still kept raw."""
+    tz = timezone.get_default_timezone()
+    today = today or timezone.localdate(timezone=tz)
+    return timezone.make_aware(datetime.combine(today - timedelta(days=days), time.min), tz)
+
+
+def compact_expired_readings(
+    readings_filter: Q,
+    cutoff: datetime,
+    batch_size: int | None = None,
+    max_batches: int | None = None,
+) -> int:
+    """
+    Compact and delete raw readings matching readings_filter that are older than cutoff.
+
+    Works in chunks: each batch picks up to batch_size expired readings and compacts
+    the whole local days they belong to (one short transaction per device day).
+    Returns the number of deleted raw readings.
+    """
+    batch_size = batch_size or retention_batch_size()
+    expired = Reading.objects.filter(readings_filter, timestamp__lt=cutoff).order_by()
+
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = list(expired.values_list("device_id", "timestamp")[:batch_size])
+        if not rows:
+            break
+
+        device_days = {(device_id, rollup_day(ts)) for device_id, ts in rows}
+        batch_deleted = compact_device_days(device_days)
+        deleted += batch_deleted
+        batches += 1
+
+        if len(rows) < batch_size or not batch_deleted:
+            break
+
+    return deleted
+
+
+def apply_retention(max_batches: int | None = None, today: date | None = None) -> int:
+    """
+    Apply every retention policy. On partitioned PostgreSQL tables whole expired
+    months are dropped first. Returns the number of removed raw readings.
+    """
+    removed = 0
+
+    if partitioning_enabled():
+        longest = longest_retention_days()
+        if longest:
+            removed += drop_expired_partitions(retention_cutoff(longest, today))
+
+    for days, readings_filter in sorted(retention_policies().items()):
+        removed += compact_expired_readings(
+            readings_filter,
+            retention_cutoff(days, today),
+            max_batches=max_batches,
+        )
+
+    return removed
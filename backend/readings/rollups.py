@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import math
+from datetime import date, datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .ingest import touch_readings_changed
+from .models import Reading, ReadingRollup
+
+ROLLUP_METRICS = ("temperature", "humidity", "light", "moisture")
+
+REFRESH_BATCH_SIZE = 500
+
+
+def rollup_day(ts) -> date:
+    """Local day (settings.TIME_ZONE) a reading timestamp belongs to."""
+    return timezone.localtime(ts, timezone.get_default_timezone()).date()
+
+
+def _day_bounds(day: date):
+    tz = timezone.get_default_timezone()
+    start = timezone.make_aware(datetime.combine(day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def mark_rollups_dirty(device_days) -> None:
+    """
+    Flag (device_id, day) rollups for recomputation with a single upsert.
+    """
+    now = timezone.now()
+    rows = [
+        ReadingRollup(device_id=device_id, day=day, dirty_since=now)
+        for device_id, day in sorted(set(device_days))
+    ]
+    if not rows:
+        return
+
+    if connection.features.supports_update_conflicts_with_target:
+        ReadingRollup.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["device", "day"],
+            update_fields=["dirty_since"],
+        )
+        return
+
+    with transaction.atomic():
+        for row in rows:
+            ReadingRollup.objects.update_or_create(
+                device_id=row.device_id,
+                day=row.day,
+                defaults={"dirty_since": now},
+            )
+
+
+def _day_readings(device_id: int, day: date):
+    start, end = _day_bounds(day)
+    return Reading.objects.filter(device_id=device_id, timestamp__gte=start, timestamp__lt=end)
+
+
+def _stat_aggregates() -> dict:
+    aggregates = {}
+    for metric in ROLLUP_METRICS:
+        aggregates[f"{metric}_min"] = Min(metric)
+        aggregates[f"{metric}_max"] = Max(metric)
+        aggregates[f"{metric}_sum"] = Sum(metric)
+        aggregates[f"{metric}_count"] = Count(metric)
+    return aggregates
+
+
+def _clean_stats(stats: dict) -> dict:
+    for metric in ROLLUP_METRICS:
+        total = stats[f"{metric}_sum"]
+        if total is None or not math.isfinite(total):
+            stats[f"{metric}_sum"] = 0.0
+            stats[f"{metric}_count"] = 0
+            stats[f"{metric}_min"] = None
+            stats[f"{metric}_max"] = None
+    return stats
+
+
+def _compute_stats(device_id: int, day: date) -> dict:
+    return _clean_stats(_day_readings(device_id, day).aggregate(**_stat_aggregates()))
+
+
+def _merge_stats(rollup: ReadingRollup, stats: dict) -> dict:
+    """Combine the rollup's stored stats with stats of readings that arrived later."""
+    parts = ("min", "max", "sum", "count")
+    merged = {}
+    for metric in ROLLUP_METRICS:
+        old = {part: getattr(rollup, f"{metric}_{part}") for part in parts}
+        new = {part: stats[f"{metric}_{part}"] for part in parts}
+
+        if not new["count"]:
+            combined = old
+        elif not old["count"]:
+            combined = new
+        else:
+            combined = {
+                "min": min(old["min"], new["min"]),
+                "max": max(old["max"], new["max"]),
+                "sum": old["sum"] + new["sum"],
+                "count": old["count"] + new["count"],
+            }
+
+        merged.update({f"{metric}_{part}": combined[part] for part in parts})
+    return merged
+
+
+def delete_raw_readings(queryset) -> int:
+    """
+    DELETE the readings in one statement, without per-row signals.
+
+    Reading's post_delete signal would re-mark the day dirty and make the refresh
+    recompute its rollup from the (now deleted) raw rows.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def compact_rollup(rollup: ReadingRollup, delete_raw: bool = True) -> int:
+    """
+    Fold the day's raw readings into the rollup and mark it compacted.
+
+    On a compacted rollup the remaining raw readings are late arrivals and get merged
+    into the stored stats. With delete_raw (the default) the folded readings are
+    deleted; only readings up to the highest id seen are touched, so a reading
+    inserted meanwhile stays raw and is merged by the next refresh.
+    Returns the number of deleted readings.
+    """
+    with transaction.atomic():
+        # Blocks mark_rollups_dirty() for this day until the raw rows are gone.
+        locked = ReadingRollup.objects.select_for_update().get(pk=rollup.pk)
+        for field in [f.attname for f in ReadingRollup._meta.concrete_fields]:
+            setattr(rollup, field, getattr(locked, field))
+
+        raw = _day_readings(rollup.device_id, rollup.day)
+        stats = raw.aggregate(last_id=Max("id"), **_stat_aggregates())
+        last_id = stats.pop("last_id")
+        stats = _clean_stats(stats)
+        if rollup.compacted_at is not None:
+            stats = _merge_stats(rollup, stats)
+
+        deleted = 0
+        if delete_raw and last_id is not None:
+            deleted = delete_raw_readings(raw.filter(id__lte=last_id))
+            if deleted:
+                touch_readings_changed([rollup.device_id])
+
+        now = timezone.now()
+        for field, value in stats.items():
+            setattr(rollup, field, value)
+        rollup.dirty_since = None
+        rollup.compacted_at = now
+
+        ReadingRollup.objects.filter(pk=rollup.pk).update(
+            dirty_since=None,
+            compacted_at=now,
+            updated_at=now,
+            **stats,
+        )
+    return deleted
+
+
+def compact_device_days(device_days, delete_raw: bool = True) -> int:
+    """
+    Compact (device_id, local day) pairs into their rollups, creating missing rollup rows.
+    Returns the number of deleted raw readings.
+    """
+    deleted = 0
+    for device_id, day in sorted(set(device_days)):
+        rollup, _ = ReadingRollup.objects.get_or_create(device_id=device_id, day=day)
+        deleted += compact_rollup(rollup, delete_raw=delete_raw)
+    return deleted
+
+
+def refresh_rollup(rollup: ReadingRollup) -> ReadingRollup:
+    """
+    Recompute one dirty rollup from raw readings.
+
+    The row is only marked clean if nobody re-dirtied it while we were aggregating;
+    the in-memory object always carries the fresh stats. Compacted days no longer
+    have their raw readings, so late arrivals are merged in instead.
+    """
+    if rollup.compacted_at is not None:
+        compact_rollup(rollup)
+        return rollup
+
+    dirty_since = rollup.dirty_since
+    stats = _compute_stats(rollup.device_id, rollup.day)
+
+    for field, value in stats.items():
+        setattr(rollup, field, value)
+
+    ReadingRollup.objects.filter(pk=rollup.pk, dirty_since=dirty_since).update(
+        dirty_since=None,
+        updated_at=timezone.now(),
+        **stats,
+    )
+    return rollup
+
+
+def refresh_dirty_rollups(limit: int = REFRESH_BATCH_SIZE) -> int:
+    rollups = list(
+        ReadingRollup.objects
+        .filter(dirty_since__isnull=False)
+        .order_by("dirty_since")[:limit]
+    )
+    for rollup in rollups:
+        refresh_rollup(rollup)
+    return len(rollups)
+
+
+def daily_rollups(device, day_from: date, day_to: date) -> dict[date, ReadingRollup]:
+    """
+    Rollups for device in [day_from, day_to], keyed by day, refreshing dirty rows on the way.
+    """
+    rollups = {}
+    for rollup in ReadingRollup.objects.filter(device=device, day__gte=day_from, day__lte=day_to):
+        if rollup.dirty_since is not None:
+            refresh_rollup(rollup)
+        rollups[rollup.day] = rollup
+    return rollups
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .exports import EXPORT_FORMATS, EXPORT_FORMAT_XLSX
 from .models import ReadingDevice, Reading, PumpTask
 
 
@@ -118,15 +119,20 @@ class ReadingDeviceSerializer(serializers.ModelSerializer):
         return obj.latest_snapshot or None
 
     def get_pending_pump_task(self, obj):
-        task = (
-            obj.pump_tasks
-            .filter(
-                source=PumpTask.SOURCE_MANUAL,
-                status__in=[PumpTask.STATUS_PENDING, PumpTask.STATUS_DELIVERED],
+        # ReadingDeviceViewSet prefetches these (newest first) to avoid a query per device.
+        prefetched = getattr(obj, "open_manual_pump_tasks", None)
+        if prefetched is not None:
+            task = prefetched[0] if prefetched else None
+        else:
+            task = (
+                obj.pump_tasks
+                .filter(
+                    source=PumpTask.SOURCE_MANUAL,
+                    status__in=[PumpTask.STATUS_PENDING, PumpTask.STATUS_DELIVERED],
+                )
+                .order_by("-requested_at")
+                .first()
             )
-            .order_by("-requested_at")
-            .first()
-        )
 
         if not task:
             return None
@@ -340,4 +346,83 @@ class ReadingsExportEmailSerializer(serializers.Serializer):
         required=False,
         default="asc",
     )
+    fileFormat = serializers.ChoiceField(
+        choices=EXPORT_FORMATS,
+        required=False,
+        default=EXPORT_FORMAT_XLSX,
+    )
     lang = serializers.CharField(required=False, allow_blank=True)
+
+
+MAX_INGEST_BATCH_READINGS = 1000
+
+
+class IngestSampleSerializer(serializers.Serializer):
+    timestamp = serializers.DateTimeField()
+    metrics = serializers.DictField(required=False, default=dict)
+
+
+class IngestBatchDeviceSerializer(serializers.Serializer):
+    device_key = serializers.CharField()
+    device_id = serializers.IntegerField(required=False)
+    readings = IngestSampleSerializer(many=True, allow_empty=False)
+
+
+class IngestBatchSerializer(serializers.Serializer):
+    """
+    Either a single device:
+      {"secret": "...", "device_key": "...", "readings": [...]}
+    or many devices under one account secret:
+      {"secret": "...", "devices": [{"device_key": "...", "readings": [...]}, ...]}
+    """
+
+    secret = serializers.CharField()
+    device_key = serializers.CharField(required=False)
+    device_id = serializers.IntegerField(required=False)
+    readings = IngestSampleSerializer(many=True, required=False, allow_empty=False)
+    devices = IngestBatchDeviceSerializer(many=True, required=False, allow_empty=False)
+
+    def validate(self, attrs):
+        has_single = "readings" in attrs
+        has_multi = "devices" in attrs
+
+        if has_single == has_multi:
+            raise serializers.ValidationError(
+                "Provide either device_key + readings or devices, not both."
+            )
+
+        if has_single:
+            if not attrs.get("device_key"):
+                raise serializers.ValidationError({
+                    "device_key": "This field is required when readings are sent."
+                })
+            entries = [{
+                "device_key": attrs["device_key"],
+                "device_id": attrs.get("device_id"),
+                "readings": attrs["readings"],
+            }]
+        else:
+            entries = [
+                {
+                    "device_key": entry["device_key"],
+                    "device_id": entry.get("device_id"),
+                    "readings": entry["readings"],
+                }
+                for entry in attrs["devices"]
+            ]
+
+        device_keys = [entry["device_key"] for entry in entries]
+        if len(device_keys) != len(set(device_keys)):
+            raise serializers.ValidationError({
+                "devices": "Each device_key may appear only once per batch."
+            })
+
+        total = sum(len(entry["readings"]) for entry in entries)
+        if total > MAX_INGEST_BATCH_READINGS:
+            raise serializers.ValidationError({
+                "readings": f"A batch may contain at most {MAX_INGEST_BATCH_READINGS} readings."
+            })
+
+        attrs["entries"] = entries
+        attrs["is_multi_device"] = has_multi
+        return attrs
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .credentials import invalidate_device_credentials, invalidate_user_credentials
+from .ingest import touch_readings_changed
+from .models import AccountSecret, Reading, ReadingDevice
+from .rollups import mark_rollups_dirty, rollup_day
+
+
+@receiver(post_save, sender=ReadingDevice)
+@receiver(post_delete, sender=ReadingDevice)
+def drop_cached_device_credentials(sender, instance, **kwargs):
+    invalidate_device_credentials(instance.device_key)
+
+
+@receiver(post_save, sender=AccountSecret)
+@receiver(post_delete, sender=AccountSecret)
+def drop_cached_account_credentials(sender, instance, **kwargs):
+    invalidate_user_credentials(instance.user_id)
+
+
+@receiver(post_save, sender=Reading)
+@receiver(post_delete, sender=Reading)
+def mark_reading_rollup_dirty(sender, instance, **kwargs):
+    # Ingest uses bulk upserts and marks rollups itself; this covers admin and ORM writes.
+    mark_rollups_dirty([(instance.device_id, rollup_day(instance.timestamp))])
+    touch_readings_changed([instance.device_id])
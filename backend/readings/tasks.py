@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+from celery.exceptions import MaxRetriesExceededError
+
+from .notifications import (
+    KIND_MOISTURE_ALERT,
+    KIND_WATERING_COMPLETED,
+    NOTIFICATION_CHANNELS,
+    claim_device_notification,
+    send_moisture_alert_notifications,
+    send_watering_completed_notifications,
+)
+from .partitions import ensure_partitions, partitioning_enabled
+from .retention import apply_retention
+from .rollups import REFRESH_BATCH_SIZE, refresh_dirty_rollups
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_MAX_RETRIES = 5
+NOTIFICATION_RETRY_BASE_SECONDS = 30
+NOTIFICATION_RETRY_MAX_SECONDS = 30 * 60
+
+
+def _retry_failed_channels(task, failed: list[str], **kwargs) -> None:
+    """
+    Re-queue the task for the channels that failed, with exponential backoff.
+    Channels that already went out are not sent again.
+    """
+    if not failed:
+        return
+
+    countdown = min(
+        NOTIFICATION_RETRY_BASE_SECONDS * (2 ** task.request.retries),
+        NOTIFICATION_RETRY_MAX_SECONDS,
+    )
+    try:
+        raise task.retry(kwargs={**kwargs, "channels": failed}, countdown=countdown)
+    except MaxRetriesExceededError:
+        logger.error(
+            "Giving up on %s for device=%s after %s retries (channels=%s)",
+            task.name,
+            kwargs.get("device_id"),
+            task.request.retries,
+            ",".join(failed),
+        )
+
+
+@shared_task(bind=True, ignore_result=True)
+def refresh_reading_rollups(self, max_batches: int = 20):
+    """
+    Recompute ReadingRollup rows that ingest marked dirty, in batches.
+    """
+    total = 0
+    for _ in range(max_batches):
+        refreshed = refresh_dirty_rollups(limit=REFRESH_BATCH_SIZE)
+        total += refreshed
+        if refreshed < REFRESH_BATCH_SIZE:
+            break
+
+    if total:
+        logger.info("Refreshed %s reading rollups", total)
+    return total
+
+
+@shared_task(bind=True, ignore_result=True)
+def apply_reading_retention(self, max_batches: int = 200):
+    """
+    Compact raw readings past their owner's retention into rollups and delete them.
+    On partitioned PostgreSQL tables also keeps upcoming monthly partitions in place.
+    """
+    if partitioning_enabled():
+        ensure_partitions()
+
+    removed = apply_retention(max_batches=max_batches)
+    if removed:
+        logger.info("Reading retention removed %s raw readings", removed)
+    return removed
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=NOTIFICATION_MAX_RETRIES)
+def send_moisture_alert_notifications_task(self, device_id: int, moisture_value: float, channels=None):
+    """
+    Low-moisture alert email/push, at most once per device per hour.
+    """
+    if not self.request.retries and not claim_device_notification(device_id, KIND_MOISTURE_ALERT):
+        logger.info("Moisture alert for device=%s already sent this hour", device_id)
+        return
+
+    failed = send_moisture_alert_notifications(
+        device_id=device_id,
+        moisture_value=moisture_value,
+        channels=channels or NOTIFICATION_CHANNELS,
+    )
+    _retry_failed_channels(self, failed, device_id=device_id, moisture_value=moisture_value)
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=NOTIFICATION_MAX_RETRIES)
+def send_watering_completed_notifications_task(self, device_id: int, source: str | None = None, channels=None):
+    """
+    Watering-completed email/push, at most once per device per hour.
+    """
+    if not self.request.retries and not claim_device_notification(device_id, KIND_WATERING_COMPLETED):
+        logger.info("Watering completed notification for device=%s already sent this hour", device_id)
+        return
+
+    failed = send_watering_completed_notifications(
+        device_id=device_id,
+        source=source,
+        channels=channels or NOTIFICATION_CHANNELS,
+    )
+    _retry_failed_channels(self, failed, device_id=device_id, source=source)
@@ -74,6 +74,43 @@ def test_list_reading_devices_returns_only_current_users_devices():
     assert data[0]["id"] == device.id
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize("device_count", [1, 5])
+def test_list_reading_devices_query_count_does_not_grow_with_devices(django_assert_num_queries, device_count):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    plant = _plant(user)
+    for i in range(device_count):
+        device = ReadingDevice.objects.create(user=user, plant=plant, device_name=f"Sensor {i}")
+        PumpTask.objects.create(device=device, source=PumpTask.SOURCE_MANUAL, status=PumpTask.STATUS_PENDING)
+        PumpTask.objects.create(device=device, source=PumpTask.SOURCE_MANUAL, status=PumpTask.STATUS_EXECUTED)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    # devices + prefetched open manual pump tasks
+    with django_assert_num_queries(2):
+        response = client.get(reverse("reading-device-list"))
+
+    data = response.json()
+    assert response.status_code == 200
+    assert len(data) == device_count
+    assert all(d["pending_pump_task"]["status"] == PumpTask.STATUS_PENDING for d in data)
+
+
+@pytest.mark.django_db
+def test_code_text_does_not_prefetch_pump_tasks(django_assert_num_queries):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = ReadingDevice.objects.create(user=user, plant=_plant(user), device_name="Sensor")
+    AccountSecret.objects.create(user=user, secret="secret-123")
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    # device + account secret
+    with django_assert_num_queries(2):
+        response = client.post(reverse("reading-device-code-text", args=[device.id]), format="json")
+
+    assert response.status_code == 200
+
+
 @pytest.mark.django_db
 def test_retrieve_reading_device_returns_404_for_other_users_device():
     user = User.objects.create_user(email="test@example.com", password="strong-password-123")
@@ -7,6 +7,7 @@ from rest_framework.test import APIClient
 
 from locations.models import Location
 from plant_instances.models import PlantInstance
+from readings.ingest import update_device_snapshot, upsert_reading
 from readings.models import Reading, ReadingDevice
 
 User = get_user_model()
@@ -161,3 +162,175 @@ def test_history_rejects_invalid_stat():
 
     assert response.status_code == 400
     assert "stat must be one of" in response.json()["detail"]
+
+
+@pytest.mark.django_db
+def test_history_returns_several_metrics_in_one_call():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = _device(user)
+    Reading.objects.create(
+        device=device,
+        timestamp=timezone.datetime(2026, 5, 5, 10, 0, tzinfo=dt_timezone.utc),
+        temperature=22,
+        moisture=35,
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(
+        reverse("history"),
+        data={
+            "device_id": device.id,
+            "range": "day",
+            "metric": "temperature,moisture",
+            "anchor": "2026-05-05T12:00:00Z",
+        },
+    )
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["metrics"] == ["temperature", "moisture"]
+    assert "points" not in data
+    assert data["series"]["moisture"]["unit"] == "%"
+    # 10:00 UTC is 12:00 in Europe/Warsaw
+    assert data["series"]["temperature"]["points"][12]["value"] == 22.0
+    assert data["series"]["moisture"]["points"][12]["value"] == 35.0
+
+
+@pytest.mark.django_db
+def test_history_rejects_unknown_metric_in_list():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = _device(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(
+        reverse("history"),
+        data={"device_id": device.id, "metric": "temperature,pressure"},
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_dashboard_history_returns_all_devices_with_one_grouped_query(django_assert_num_queries):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    first = _device(user)
+    second = ReadingDevice.objects.create(user=user, plant=first.plant, device_name="Second")
+    Reading.objects.create(
+        device=first,
+        timestamp=timezone.datetime(2026, 5, 5, 10, 15, tzinfo=dt_timezone.utc),
+        moisture=30,
+    )
+    Reading.objects.create(
+        device=first,
+        timestamp=timezone.datetime(2026, 5, 5, 10, 45, tzinfo=dt_timezone.utc),
+        moisture=40,
+    )
+    Reading.objects.create(
+        device=second,
+        timestamp=timezone.datetime(2026, 5, 5, 11, 5, tzinfo=dt_timezone.utc),
+        moisture=55,
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    # device list + grouped readings query
+    with django_assert_num_queries(2):
+        response = client.get(
+            reverse("dashboard-history"),
+            data={"metric": "moisture", "stat": "max", "anchor": "2026-05-05T11:30:00Z"},
+        )
+
+    data = response.json()
+    assert response.status_code == 200
+    assert response["ETag"]
+    assert data["hours"] == 24
+    assert len(data["buckets"]) == 24
+    assert data["units"] == {"moisture": "%"}
+    by_name = {d["device_name"]: d["series"]["moisture"] for d in data["devices"]}
+    assert by_name["Sensor"][-2:] == [40.0, 0.0]
+    assert by_name["Second"][-2:] == [0.0, 55.0]
+
+
+@pytest.mark.django_db
+def test_dashboard_history_keeps_every_hour_across_dst_fall_back():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = _device(user)
+    # Europe/Warsaw falls back at 2026-10-25 01:00 UTC (03:00 CEST -> 02:00 CET).
+    span_from = timezone.datetime(2026, 10, 24, 13, 0, tzinfo=dt_timezone.utc)
+    for i in range(24):
+        Reading.objects.create(
+            device=device,
+            timestamp=span_from + timezone.timedelta(hours=i, minutes=10),
+            moisture=i,
+        )
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(
+        reverse("dashboard-history"),
+        data={"metric": "moisture", "anchor": "2026-10-25T12:30:00Z"},
+    )
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["devices"][0]["series"]["moisture"] == [float(i) for i in range(24)]
+    assert len(set(data["buckets"])) == 24
+    assert "2026-10-25T02:00:00+02:00" in data["buckets"]
+    assert "2026-10-25T02:00:00+01:00" in data["buckets"]
+
+
+@pytest.mark.django_db
+def test_dashboard_history_answers_304_until_a_device_reports(django_assert_num_queries):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = _device(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    params = {"metric": "moisture", "anchor": "2026-05-05T11:30:00Z"}
+
+    etag = client.get(reverse("dashboard-history"), data=params)["ETag"]
+
+    with django_assert_num_queries(1):
+        response = client.get(reverse("dashboard-history"), data=params, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+    device.last_read_at = timezone.datetime(2026, 5, 5, 11, 20, tzinfo=dt_timezone.utc)
+    device.save(update_fields=["last_read_at", "updated_at"])
+
+    response = client.get(reverse("dashboard-history"), data=params, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_dashboard_history_etag_changes_for_a_late_sample_inside_the_window():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = _device(user)
+    newest = timezone.datetime(2026, 5, 5, 11, 20, tzinfo=dt_timezone.utc)
+    upsert_reading(device, newest.replace(minute=0), {"moisture": 50})
+    assert update_device_snapshot(device, newest, {"moisture": 50})
+    client = APIClient()
+    client.force_authenticate(user=user)
+    params = {"metric": "moisture", "anchor": "2026-05-05T11:30:00Z"}
+    etag = client.get(reverse("dashboard-history"), data=params)["ETag"]
+
+    late = timezone.datetime(2026, 5, 5, 9, 10, tzinfo=dt_timezone.utc)
+    upsert_reading(device, late.replace(minute=0), {"moisture": 12})
+    assert not update_device_snapshot(device, late, {"moisture": 12})
+
+    response = client.get(reverse("dashboard-history"), data=params, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["devices"][0]["series"]["moisture"][-3] == 12.0
+
+
+@pytest.mark.django_db
+def test_dashboard_history_validates_params():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    assert client.get(reverse("dashboard-history"), data={"metric": "pressure"}).status_code == 400
+    assert client.get(reverse("dashboard-history"), data={"stat": "median"}).status_code == 400
+    assert client.get(reverse("dashboard-history"), data={"hours": "0"}).status_code == 400
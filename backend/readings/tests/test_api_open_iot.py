@@ -3,6 +3,7 @@ from datetime import timezone as dt_timezone
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -36,7 +37,7 @@ def test_ingest_is_open_but_requires_device_key_and_secret():
 
 
 @pytest.mark.django_db
-@patch("readings.views.send_moisture_alert_notifications")
+@patch("readings.views.send_moisture_alert_notifications_task.delay")
 def test_ingest_creates_or_updates_hourly_reading_and_updates_device_snapshot(mock_alert):
     user, device, secret = _device_with_secret()
     client = APIClient()
@@ -70,6 +71,287 @@ def test_ingest_creates_or_updates_hourly_reading_and_updates_device_snapshot(mo
     mock_alert.assert_not_called()
 
 
+@pytest.mark.django_db
+def test_ingest_late_sample_is_stored_without_overwriting_newer_snapshot():
+    user, device, secret = _device_with_secret()
+    client = APIClient()
+
+    client.post(
+        reverse("ingest"),
+        data={
+            "secret": secret.secret,
+            "device_key": device.device_key,
+            "timestamp": "2026-05-05T11:10:00Z",
+            "metrics": {"temperature": 24},
+        },
+        format="json",
+    )
+    response = client.post(
+        reverse("ingest"),
+        data={
+            "secret": secret.secret,
+            "device_key": device.device_key,
+            "timestamp": "2026-05-05T09:10:00Z",
+            "metrics": {"temperature": 19},
+        },
+        format="json",
+    )
+
+    device.refresh_from_db()
+    assert response.status_code == 202
+    assert Reading.objects.filter(device=device).count() == 2
+    assert device.latest_snapshot["temperature"] == 24
+    assert device.last_read_at == timezone.datetime(2026, 5, 5, 11, 10, tzinfo=dt_timezone.utc)
+
+
+@pytest.mark.django_db
+@patch("readings.views.send_moisture_alert_notifications_task.delay")
+def test_ingest_sends_moisture_alert_once_when_crossing_threshold(
+    mock_alert,
+    django_capture_on_commit_callbacks,
+):
+    user, device, secret = _device_with_secret(
+        moisture_alert_enabled=True,
+        moisture_alert_threshold=30,
+    )
+    client = APIClient()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for hour, moisture in ((8, 25), (9, 20), (10, 45)):
+            client.post(
+                reverse("ingest"),
+                data={
+                    "secret": secret.secret,
+                    "device_key": device.device_key,
+                    "timestamp": f"2026-05-05T{hour:02d}:00:00Z",
+                    "metrics": {"moisture": moisture},
+                },
+                format="json",
+            )
+
+    device.refresh_from_db()
+    assert device.moisture_alert_active is False
+    mock_alert.assert_called_once_with(device_id=device.id, moisture_value=25.0)
+
+
+@pytest.mark.django_db
+def test_ingest_query_count_is_constant_once_credentials_are_cached(django_assert_num_queries):
+    user, device, secret = _device_with_secret()
+    client = APIClient()
+    payload = {
+        "secret": secret.secret,
+        "device_key": device.device_key,
+        "timestamp": "2026-05-05T10:15:00Z",
+        "metrics": {"temperature": 22.5, "moisture": 35},
+    }
+
+    # Cold cache: one indexed credential lookup, then the reading upsert,
+    # the rollup dirty-mark upsert and one snapshot UPDATE.
+    with django_assert_num_queries(4):
+        client.post(reverse("ingest"), data=payload, format="json")
+
+    payload["timestamp"] = "2026-05-05T11:15:00Z"
+    with django_assert_num_queries(3):
+        response = client.post(reverse("ingest"), data=payload, format="json")
+
+    assert response.status_code == 202
+
+
+@pytest.mark.django_db
+def test_rotate_secret_invalidates_cached_device_credentials():
+    user, device, secret = _device_with_secret()
+    client = APIClient()
+    params = {"secret": secret.secret, "device_key": device.device_key}
+
+    assert client.get(reverse("feed"), data=params).status_code == 200
+
+    owner = APIClient()
+    owner.force_authenticate(user=user)
+    new_secret = owner.post(reverse("rotate-secret")).json()["secret"]
+
+    assert client.get(reverse("feed"), data=params).status_code == 403
+    assert client.get(
+        reverse("feed"),
+        data={"secret": new_secret, "device_key": device.device_key},
+    ).status_code == 200
+
+
+@pytest.mark.django_db
+def test_disabling_device_invalidates_cached_device_credentials():
+    user, device, secret = _device_with_secret()
+    client = APIClient()
+    params = {"secret": secret.secret, "device_key": device.device_key}
+
+    assert client.get(reverse("feed"), data=params).status_code == 200
+
+    device.is_active = False
+    device.save()
+
+    response = client.get(reverse("feed"), data=params)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "device disabled"
+
+
+@pytest.mark.django_db
+@patch("readings.views.send_moisture_alert_notifications_task.delay")
+def test_ingest_batch_upserts_hourly_readings_and_updates_snapshot_once(
+    mock_alert,
+    django_capture_on_commit_callbacks,
+):
+    user, device, secret = _device_with_secret(
+        moisture_alert_enabled=True,
+        moisture_alert_threshold=30,
+    )
+    Reading.objects.create(
+        device=device,
+        timestamp=timezone.datetime(2026, 5, 5, 8, 0, tzinfo=dt_timezone.utc),
+        temperature=19,
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = APIClient().post(
+            reverse("ingest-batch"),
+            data={
+                "secret": secret.secret,
+                "device_key": device.device_key,
+                "readings": [
+                    {"timestamp": "2026-05-05T10:40:00Z", "metrics": {"temperature": 24, "moisture": 25}},
+                    {"timestamp": "2026-05-05T08:10:00Z", "metrics": {"temperature": 20, "moisture": 40}},
+                    {"timestamp": "2026-05-05T10:05:00Z", "metrics": {"temperature": 23, "moisture": 35}},
+                    {"timestamp": "2026-05-05T09:15:00Z", "metrics": {"temperature": 21, "moisture": 28}},
+                ],
+            },
+            format="json",
+        )
+
+    device.refresh_from_db()
+    data = response.json()
+    readings = list(Reading.objects.filter(device=device).order_by("timestamp"))
+
+    assert response.status_code == 202
+    assert data["accepted"] == [{"device_id": device.id, "device_key": device.device_key, "readings": 3}]
+    assert data["rejected"] == []
+    assert [r.temperature for r in readings] == [20.0, 21.0, 24.0]
+    assert device.latest_snapshot["temperature"] == 24
+    assert device.last_read_at == timezone.datetime(2026, 5, 5, 10, 40, tzinfo=dt_timezone.utc)
+    assert device.moisture_alert_active is True
+    mock_alert.assert_called_once_with(device_id=device.id, moisture_value=25.0)
+
+
+@pytest.mark.django_db
+@patch("readings.views.send_moisture_alert_notifications_task.delay")
+def test_ingest_batch_backlog_older_than_last_read_does_not_touch_the_alert(
+    mock_alert,
+    django_capture_on_commit_callbacks,
+):
+    user, device, secret = _device_with_secret(
+        moisture_alert_enabled=True,
+        moisture_alert_threshold=30,
+        moisture_alert_active=True,
+        last_read_at=timezone.datetime(2026, 5, 5, 12, 0, tzinfo=dt_timezone.utc),
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = APIClient().post(
+            reverse("ingest-batch"),
+            data={
+                "secret": secret.secret,
+                "device_key": device.device_key,
+                "readings": [
+                    {"timestamp": "2026-05-05T09:00:00Z", "metrics": {"moisture": 50}},
+                    {"timestamp": "2026-05-05T10:00:00Z", "metrics": {"moisture": 20}},
+                ],
+            },
+            format="json",
+        )
+
+    device.refresh_from_db()
+    assert response.status_code == 202
+    assert Reading.objects.filter(device=device).count() == 2
+    assert device.moisture_alert_active is True
+    assert device.last_read_at == timezone.datetime(2026, 5, 5, 12, 0, tzinfo=dt_timezone.utc)
+    mock_alert.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_ingest_batch_falls_back_without_conflict_targets():
+    user, device, secret = _device_with_secret()
+    Reading.objects.create(
+        device=device,
+        timestamp=timezone.datetime(2026, 5, 5, 9, 0, tzinfo=dt_timezone.utc),
+        temperature=19,
+    )
+
+    with patch.object(connection.features, "supports_update_conflicts_with_target", False):
+        response = APIClient().post(
+            reverse("ingest-batch"),
+            data={
+                "secret": secret.secret,
+                "device_key": device.device_key,
+                "readings": [
+                    {"timestamp": "2026-05-05T09:30:00Z", "metrics": {"temperature": 21}},
+                    {"timestamp": "2026-05-05T10:00:00Z", "metrics": {"temperature": 22}},
+                ],
+            },
+            format="json",
+        )
+
+    device.refresh_from_db()
+    assert response.status_code == 202
+    assert [r.temperature for r in Reading.objects.filter(device=device).order_by("timestamp")] == [21.0, 22.0]
+    assert device.latest_snapshot["temperature"] == 22
+
+
+@pytest.mark.django_db
+def test_ingest_batch_accepts_many_devices_and_rejects_unknown_keys():
+    user, device, secret = _device_with_secret()
+    other = ReadingDevice.objects.create(user=user, plant=device.plant, device_name="Second")
+    disabled = ReadingDevice.objects.create(user=user, plant=device.plant, device_name="Off", is_active=False)
+    sample = {"timestamp": "2026-05-05T10:00:00Z", "metrics": {"temperature": 22}}
+
+    response = APIClient().post(
+        reverse("ingest-batch"),
+        data={
+            "secret": secret.secret,
+            "devices": [
+                {"device_key": device.device_key, "readings": [sample]},
+                {"device_key": other.device_key, "readings": [sample]},
+                {"device_key": disabled.device_key, "readings": [sample]},
+                {"device_key": "UNKNOWN1", "readings": [sample]},
+            ],
+        },
+        format="json",
+    )
+
+    data = response.json()
+    assert response.status_code == 202
+    assert {item["device_id"] for item in data["accepted"]} == {device.id, other.id}
+    assert data["rejected"] == [
+        {"device_key": disabled.device_key, "detail": "device disabled"},
+        {"device_key": "UNKNOWN1", "detail": "not found"},
+    ]
+    assert Reading.objects.filter(device__in=[device, other]).count() == 2
+    assert not Reading.objects.filter(device=disabled).exists()
+
+
+@pytest.mark.django_db
+def test_ingest_batch_rejects_invalid_secret():
+    user, device, secret = _device_with_secret()
+
+    response = APIClient().post(
+        reverse("ingest-batch"),
+        data={
+            "secret": "wrong",
+            "device_key": device.device_key,
+            "readings": [{"timestamp": "2026-05-05T10:00:00Z", "metrics": {}}],
+        },
+        format="json",
+    )
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "invalid credentials"
+
+
 @pytest.mark.django_db
 def test_feed_is_open_and_returns_latest_reading():
     user, device, secret = _device_with_secret()
@@ -125,7 +407,7 @@ def test_pump_next_task_delivers_pending_manual_task():
 
 
 @pytest.mark.django_db
-@patch("readings.views.send_watering_completed_notifications")
+@patch("readings.views.send_watering_completed_notifications_task.delay")
 def test_pump_complete_records_manual_execution(mock_notify, django_capture_on_commit_callbacks):
     user, device, secret = _device_with_secret(pump_included=True)
     task = PumpTask.objects.create(device=device, status=PumpTask.STATUS_DELIVERED)
@@ -1,3 +1,7 @@
+import csv
+import gzip
+from datetime import timedelta
+from io import BytesIO
 from unittest.mock import patch
 
 import pytest
@@ -5,6 +9,7 @@ from django.contrib.auth import get_user_model
 from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
+from openpyxl import load_workbook
 from rest_framework.test import APIClient
 
 from locations.models import Location
@@ -62,7 +67,7 @@ def test_device_setup_returns_secret_and_endpoint_samples():
 
 
 @pytest.mark.django_db
-@patch("readings.views.send_templated_email")
+@patch("readings.views.enqueue_templated_email")
 def test_readings_export_email_sends_xlsx_attachment(mock_send):
     user = User.objects.create_user(email="test@example.com", password="strong-password-123")
     device = _device(user)
@@ -117,3 +122,55 @@ def test_readings_export_email_rejects_invalid_status():
     data = response.json()
     assert response.status_code == 400
     assert "status" in data
+
+
+@pytest.mark.django_db
+@patch("readings.views.enqueue_templated_email")
+def test_readings_export_email_xlsx_is_sorted_in_db_and_sized(mock_send):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = _device(user)
+    device.device_name = "A sensor with a rather long device name"
+    device.save(update_fields=["device_name"])
+    now = timezone.now()
+    for minutes, moisture in ((30, 10), (10, 30), (20, 20)):
+        Reading.objects.create(device=device, timestamp=now - timedelta(minutes=minutes), moisture=moisture)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post(
+        reverse("readings-export-email"),
+        data={"sortKey": "lastRead", "sortDir": "asc"},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    workbook = load_workbook(BytesIO(mock_send.call_args.kwargs["attachments"][0]["content"]))
+    sheet = workbook["Readings"]
+    assert [row[6] for row in sheet.iter_rows(min_row=2, values_only=True)] == [10, 20, 30]
+    assert sheet["A1"].font.bold
+    assert sheet.column_dimensions["C"].width == len(device.device_name) + 2
+    assert workbook.sheetnames == ["Readings", "Watering Tasks"]
+
+
+@pytest.mark.django_db
+@patch("readings.views.enqueue_templated_email")
+def test_readings_export_email_can_send_gzipped_csv(mock_send):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = _device(user)
+    Reading.objects.create(device=device, timestamp=timezone.now(), temperature=22.5)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post(reverse("readings-export-email"), data={"fileFormat": "csv"}, format="json")
+
+    assert response.status_code == 200
+    kwargs = mock_send.call_args.kwargs
+    readings_file, tasks_file = kwargs["attachments"]
+    assert readings_file["filename"].endswith(".csv.gz")
+    assert readings_file["mimetype"] == "application/gzip"
+    rows = list(csv.reader(gzip.decompress(readings_file["content"]).decode("utf-8-sig").splitlines()))
+    assert rows[0][0] == "Plant Name"
+    assert rows[1][:4] == ["Monstera", "Living room", "Sensor", "22.5"]
+    assert kwargs["context"]["total_count"] == 1
+    assert kwargs["context"]["watering_tasks_count"] == 0
+    assert tasks_file["filename"] in kwargs["context"]["attachment_filename"]
@@ -0,0 +1,85 @@
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from locations.models import Location
+from plant_instances.models import PlantInstance
+from readings.history import db_bins, python_bins, rollup_bins
+from readings.models import Reading, ReadingDevice
+from readings.rollups import mark_rollups_dirty, rollup_day
+from readings.tasks import refresh_reading_rollups
+
+User = get_user_model()
+
+METRICS = ["temperature", "humidity", "light", "moisture"]
+
+
+def _device_with_hourly_year():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    location = Location.objects.create(user=user, name="Living room", category="indoor")
+    plant = PlantInstance.objects.create(user=user, location=location, display_name="Monstera")
+    device = ReadingDevice.objects.create(user=user, plant=plant, device_name="Sensor")
+
+    start = timezone.datetime(2025, 6, 1, 0, 0, tzinfo=dt_timezone.utc)
+    readings = Reading.objects.bulk_create(
+        [
+            Reading(
+                device=device,
+                timestamp=start + timedelta(hours=i),
+                temperature=18 + (i % 24) * 0.25,
+                humidity=40 + (i % 7),
+                light=(i % 24) * 50,
+                moisture=None if i % 11 == 0 else 20 + (i % 30),
+            )
+            for i in range(365 * 24)
+        ],
+        batch_size=1000,
+    )
+    # bulk_create skips signals, so flag the rollups like the ingest views do.
+    mark_rollups_dirty({(device.id, rollup_day(r.timestamp)) for r in readings})
+    return device
+
+
+def _month_span():
+    tz = timezone.get_current_timezone()
+    span_from = timezone.make_aware(timezone.datetime(2026, 3, 1), tz)
+    span_to = timezone.make_aware(timezone.datetime(2026, 3, 31, 23, 59, 59, 999999), tz)
+    return span_from, span_to, 31
+
+
+def _rounded(bins):
+    return {
+        metric: [(b["cnt"], b["min"], b["max"], round(b["sum"], 6)) for b in metric_bins]
+        for metric, metric_bins in bins.items()
+    }
+
+
+@pytest.mark.django_db
+def test_history_engines_agree_on_month_with_dst_change():
+    device = _device_with_hourly_year()
+    refresh_reading_rollups(max_batches=5)
+    span_from, span_to, bin_count = _month_span()
+
+    expected = _rounded(python_bins(device, METRICS, "month", span_from, span_to, bin_count))
+
+    assert _rounded(db_bins(device, METRICS, "month", span_from, span_to, bin_count)) == expected
+    assert _rounded(rollup_bins(device, METRICS, span_from.date(), bin_count)) == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("engine", ["python", "db"])
+def test_benchmark_month_history_bucketing(benchmark, engine):
+    device = _device_with_hourly_year()
+    span_from, span_to, bin_count = _month_span()
+    bucket = python_bins if engine == "python" else db_bins
+
+    bins = benchmark.pedantic(
+        bucket,
+        args=(device, METRICS, "month", span_from, span_to, bin_count),
+        rounds=10,
+    )
+
+    assert sum(b["cnt"] for b in bins["temperature"]) == 31 * 24 - 1  # DST: March has 743 hours
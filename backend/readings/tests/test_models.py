@@ -1,10 +1,16 @@
+from io import StringIO
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
 from django.utils import timezone
 
 from locations.models import Location
 from plant_instances.models import PlantInstance
+from readings.credentials import resolve_account_user_id
 from readings.models import AccountSecret, PumpTask, Reading, ReadingDevice
+from readings.utils import hash_account_secret
 
 User = get_user_model()
 
@@ -22,6 +28,34 @@ def test_account_secret_string_representation():
     assert str(secret) == f"AccountSecret<{user.id}>"
 
 
+@pytest.mark.django_db
+def test_account_secret_keeps_secret_hash_in_sync():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    secret = AccountSecret.objects.create(user=user, secret="secret-123")
+
+    secret.secret = "secret-456"
+    secret.save(update_fields=["secret"])
+    secret.refresh_from_db()
+
+    assert secret.secret_hash == hash_account_secret("secret-456")
+    assert secret.secret_hash != "secret-456"
+
+
+@pytest.mark.django_db
+def test_rehash_account_secrets_restores_lookups_after_a_key_rotation():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    AccountSecret.objects.create(user=user, secret="secret-123")
+
+    with override_settings(READINGS_SECRET_HASH_KEY="rotated-key"):
+        assert resolve_account_user_id("secret-123") is None
+
+        out = StringIO()
+        call_command("rehash_account_secrets", stdout=out)
+
+        assert "Rehashed 1 of 1" in out.getvalue()
+        assert resolve_account_user_id("secret-123") == user.id
+
+
 @pytest.mark.django_db
 def test_reading_device_generates_device_key_and_caches_plant_display():
     user = User.objects.create_user(email="test@example.com", password="strong-password-123")
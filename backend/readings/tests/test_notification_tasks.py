@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+
+from readings.tasks import (
+    send_moisture_alert_notifications_task,
+    send_watering_completed_notifications_task,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@patch("readings.tasks.send_moisture_alert_notifications", return_value=[])
+def test_moisture_alert_task_is_deduplicated_per_device_and_hour(mock_send):
+    send_moisture_alert_notifications_task.apply(kwargs={"device_id": 7, "moisture_value": 12.0})
+    send_moisture_alert_notifications_task.apply(kwargs={"device_id": 7, "moisture_value": 11.0})
+    send_moisture_alert_notifications_task.apply(kwargs={"device_id": 8, "moisture_value": 11.0})
+
+    assert [c.kwargs["device_id"] for c in mock_send.call_args_list] == [7, 8]
+
+
+@patch("readings.tasks.send_watering_completed_notifications", return_value=[])
+@patch("readings.tasks.send_moisture_alert_notifications", return_value=[])
+def test_dedupe_is_per_notification_kind(mock_alert, mock_watering):
+    send_moisture_alert_notifications_task.apply(kwargs={"device_id": 7, "moisture_value": 12.0})
+    send_watering_completed_notifications_task.apply(kwargs={"device_id": 7, "source": "manual"})
+
+    mock_alert.assert_called_once()
+    mock_watering.assert_called_once_with(device_id=7, source="manual", channels=("email", "push"))
+
+
+@patch("readings.tasks.send_watering_completed_notifications", side_effect=[["push"], []])
+def test_failed_channels_are_retried_without_resending_the_others(mock_send):
+    send_watering_completed_notifications_task.apply(kwargs={"device_id": 7, "source": "automatic"})
+
+    assert mock_send.call_count == 2
+    assert mock_send.call_args_list[1].kwargs == {"device_id": 7, "source": "automatic", "channels": ["push"]}
+
+
+@patch("readings.tasks.send_moisture_alert_notifications", return_value=["email"])
+def test_retries_stop_after_max_retries(mock_send):
+    send_moisture_alert_notifications_task.apply(kwargs={"device_id": 7, "moisture_value": 12.0})
+
+    assert mock_send.call_count == send_moisture_alert_notifications_task.max_retries + 1
@@ -0,0 +1,101 @@
+import pytest
+from datetime import date
+from datetime import timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from locations.models import Location
+from plant_instances.models import PlantInstance
+from readings.models import Reading, ReadingDevice, ReadingRollup
+from readings.partitions import month_range
+from readings.retention import apply_retention
+from readings.tasks import refresh_reading_rollups
+
+User = get_user_model()
+
+TODAY = date(2026, 6, 30)
+
+
+def _device(email):
+    user = User.objects.create_user(email=email, password="strong-password-123")
+    location = Location.objects.create(user=user, name="Living room", category="indoor")
+    plant = PlantInstance.objects.create(user=user, location=location, display_name="Monstera")
+    return ReadingDevice.objects.create(user=user, plant=plant, device_name="Sensor")
+
+
+def _reading(device, day, hour, moisture):
+    return Reading.objects.create(
+        device=device,
+        timestamp=timezone.datetime(2026, day.month, day.day, hour, 0, tzinfo=dt_timezone.utc),
+        moisture=moisture,
+    )
+
+
+@pytest.mark.django_db
+def test_retention_compacts_only_readings_past_each_users_policy():
+    short = _device("short@example.com")
+    forever = _device("forever@example.com")
+    short.user.profile_settings.readings_retention_days = 30
+    short.user.profile_settings.save(update_fields=["readings_retention_days"])
+
+    for device in (short, forever):
+        _reading(device, date(2026, 5, 4), 8, 30)
+        _reading(device, date(2026, 5, 4), 12, 50)
+        _reading(device, date(2026, 6, 20), 8, 40)
+
+    removed = apply_retention(today=TODAY)
+
+    assert removed == 2
+    assert list(short.readings.values_list("moisture", flat=True)) == [40]
+    assert forever.readings.count() == 3
+
+    rollup = ReadingRollup.objects.get(device=short, day=date(2026, 5, 4))
+    assert rollup.compacted_at is not None
+    assert rollup.dirty_since is None
+    assert (rollup.moisture_min, rollup.moisture_max, rollup.moisture_sum, rollup.moisture_count) == (30, 50, 80, 2)
+
+
+@pytest.mark.django_db
+@override_settings(READINGS_RAW_RETENTION_DAYS=30, READINGS_RETENTION_BATCH_SIZE=1)
+def test_retention_default_applies_in_batches_to_users_without_policy():
+    device = _device("test@example.com")
+    for day in (date(2026, 4, 1), date(2026, 4, 2), date(2026, 5, 4)):
+        _reading(device, day, 8, 30)
+
+    assert apply_retention(today=TODAY) == 3
+    assert device.readings.count() == 0
+    assert ReadingRollup.objects.filter(device=device, compacted_at__isnull=False).count() == 3
+
+
+@pytest.mark.django_db
+def test_late_reading_is_merged_into_compacted_rollup():
+    device = _device("test@example.com")
+    _reading(device, date(2026, 5, 4), 8, 30)
+    call_command("compact_readings", days=30, user=device.user_id)
+
+    _reading(device, date(2026, 5, 4), 9, 10)
+    refresh_reading_rollups()
+
+    rollup = ReadingRollup.objects.get(device=device, day=date(2026, 5, 4))
+    assert (rollup.moisture_min, rollup.moisture_max, rollup.moisture_sum, rollup.moisture_count) == (10, 30, 40, 2)
+    assert device.readings.count() == 0
+
+
+def test_compact_readings_command_requires_days_with_user():
+    with pytest.raises(CommandError):
+        call_command("compact_readings", user=1)
+
+
+@pytest.mark.django_db
+def test_reading_partitions_command_requires_postgresql():
+    with pytest.raises(CommandError):
+        call_command("reading_partitions")
+
+
+def test_partition_month_range_spans_year_boundary():
+    start = timezone.datetime(2025, 11, 15, tzinfo=dt_timezone.utc)
+    end = timezone.datetime(2026, 2, 1, tzinfo=dt_timezone.utc)
+
+    assert list(month_range(start, end)) == [(2025, 11), (2025, 12), (2026, 1), (2026, 2)]
@@ -0,0 +1,74 @@
+import pytest
+from datetime import date
+from datetime import timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from locations.models import Location
+from plant_instances.models import PlantInstance
+from readings.models import Reading, ReadingDevice, ReadingRollup
+from readings.tasks import refresh_reading_rollups
+
+User = get_user_model()
+
+
+def _device(user):
+    location = Location.objects.create(user=user, name="Living room", category="indoor")
+    plant = PlantInstance.objects.create(user=user, location=location, display_name="Monstera")
+    return ReadingDevice.objects.create(user=user, plant=plant, device_name="Sensor")
+
+
+@pytest.mark.django_db
+def test_refresh_task_aggregates_dirty_days_by_local_date():
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = _device(user)
+    # 22:30 UTC on May 4th is already May 5th in Europe/Warsaw.
+    for hour, minute, moisture in ((8, 0, 30), (16, 0, 50), (22, 30, 10)):
+        Reading.objects.create(
+            device=device,
+            timestamp=timezone.datetime(2026, 5, 4, hour, minute, tzinfo=dt_timezone.utc),
+            moisture=moisture,
+        )
+
+    assert ReadingRollup.objects.filter(device=device, dirty_since__isnull=False).count() == 2
+
+    refresh_reading_rollups()
+
+    may4 = ReadingRollup.objects.get(device=device, day=date(2026, 5, 4))
+    may5 = ReadingRollup.objects.get(device=device, day=date(2026, 5, 5))
+    assert may4.dirty_since is None
+    assert (may4.moisture_min, may4.moisture_max, may4.moisture_sum, may4.moisture_count) == (30, 50, 80, 2)
+    assert may4.temperature_count == 0
+    assert may5.moisture_count == 1
+
+
+@pytest.mark.django_db
+def test_history_month_is_served_from_rollups(django_assert_num_queries):
+    user = User.objects.create_user(email="test@example.com", password="strong-password-123")
+    device = _device(user)
+    Reading.objects.create(
+        device=device,
+        timestamp=timezone.datetime(2026, 5, 4, 8, 0, tzinfo=dt_timezone.utc),
+        temperature=18,
+    )
+    refresh_reading_rollups()
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    # Device lookup plus one rollup query; no raw readings are loaded.
+    with django_assert_num_queries(2):
+        response = client.get(
+            reverse("history"),
+            data={
+                "device_id": device.id,
+                "range": "month",
+                "metric": "temperature",
+                "anchor": "2026-05-05T12:00:00Z",
+            },
+        )
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["points"][3]["value"] == 18.0
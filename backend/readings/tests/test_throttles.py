@@ -0,0 +1,74 @@
+import fakeredis
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+from rest_framework.parsers import JSONParser
+
+from core.caching import redis_client
+from readings.throttles import IngestPerDeviceThrottle, _gcra_redis, acquire_rate_slot
+
+
+def _locmem():
+    return LocMemCache("throttle-tests", {})
+
+
+def test_acquire_rate_slot_allows_rate_then_reports_wait():
+    cache = _locmem()
+
+    results = [acquire_rate_slot(cache, "ingest:ABC", 3, 60) for _ in range(4)]
+
+    assert results[:3] == [0, 0, 0]
+    assert 0 < results[3] <= 20
+
+
+def test_acquire_rate_slot_keys_are_independent():
+    cache = _locmem()
+
+    assert acquire_rate_slot(cache, "ingest:A", 1, 60) == 0
+    assert acquire_rate_slot(cache, "ingest:B", 1, 60) == 0
+    assert acquire_rate_slot(cache, "ingest:A", 1, 60) > 0
+
+
+def test_ingest_throttle_blocks_after_rate_and_exposes_wait(monkeypatch):
+    cache = _locmem()
+    monkeypatch.setattr(IngestPerDeviceThrottle, "cache", cache)
+    monkeypatch.setattr(IngestPerDeviceThrottle, "THROTTLE_RATES", {"ingest_per_device": "2/hour"})
+
+    def _request():
+        raw = APIRequestFactory().post("/", {"device_key": "AB12CD34"}, format="json")
+        return Request(raw, parsers=[JSONParser()])
+
+    throttle = IngestPerDeviceThrottle()
+    allowed = [throttle.allow_request(_request(), None) for _ in range(3)]
+
+    assert allowed == [True, True, False]
+    assert throttle.wait() > 0
+
+
+def _fake_redis_cache():
+    # Django's own RedisCache, with redis-py talking to an in-memory fakeredis server.
+    return RedisCache(
+        "redis://fake:6379/0",
+        {"OPTIONS": {"connection_class": fakeredis.FakeRedisConnection, "server": fakeredis.FakeServer()}},
+    )
+
+
+def test_gcra_lua_script_on_redis():
+    client = fakeredis.FakeRedis()
+
+    waits = [_gcra_redis(client, "gcra:ingest:ABC", 20_000, 60_000) for _ in range(4)]
+
+    assert waits[:3] == [0, 0, 0]
+    assert 0 < waits[3] <= 20_000
+    assert 0 < client.pttl("gcra:ingest:ABC") <= 60_000
+
+
+def test_acquire_rate_slot_runs_the_lua_script_on_redis_cache():
+    cache = _fake_redis_cache()
+
+    results = [acquire_rate_slot(cache, "ingest:ABC", 3, 60) for _ in range(4)]
+
+    assert results[:3] == [0, 0, 0]
+    assert 0 < results[3] <= 20
+    assert redis_client(cache, "gcra:ingest:ABC").pttl(cache.make_and_validate_key("gcra:ingest:ABC")) > 0
@@ -1,7 +1,102 @@
+import hashlib
+import math
+import threading
+import time
+
 from rest_framework.throttling import SimpleRateThrottle
 
+from core.caching import redis_client
+
+# GCRA (token bucket) state is a single "theoretical arrival time" in ms per key.
+# On Redis the check-and-update runs as one Lua script, so each throttle check is
+# a single round trip and is atomic across all gunicorn workers.
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+  tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - burst
+if allow_at > now then
+  return allow_at - now
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+return 0
+"""
+
+_gcra_script = None
+_local_lock = threading.Lock()
+
+
+def _gcra_redis(client, key, interval_ms: int, burst_ms: int) -> int:
+    global _gcra_script
+    if _gcra_script is None:
+        _gcra_script = client.register_script(_GCRA_LUA)
+    return int(_gcra_script(keys=[key], args=[interval_ms, burst_ms], client=client))
+
+
+def _gcra_local(cache, key, interval_ms: int, burst_ms: int) -> int:
+    # Non-Redis caches (LocMem in dev/tests) are per-process, so a process lock is enough.
+    with _local_lock:
+        now = int(time.time() * 1000)
+        tat = max(cache.get(key) or now, now)
+        new_tat = tat + interval_ms
+        allow_at = new_tat - burst_ms
+        if allow_at > now:
+            return allow_at - now
+        cache.set(key, new_tat, math.ceil((new_tat - now) / 1000))
+        return 0
+
+
+def acquire_rate_slot(cache, key: str, num_requests: int, duration: int) -> float:
+    """
+    Try to take one request slot for `key` at `num_requests` per `duration` seconds.
+
+    Returns 0 when the request is allowed, otherwise the number of seconds to wait.
+    """
+    key = f"gcra:{key}"
+    interval_ms = math.ceil(duration * 1000 / num_requests)
+    burst_ms = duration * 1000
+
+    client = redis_client(cache, key)
+    if client is not None:
+        wait_ms = _gcra_redis(client, cache.make_and_validate_key(key), interval_ms, burst_ms)
+    else:
+        wait_ms = _gcra_local(cache, key, interval_ms, burst_ms)
+
+    return wait_ms / 1000
+
 
-class IngestPerDeviceThrottle(SimpleRateThrottle):
+class SharedCacheRateThrottle(SimpleRateThrottle):
+    """
+    SimpleRateThrottle with an atomic token bucket instead of a request-history list.
+
+    Uses the default Django cache, which is Redis in deployments (USE_REDIS_CACHE),
+    so limits hold across all workers and each key stores a single number.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self._wait = acquire_rate_slot(self.cache, self.key, self.num_requests, self.duration)
+        if self._wait > 0:
+            return self.throttle_failure()
+        return True
+
+    def wait(self):
+        return getattr(self, "_wait", None) or None
+
+
+class IngestPerDeviceThrottle(SharedCacheRateThrottle):
     scope = "ingest_per_device"
 
     def get_cache_key(self, request, view):
@@ -13,7 +108,7 @@ class IngestPerDeviceThrottle(SimpleRateThrottle):
         return f"ingest:{ident}"
 
 
-class FeedPerDeviceThrottle(SimpleRateThrottle):
+class FeedPerDeviceThrottle(SharedCacheRateThrottle):
     scope = "feed_per_device"
 
     def get_cache_key(self, request, view):
@@ -23,3 +118,19 @@ class FeedPerDeviceThrottle(SimpleRateThrottle):
         if not ident:
             return None
         return f"feed:{ident}"
+
+
+class IngestBatchPerDeviceThrottle(SharedCacheRateThrottle):
+    scope = "ingest_batch_per_device"
+
+    def get_cache_key(self, request, view):
+        device_id = request.data.get("device_id")
+        device_key = request.data.get("device_key")
+        ident = device_id or device_key
+        if not ident:
+            # Multi-device batches are throttled per account secret.
+            secret_str = request.data.get("secret")
+            if not secret_str:
+                return None
+            ident = hashlib.sha256(str(secret_str).encode("utf-8")).hexdigest()[:32]
+        return f"ingest-batch:{ident}"
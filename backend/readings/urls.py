@@ -4,9 +4,11 @@ from .views import (
     ReadingDeviceViewSet,
     rotate_secret,
     ingest,
+    ingest_batch,
     feed,
     device_setup,
     history,
+    dashboard_history,
     readings_export_email,
     pump_next_task,
     pump_complete,
@@ -21,8 +23,10 @@ urlpatterns = [
     path("rotate-secret/", rotate_secret, name="rotate-secret"),
     path("device-setup/", device_setup, name="device-setup"),
     path("ingest/", ingest, name="ingest"),
+    path("ingest-batch/", ingest_batch, name="ingest-batch"),
     path("feed/", feed, name="feed"),
     path("history/", history, name="history"),
+    path("dashboard-history/", dashboard_history, name="dashboard-history"),
     path("export-email/", readings_export_email, name="readings-export-email"),
     path("pump-next-task/", pump_next_task, name="pump-next-task"),
     path("pump-complete/", pump_complete, name="pump-complete"),
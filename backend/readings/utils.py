@@ -1,3 +1,5 @@
+import hashlib
+import hmac
 from urllib.parse import urlencode
 
 from django.conf import settings
@@ -12,6 +14,18 @@ def parse_ts_or_now(value):
     return dt if dt is not None else timezone.now()
 
 
+def hash_account_secret(secret: str) -> str:
+    """
+    Keyed hash of an account secret, stored in AccountSecret.secret_hash for indexed lookups.
+    """
+    key = getattr(settings, "READINGS_SECRET_HASH_KEY", "") or settings.SECRET_KEY
+    return hmac.new(
+        str(key).encode("utf-8"),
+        str(secret or "").encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+
 def _deeplink_base() -> str:
     scheme = getattr(settings, "DEEP_LINK_SCHEME", "flovers").strip()
     host = (getattr(settings, "DEEP_LINK_HOST", "") or "").strip().strip("/")
@@ -1,20 +1,21 @@
-from io import BytesIO
-import math
+import hashlib
 import secrets
-from datetime import timedelta
+from datetime import timedelta, timezone as dt_timezone
 
 from django.conf import settings
 from django.http import HttpResponse, Http404
 from django.shortcuts import get_object_or_404
-from django.db import IntegrityError, transaction
+from django.db import transaction
+from django.db.models import Prefetch
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import api_view, permission_classes, throttle_classes, action
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
 
-from core.emailing import send_templated_email
+from core.outbox import enqueue_templated_email
 
 from .models import ReadingDevice, Reading, AccountSecret, PumpTask
 from .serializers import (
@@ -23,14 +24,26 @@ from .serializers import (
     ReadingSerializer,
     ReadingsExportEmailSerializer,
     PumpTaskSerializer,
+    IngestBatchSerializer,
 )
 from .utils import parse_ts_or_now
-from .throttles import IngestPerDeviceThrottle, FeedPerDeviceThrottle
+from .throttles import IngestPerDeviceThrottle, IngestBatchPerDeviceThrottle, FeedPerDeviceThrottle
 from .codegen import generate_arduino_code
+from .credentials import resolve_account_user_id, resolve_device
+from .history import bin_values, history_bins, hourly_bins_by_device
+from .rollups import mark_rollups_dirty, rollup_day
 from .emails import send_device_code_email
-from .notifications import (
-    send_moisture_alert_notifications,
-    send_watering_completed_notifications,
+from .exports import EXPORT_FORMAT_XLSX, build_readings_export
+from .ingest import (
+    record_moisture_alert_state,
+    record_moisture_alert_states,
+    update_device_snapshot,
+    upsert_reading,
+    upsert_readings,
+)
+from .tasks import (
+    send_moisture_alert_notifications_task,
+    send_watering_completed_notifications_task,
 )
 
 
@@ -38,6 +51,9 @@ from .notifications import (
 
 PUMP_TASK_TTL_HOURS = 2
 
+DASHBOARD_HISTORY_DEFAULT_HOURS = 24
+DASHBOARD_HISTORY_MAX_HOURS = 168
+
 
 def _get_or_create_secret(user) -> AccountSecret:
     obj, created = AccountSecret.objects.get_or_create(
@@ -67,12 +83,6 @@ def _request_lang(request) -> str:
     return _normalize_lang(lang)
 
 
-def _format_dt_local(dt):
-    if not dt:
-        return ""
-    return timezone.localtime(dt).strftime("%Y-%m-%d %H:%M:%S")
-
-
 def _bool_label(v: bool) -> str:
     return "Yes" if v else "No"
 
@@ -104,10 +114,11 @@ def _serialize_pump_task_for_app(task):
     return data
 
 
-def _resolve_device_from_secret_and_key(request):
-    device_id = request.data.get("device_id")
-    device_key = request.data.get("device_key")
-    secret_str = request.data.get("secret")
+def _resolve_device_from_secret_and_key(request, params=None):
+    params = request.data if params is None else params
+    device_id = params.get("device_id")
+    device_key = params.get("device_key")
+    secret_str = params.get("secret")
 
     if not (device_key and secret_str):
         return None, Response(
@@ -115,26 +126,15 @@ def _resolve_device_from_secret_and_key(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    acct = AccountSecret.objects.select_related("user").filter(secret=secret_str).first()
-    if not acct:
+    secret_ok, device = resolve_device(secret_str, device_key)
+    if not secret_ok:
         return None, Response(
             {"detail": "invalid credentials"},
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    if device_id:
-        device = get_object_or_404(
-            ReadingDevice,
-            id=device_id,
-            device_key=device_key,
-            user=acct.user,
-        )
-    else:
-        device = get_object_or_404(
-            ReadingDevice,
-            device_key=device_key,
-            user=acct.user,
-        )
+    if device is None or (device_id and str(device.id) != str(device_id)):
+        raise Http404
 
     if not device.is_active:
         return None, Response(
@@ -145,192 +145,6 @@ def _resolve_device_from_secret_and_key(request):
     return device, None
 
 
-def _autosize_worksheet_columns(ws):
-    for col in ws.columns:
-        max_len = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            try:
-                value = str(cell.value or "")
-            except Exception:
-                value = ""
-            if len(value) > max_len:
-                max_len = len(value)
-        ws.column_dimensions[col_letter].width = min(max(max_len + 2, 12), 42)
-
-
-def _build_readings_export_workbook(readings, pump_tasks, sort_key: str, sort_dir: str) -> bytes:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font
-
-    reverse = sort_dir == "desc"
-
-    reading_rows = []
-
-    for reading in readings:
-        device = reading.device
-
-        reading_rows.append({
-            "plant_name": device.plant_name or "",
-            "location": device.plant_location or "",
-            "device_name": device.device_name or "",
-            "latest_temperature": reading.temperature,
-            "latest_humidity": reading.humidity,
-            "latest_light": reading.light,
-            "latest_moisture": reading.moisture,
-            "created_at": _format_dt_local(reading.timestamp),
-            "_ts": reading.timestamp,
-        })
-
-    if sort_key == "name":
-        reading_rows.sort(
-            key=lambda r: (
-                (r["plant_name"] or "").lower(),
-                (r["device_name"] or "").lower(),
-                r["_ts"],
-            ),
-            reverse=reverse,
-        )
-    elif sort_key == "location":
-        reading_rows.sort(
-            key=lambda r: (
-                (r["location"] or "").lower(),
-                (r["plant_name"] or "").lower(),
-                (r["device_name"] or "").lower(),
-                r["_ts"],
-            ),
-            reverse=reverse,
-        )
-    else:  # lastRead
-        reading_rows.sort(
-            key=lambda r: r["_ts"],
-            reverse=reverse,
-        )
-
-    wb = Workbook()
-
-    ws_readings = wb.active
-    ws_readings.title = "Readings"
-
-    readings_headers = [
-        "Plant Name",
-        "Location",
-        "Device Name",
-        "Temperature",
-        "Humidity",
-        "Light",
-        "Soil Moisture",
-        "Created At",
-    ]
-    ws_readings.append(readings_headers)
-
-    for cell in ws_readings[1]:
-        cell.font = Font(bold=True)
-
-    for row in reading_rows:
-        ws_readings.append([
-            row["plant_name"],
-            row["location"],
-            row["device_name"],
-            row["latest_temperature"],
-            row["latest_humidity"],
-            row["latest_light"],
-            row["latest_moisture"],
-            row["created_at"],
-        ])
-
-    _autosize_worksheet_columns(ws_readings)
-
-    task_rows = []
-
-    for task in pump_tasks:
-        device = task.device
-
-        task_rows.append({
-            "plant_name": device.plant_name or "",
-            "location": device.plant_location or "",
-            "device_name": device.device_name or "",
-            "source": task.source or "",
-            "status": task.status or "",
-            "requested_at": _format_dt_local(task.requested_at),
-            "delivered_at": _format_dt_local(task.delivered_at),
-            "executed_at": _format_dt_local(task.executed_at),
-            "cancelled_at": _format_dt_local(task.cancelled_at),
-            "moisture_at_request": task.moisture_at_request,
-            "threshold_at_request": task.threshold_at_request,
-            "error_message": task.error_message or "",
-            "_ts": task.requested_at,
-        })
-
-    if sort_key == "name":
-        task_rows.sort(
-            key=lambda r: (
-                (r["plant_name"] or "").lower(),
-                (r["device_name"] or "").lower(),
-                r["_ts"],
-            ),
-            reverse=reverse,
-        )
-    elif sort_key == "location":
-        task_rows.sort(
-            key=lambda r: (
-                (r["location"] or "").lower(),
-                (r["plant_name"] or "").lower(),
-                (r["device_name"] or "").lower(),
-                r["_ts"],
-            ),
-            reverse=reverse,
-        )
-    else:  # lastRead / task timestamp
-        task_rows.sort(
-            key=lambda r: r["_ts"],
-            reverse=reverse,
-        )
-
-    ws_tasks = wb.create_sheet("Watering Tasks")
-
-    tasks_headers = [
-        "Plant Name",
-        "Location",
-        "Device Name",
-        "Source",
-        "Status",
-        "Requested At",
-        "Delivered At",
-        "Executed At",
-        "Cancelled At",
-        "Moisture At Request",
-        "Threshold At Request",
-        "Error Message",
-    ]
-    ws_tasks.append(tasks_headers)
-
-    for cell in ws_tasks[1]:
-        cell.font = Font(bold=True)
-
-    for row in task_rows:
-        ws_tasks.append([
-            row["plant_name"],
-            row["location"],
-            row["device_name"],
-            row["source"],
-            row["status"],
-            row["requested_at"],
-            row["delivered_at"],
-            row["executed_at"],
-            row["cancelled_at"],
-            row["moisture_at_request"],
-            row["threshold_at_request"],
-            row["error_message"],
-        ])
-
-    _autosize_worksheet_columns(ws_tasks)
-
-    stream = BytesIO()
-    wb.save(stream)
-    return stream.getvalue()
-
-
 def _expire_old_pump_tasks(device: ReadingDevice):
     now = timezone.now()
 
@@ -459,6 +273,63 @@ def _weekday_short(dt: timezone.datetime) -> str:
     return ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][dt.weekday()]
 
 
+def _parse_history_metrics(raw: str | None) -> list[str] | None:
+    """
+    Parse "temperature" or "temperature,moisture" into an ordered, de-duplicated list.
+    Returns None if any metric is unknown.
+    """
+    metrics = []
+    for part in (raw or "temperature").split(","):
+        metric = part.strip()
+        if not metric:
+            continue
+        if metric not in VALID_METRICS:
+            return None
+        if metric not in metrics:
+            metrics.append(metric)
+    return metrics or None
+
+
+def _history_metrics_and_stat(params):
+    """
+    Validate the shared `metric` / `stat` query params.
+    Returns (metrics, stat, None) or (None, None, error_response).
+    """
+    metrics = _parse_history_metrics(params.get("metric"))
+    if metrics is None:
+        return None, None, Response({
+            "detail": "metric must be one of: temperature, humidity, light, moisture"
+        }, status=400)
+
+    stat = params.get("stat", "avg")
+    if stat not in VALID_HISTORY_STATS:
+        return None, None, Response({"detail": "stat must be one of: avg, max, min"}, status=400)
+
+    return metrics, stat, None
+
+
+def _dashboard_etag(user_id, devices, metrics, stat, hours, span_from) -> str:
+    """
+    Cheap validator for the dashboard payload, built without touching readings.
+
+    Every write or delete of a device's readings bumps readings_changed_at (late
+    out-of-order samples included), edits bump updated_at and the window start
+    moves every hour, so the tag changes whenever the tiles can.
+    """
+    parts = [str(user_id), ",".join(metrics), stat, str(hours), span_from.isoformat()]
+    for device in devices:
+        parts.append("|".join([
+            str(device.id),
+            device.device_name,
+            device.plant_name,
+            device.last_read_at.isoformat() if device.last_read_at else "",
+            device.readings_changed_at.isoformat() if device.readings_changed_at else "",
+            device.updated_at.isoformat(),
+        ]))
+    digest = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:32]
+    return quote_etag(digest)
+
+
 # ---------- ViewSet: Devices CRUD ----------
 
 class ReadingDeviceViewSet(viewsets.ModelViewSet):
@@ -466,7 +337,20 @@ class ReadingDeviceViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return ReadingDevice.objects.filter(user=self.request.user)
+        qs = ReadingDevice.objects.filter(user=self.request.user)
+        if self.action != "list":
+            # Single-device actions look the task up themselves (one query either way).
+            return qs
+        return qs.prefetch_related(
+            Prefetch(
+                "pump_tasks",
+                queryset=PumpTask.objects.filter(
+                    source=PumpTask.SOURCE_MANUAL,
+                    status__in=[PumpTask.STATUS_PENDING, PumpTask.STATUS_DELIVERED],
+                ).order_by("-requested_at"),
+                to_attr="open_manual_pump_tasks",
+            )
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -695,6 +579,7 @@ def device_setup(request):
     return Response({
         "endpoints": {
             "ingest": f"{base}/api/readings/ingest/",
+            "ingest_batch": f"{base}/api/readings/ingest-batch/",
             "read": f"{base}/api/readings/feed/",
         },
         "sample_payloads": {
@@ -762,30 +647,20 @@ def readings_export_email(request):
     elif status_value == "disabled":
         device_qs = device_qs.filter(is_active=False)
 
-    readings_qs = (
-        Reading.objects
-        .filter(device__in=device_qs)
-        .select_related("device")
-    )
-
-    pump_tasks_qs = (
-        PumpTask.objects
-        .filter(device__in=device_qs)
-        .select_related("device")
-    )
+    readings_qs = Reading.objects.filter(device__in=device_qs)
+    pump_tasks_qs = PumpTask.objects.filter(device__in=device_qs)
 
-    readings = list(readings_qs)
-    pump_tasks = list(pump_tasks_qs)
+    now_label = timezone.localtime(timezone.now()).strftime("%Y%m%d-%H%M%S")
 
-    xlsx_bytes = _build_readings_export_workbook(
-        readings=readings,
-        pump_tasks=pump_tasks,
+    attachments, readings_count, pump_tasks_count = build_readings_export(
+        readings_qs,
+        pump_tasks_qs,
         sort_key=sort_key,
         sort_dir=sort_dir,
+        export_format=data.get("fileFormat", EXPORT_FORMAT_XLSX),
+        filename_stem=f"flovers-readings-{now_label}",
     )
-
-    now_label = timezone.localtime(timezone.now()).strftime("%Y%m%d-%H%M%S")
-    attachment_filename = f"flovers-readings-{now_label}.xlsx"
+    attachment_filename = ", ".join(a["filename"] for a in attachments)
 
     context = {
         "plant_value": str(plant_id) if plant_id else "Any plant",
@@ -793,24 +668,18 @@ def readings_export_email(request):
         "status_value": status_value or "Any status",
         "sort_key_value": sort_key,
         "sort_dir_value": sort_dir,
-        "total_count": len(readings),
-        "watering_tasks_count": len(pump_tasks),
+        "total_count": readings_count,
+        "watering_tasks_count": pump_tasks_count,
         "attachment_filename": attachment_filename,
     }
 
-    send_templated_email(
+    enqueue_templated_email(
         to_email=to_email,
         template_name="readings/export",
         subject_key=None,
         context=context,
         lang=lang,
-        attachments=[
-            {
-                "filename": attachment_filename,
-                "content": xlsx_bytes,
-                "mimetype": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            }
-        ],
+        attachments=attachments,
     )
 
     return Response(
@@ -836,8 +705,11 @@ def ingest(request):
 
     Behavior:
       - Timestamps are rounded down to the full hour (e.g. 14:26 -> 14:00).
-      - If a reading for (device, rounded_hour) exists, it is UPDATED instead of rejected.
-      - Moisture alert state is updated based on threshold crossing.
+      - If a reading for (device, rounded_hour) exists, it is UPDATED instead of rejected
+        (single INSERT ... ON CONFLICT DO UPDATE, no device row lock).
+      - The device snapshot is only replaced when the sample is not older than last_read_at,
+        so late out-of-order samples are stored but do not overwrite a newer snapshot.
+      - Moisture alert state is updated based on threshold crossing (newest samples only).
       - When crossing into the low-moisture state, push and email notifications are sent once.
       - When moisture rises back above threshold, the active alert state is reset.
       - Pump task lookup is intentionally handled by /pump-next-task/.
@@ -853,84 +725,174 @@ def ingest(request):
 
     ts_rounded = ts.replace(minute=0, second=0, microsecond=0)
 
-    try:
-        with transaction.atomic():
-            should_send_moisture_alert = False
-            alert_moisture_value = None
+    upsert_reading(device, ts_rounded, metrics)
+    mark_rollups_dirty([(device.id, rollup_day(ts_rounded))])
 
-            device = ReadingDevice.objects.select_for_update().get(pk=device.pk)
+    if update_device_snapshot(device, ts, metrics):
+        alert_moisture_value = record_moisture_alert_state(device, metrics.get("moisture"))
 
-            rec, created = Reading.objects.get_or_create(
-                device=device,
-                timestamp=ts_rounded,
-                defaults=dict(
-                    temperature=metrics.get("temperature"),
-                    humidity=metrics.get("humidity"),
-                    light=metrics.get("light"),
-                    moisture=metrics.get("moisture"),
+        if alert_moisture_value is not None:
+            transaction.on_commit(
+                lambda device_id=device.id, moisture_value=alert_moisture_value: send_moisture_alert_notifications_task.delay(
+                    device_id=device_id,
+                    moisture_value=moisture_value,
                 ),
+                robust=True,
             )
 
-            if not created:
-                rec.temperature = metrics.get("temperature")
-                rec.humidity = metrics.get("humidity")
-                rec.light = metrics.get("light")
-                rec.moisture = metrics.get("moisture")
-                rec.save(update_fields=["temperature", "humidity", "light", "moisture"])
-
-            moisture_value = rec.moisture
-            if (
-                moisture_value is not None
-                and device.moisture_alert_enabled
-                and device.moisture_alert_threshold is not None
-            ):
-                try:
-                    moisture_f = float(moisture_value)
-                    threshold_f = float(device.moisture_alert_threshold)
-                except (TypeError, ValueError):
-                    moisture_f = None
-                    threshold_f = None
-
-                if moisture_f is not None and threshold_f is not None:
-                    if moisture_f < threshold_f:
-                        if not device.moisture_alert_active:
-                            device.moisture_alert_active = True
-                            should_send_moisture_alert = True
-                            alert_moisture_value = moisture_f
-                    else:
-                        if device.moisture_alert_active:
-                            device.moisture_alert_active = False
-            elif device.moisture_alert_active and (
-                not device.moisture_alert_enabled or device.moisture_alert_threshold is None
+    return Response(
+        {"status": "ok"},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+def _collapse_batch_samples(samples):
+    """
+    Sort batch samples by timestamp and collapse them to one per rounded hour.
+
+    Returns (ordered_samples, per_hour) where per_hour maps the rounded hour to
+    the latest (timestamp, metrics) pair in that hour, mirroring the overwrite
+    behaviour of repeated /ingest/ calls.
+    """
+    ordered = sorted(
+        ((sample["timestamp"], sample.get("metrics") or {}) for sample in samples),
+        key=lambda item: item[0],
+    )
+
+    per_hour = {}
+    for ts, metrics in ordered:
+        per_hour[ts.replace(minute=0, second=0, microsecond=0)] = (ts, metrics)
+
+    return ordered, per_hour
+
+
+@api_view(["POST"])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([AnonRateThrottle, IngestBatchPerDeviceThrottle])
+def ingest_batch(request):
+    """
+    Body for one device:
+    {
+      "secret":"...","device_key":"AB12CD34",            # device_id optional
+      "readings":[
+        {"timestamp":"ISO-8601","metrics":{"temperature":22.8,"moisture":29}},
+        ...
+      ]
+    }
+
+    Body for many devices under one account secret:
+    {
+      "secret":"...",
+      "devices":[
+        {"device_key":"AB12CD34","readings":[...]},
+        ...
+      ]
+    }
+
+    Behavior:
+      - Timestamps are rounded down to the full hour, like /ingest/. When several
+        samples fall into the same hour, the latest one wins.
+      - All readings are written in one transaction with a bulk upsert on
+        (device, timestamp), through the same helpers as /ingest/ and without
+        device row locks.
+      - latest_snapshot / last_read_at are updated once per device from the newest
+        sample, unless the device already has a newer reading.
+      - When the snapshot is updated, moisture alert transitions are replayed in
+        timestamp order for samples not older than the previous last_read_at (like
+        /ingest/, a late backlog never rewinds the alert state). At most one alert
+        is sent per device and batch, and only if the device is still in the
+        low-moisture state at the end of the batch.
+      - In the multi-device form, unknown or disabled devices are listed in
+        "rejected" instead of failing the whole batch.
+    """
+    serializer = IngestBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+
+    user_id = resolve_account_user_id(data["secret"])
+    if user_id is None:
+        return Response(
+            {"detail": "invalid credentials"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    entries = data["entries"]
+    is_multi_device = data["is_multi_device"]
+
+    accepted = []
+    rejected = []
+
+    with transaction.atomic():
+        devices_by_key = {
+            device.device_key: device
+            for device in ReadingDevice.objects.filter(
+                user_id=user_id,
+                device_key__in=[entry["device_key"] for entry in entries],
+            )
+        }
+
+        reading_rows = []
+        rollup_days = set()
+
+        for entry in entries:
+            device = devices_by_key.get(entry["device_key"])
+            if device is None or (
+                entry["device_id"] is not None and device.id != entry["device_id"]
             ):
-                device.moisture_alert_active = False
-
-            device.last_read_at = ts
-            device.latest_snapshot = {
-                "temperature": rec.temperature,
-                "humidity": rec.humidity,
-                "light": rec.light,
-                "moisture": rec.moisture,
-            }
-            device.save(update_fields=[
-                "last_read_at",
-                "latest_snapshot",
-                "moisture_alert_active",
-                "updated_at",
-            ])
+                if not is_multi_device:
+                    raise Http404
+                rejected.append({"device_key": entry["device_key"], "detail": "not found"})
+                continue
 
-            if should_send_moisture_alert and alert_moisture_value is not None:
+            if not device.is_active:
+                if not is_multi_device:
+                    return Response(
+                        {"detail": "device disabled"},
+                        status=status.HTTP_403_FORBIDDEN,
+                    )
+                rejected.append({"device_key": entry["device_key"], "detail": "device disabled"})
+                continue
+
+            ordered, per_hour = _collapse_batch_samples(entry["readings"])
+
+            for ts_rounded, (_, metrics) in per_hour.items():
+                rollup_days.add((device.id, rollup_day(ts_rounded)))
+                reading_rows.append((device, ts_rounded, metrics))
+
+            previous_read_at = device.last_read_at
+            newest_ts, newest_metrics = ordered[-1]
+            alert_moisture_value = None
+            if update_device_snapshot(device, newest_ts, newest_metrics):
+                alert_moisture_value = record_moisture_alert_states(device, [
+                    metrics.get("moisture")
+                    for ts, metrics in ordered
+                    if previous_read_at is None or ts >= previous_read_at
+                ])
+
+            if alert_moisture_value is not None:
                 transaction.on_commit(
-                    lambda device_id=device.id, moisture_value=alert_moisture_value: send_moisture_alert_notifications(
+                    lambda device_id=device.id, moisture_value=alert_moisture_value: send_moisture_alert_notifications_task.delay(
                         device_id=device_id,
                         moisture_value=moisture_value,
-                    )
+                    ),
+                    robust=True,
                 )
-    except IntegrityError:
-        pass
+
+            accepted.append({
+                "device_id": device.id,
+                "device_key": device.device_key,
+                "readings": len(per_hour),
+            })
+
+        upsert_readings(reading_rows)
+        mark_rollups_dirty(rollup_days)
 
     return Response(
-        {"status": "ok"},
+        {
+            "status": "ok",
+            "accepted": accepted,
+            "rejected": rejected,
+        },
         status=status.HTTP_202_ACCEPTED,
     )
 
@@ -1098,10 +1060,11 @@ def pump_complete(request):
                 ])
 
                 transaction.on_commit(
-                    lambda device_id=device.id, task_source=task.source: send_watering_completed_notifications(
+                    lambda device_id=device.id, task_source=task.source: send_watering_completed_notifications_task.delay(
                         device_id=device_id,
                         source=task_source,
-                    )
+                    ),
+                    robust=True,
                 )
             else:
                 task.status = PumpTask.STATUS_FAILED
@@ -1134,10 +1097,11 @@ def pump_complete(request):
             ])
 
             transaction.on_commit(
-                lambda device_id=device.id, task_source=task.source: send_watering_completed_notifications(
+                lambda device_id=device.id, task_source=task.source: send_watering_completed_notifications_task.delay(
                     device_id=device_id,
                     source=task_source,
-                )
+                ),
+                robust=True,
             )
 
     return Response({
@@ -1157,33 +1121,9 @@ def feed(request):
 
     Returns only the latest reading (as an array with at most one item).
     """
-    device_id = request.query_params.get("device_id")
-    device_key = request.query_params.get("device_key")
-    secret_str = request.query_params.get("secret")
-
-    if not (device_key and secret_str):
-        return Response({"detail": "device_key and secret are required"}, status=400)
-
-    acct = AccountSecret.objects.select_related("user").filter(secret=secret_str).first()
-    if not acct:
-        return Response({"detail": "invalid credentials"}, status=403)
-
-    if device_id:
-        device = get_object_or_404(
-            ReadingDevice,
-            id=device_id,
-            device_key=device_key,
-            user=acct.user,
-        )
-    else:
-        device = get_object_or_404(
-            ReadingDevice,
-            device_key=device_key,
-            user=acct.user,
-        )
-
-    if not device.is_active:
-        return Response({"detail": "device disabled"}, status=403)
+    device, error_response = _resolve_device_from_secret_and_key(request, request.query_params)
+    if error_response is not None:
+        return error_response
 
     qs = device.readings.all()
     if "from" in request.query_params:
@@ -1219,7 +1159,8 @@ def history(request):
     Query params:
       - device_id: required, ID of ReadingDevice belonging to current user
       - range: "day" | "week" | "month"  (default "day")
-      - metric: "temperature" | "humidity" | "light" | "moisture" (default "temperature")
+      - metric: "temperature" | "humidity" | "light" | "moisture" (default "temperature"),
+        or several comma-separated, e.g. "temperature,moisture"
       - stat: "avg" | "max" | "min" for week/month daily buckets (default "avg")
       - anchor: ISO datetime for the anchor day (optional, defaults to now)
 
@@ -1227,12 +1168,19 @@ def history(request):
       {
         "device": {...},
         "range": "day" | "week" | "month",
+        "metrics": ["...", ...],
+        "span": { "from": "...", "to": "..." },
+        "series": {"<metric>": {"unit": "°C" | "%" | "lx", "points": [...]}, ...},
+
+        # only when a single metric was requested:
         "metric": "...",
         "unit": "°C" | "%" | "lx",
-        "span": { "from": "...", "to": "..." },
         "points": [{ "at": string, "value": number }, ...]
       }
 
+    Bucketing is done by the engine in settings.READINGS_HISTORY_ENGINE
+    (see readings/history.py); all metrics are computed in one query.
+
     `at` is the ISO datetime representing the start of the bucket.
     The frontend is responsible for formatting localized x-axis labels.
     """
@@ -1249,26 +1197,15 @@ def history(request):
     if range_str not in VALID_RANGES:
         return Response({"detail": "range must be one of: day, week, month"}, status=400)
 
-    metric = request.query_params.get("metric", "temperature")
-    if metric not in VALID_METRICS:
-        return Response({
-            "detail": "metric must be one of: temperature, humidity, light, moisture"
-        }, status=400)
-
-    requested_stat = request.query_params.get("stat", "avg")
-    if requested_stat not in VALID_HISTORY_STATS:
-        return Response({"detail": "stat must be one of: avg, max, min"}, status=400)
+    metrics, requested_stat, error = _history_metrics_and_stat(request.query_params)
+    if error is not None:
+        return error
 
     anchor = parse_ts_or_now(request.query_params.get("anchor"))
     anchor_local = timezone.localtime(anchor)
 
     span_from, span_to = _span_for(range_str, anchor_local)
 
-    qs = device.readings.filter(
-        timestamp__gte=span_from,
-        timestamp__lte=span_to,
-    ).order_by("timestamp")
-
     if range_str == "day":
         bin_count = 24
     elif range_str == "week":
@@ -1276,62 +1213,27 @@ def history(request):
     else:
         bin_count = _month_day_count(anchor_local)
 
-    bins = [{"sum": 0.0, "cnt": 0, "min": None, "max": None} for _ in range(bin_count)]
-
-    for rec in qs:
-        ts_local = timezone.localtime(rec.timestamp)
+    bins_by_metric = history_bins(device, metrics, range_str, span_from, span_to, bin_count)
 
-        if range_str == "day":
-            idx = ts_local.hour  # 0..23
-        elif range_str == "week":
-            idx = (ts_local.date() - span_from.date()).days  # 0..6 ideally
-            if idx < 0 or idx >= bin_count:
-                continue
-        else:  # month
-            idx = ts_local.day - 1  # 0..(days-1)
-            if idx < 0 or idx >= bin_count:
-                continue
-
-        val = getattr(rec, metric, None)
-        if val is None:
-            continue
-
-        try:
-            val_f = float(val)
-        except (TypeError, ValueError):
-            continue
-
-        if not math.isfinite(val_f):
-            continue
-
-        bins[idx]["sum"] += val_f
-        bins[idx]["cnt"] += 1
-        bins[idx]["min"] = val_f if bins[idx]["min"] is None else min(bins[idx]["min"], val_f)
-        bins[idx]["max"] = val_f if bins[idx]["max"] is None else max(bins[idx]["max"], val_f)
-
-    values = []
     effective_stat = "avg" if range_str == "day" else requested_stat
-    for b in bins:
-        if not b["cnt"]:
-            values.append(0.0)
-        elif effective_stat == "max":
-            values.append(round(b["max"], 2))
-        elif effective_stat == "min":
-            values.append(round(b["min"], 2))
-        else:
-            values.append(round(b["sum"] / b["cnt"], 2))
 
     if range_str == "day":
         bucket_starts = [span_from + timedelta(hours=i) for i in range(bin_count)]
     else:
         bucket_starts = [span_from + timedelta(days=i) for i in range(bin_count)]
 
-    points = [
-        {"at": bucket_starts[i].isoformat(), "value": values[i]}
-        for i in range(bin_count)
-    ]
-
-    return Response({
+    series = {}
+    for metric in metrics:
+        values = bin_values(bins_by_metric[metric], effective_stat)
+        series[metric] = {
+            "unit": HISTORY_UNITS[metric],
+            "points": [
+                {"at": bucket_starts[i].isoformat(), "value": values[i]}
+                for i in range(bin_count)
+            ],
+        }
+
+    payload = {
         "device": {
             "id": device.id,
             "device_name": device.device_name,
@@ -1339,12 +1241,116 @@ def history(request):
             "interval_hours": device.interval_hours,
         },
         "range": range_str,
-        "metric": metric,
+        "metrics": metrics,
         "stat": effective_stat,
-        "unit": HISTORY_UNITS[metric],
         "span": {
             "from": span_from.isoformat(),
             "to": span_to.isoformat(),
         },
-        "points": points,
-    })
+        "series": series,
+    }
+
+    if len(metrics) == 1:
+        payload["metric"] = metrics[0]
+        payload["unit"] = series[metrics[0]]["unit"]
+        payload["points"] = series[metrics[0]]["points"]
+
+    return Response(payload)
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def dashboard_history(request):
+    """
+    Sparkline series for all of the current user's devices in one response.
+
+    Query params:
+      - metric: same as /history/ (default "temperature", comma-separated list allowed)
+      - stat: "avg" | "max" | "min" per hourly bucket (default "avg")
+      - hours: window length in hours, 1..168 (default 24); the window ends with
+        the current hour (or the hour of `anchor`)
+      - anchor: ISO datetime (optional, defaults to now)
+
+    Returns:
+      {
+        "metrics": ["...", ...],
+        "units": {"<metric>": "°C" | "%" | "lx", ...},
+        "stat": "avg" | "max" | "min",
+        "hours": 24,
+        "span": { "from": "...", "to": "..." },
+        "buckets": ["<bucket start ISO>", ...],
+        "devices": [
+          {"id": 1, "device_name": "...", "plant_name": "...", "last_read_at": "...",
+           "series": {"<metric>": [number, ...]}},
+          ...
+        ]
+      }
+
+    All devices are bucketed with a single grouped query. The response carries an
+    ETag; a matching If-None-Match gets 304 after only the device list query.
+    """
+    metrics, stat, error = _history_metrics_and_stat(request.query_params)
+    if error is not None:
+        return error
+
+    try:
+        hours = int(request.query_params.get("hours", DASHBOARD_HISTORY_DEFAULT_HOURS))
+    except (TypeError, ValueError):
+        hours = 0
+    if hours < 1 or hours > DASHBOARD_HISTORY_MAX_HOURS:
+        return Response({
+            "detail": f"hours must be between 1 and {DASHBOARD_HISTORY_MAX_HOURS}"
+        }, status=400)
+
+    anchor = parse_ts_or_now(request.query_params.get("anchor"))
+    # Whole hours counted in UTC, so the window is `hours` real hours across DST changes.
+    current_hour = anchor.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    span_from = current_hour - timedelta(hours=hours - 1)
+    span_to = current_hour + timedelta(hours=1) - timedelta(microseconds=1)
+
+    devices = list(
+        ReadingDevice.objects
+        .filter(user=request.user)
+        .only("id", "device_name", "plant_name", "last_read_at", "readings_changed_at", "updated_at")
+        .order_by("device_name", "id")
+    )
+
+    etag = _dashboard_etag(request.user.pk, devices, metrics, stat, hours, span_from)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response["ETag"] = etag
+        return response
+
+    bins_by_device = hourly_bins_by_device(
+        [device.id for device in devices], metrics, span_from, span_to, hours
+    )
+
+    payload = {
+        "metrics": metrics,
+        "units": {metric: HISTORY_UNITS[metric] for metric in metrics},
+        "stat": stat,
+        "hours": hours,
+        "span": {
+            "from": timezone.localtime(span_from).isoformat(),
+            "to": timezone.localtime(span_to).isoformat(),
+        },
+        "buckets": [timezone.localtime(span_from + timedelta(hours=i)).isoformat() for i in range(hours)],
+        "devices": [
+            {
+                "id": device.id,
+                "device_name": device.device_name,
+                "plant_name": device.plant_name,
+                "last_read_at": device.last_read_at,
+                "series": {
+                    metric: bin_values(bins_by_device[device.id][metric], stat)
+                    for metric in metrics
+                },
+            }
+            for device in devices
+        ],
+    }
+
+    response = Response(payload)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -36,7 +36,7 @@ def _task(user, status="completed", suffix=""):
 
 
 @pytest.mark.django_db
-@patch("reminders.views.send_templated_email")
+@patch("reminders.views.enqueue_templated_email")
 def test_export_email_sends_xlsx_attachment(mock_send):
     user = User.objects.create_user(email="test@example.com", password="strong-password-123")
     _task(user, status="completed", suffix=" A")
@@ -93,7 +93,7 @@ def test_export_email_rejects_invalid_date_range():
 
 
 @pytest.mark.django_db
-@patch("reminders.views.send_templated_email")
+@patch("reminders.views.enqueue_templated_email")
 def test_export_email_returns_500_when_send_fails(mock_send):
     user = User.objects.create_user(email="test@example.com", password="strong-password-123")
     _task(user, status="completed")
@@ -14,7 +14,7 @@ from rest_framework.views import APIView
 from openpyxl import Workbook
 from openpyxl.styles import Font
 
-from core.emailing import send_templated_email
+from core.outbox import enqueue_templated_email
 
 from .models import Reminder, ReminderTask
 from .serializers import (
@@ -492,7 +492,7 @@ class ReminderTaskExportEmailView(APIView):
         }
 
         try:
-            send_templated_email(
+            enqueue_templated_email(
                 to_email=to_email,
                 template_name="reminders/task_history_export",
                 subject_key=None,
@@ -507,7 +507,7 @@ class ReminderTaskExportEmailView(APIView):
                 ],
             )
         except Exception:
-            logger.exception("Failed to send task history export email.")
+            logger.exception("Failed to queue task history export email.")
             return Response(
                 {"detail": "Failed to send export email."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,152 @@
+"""
+Accuracy vs latency of each exported plant model backend on the val split.
+
+For every backend whose artifact is present (see export_model.py) this loads the
+model exactly as the backend does (plant_recognition.inference), runs the val
+split through it and reports:
+
+    top-1 / top-3 accuracy
+    agreement of its top-1 with the eager model's
+    single-image latency (p50 / p95 of batch-1 forward passes, ms)
+    batched throughput (images/s at --batch-size)
+
+Preprocessing is the backend's val transform and is not timed; only the forward
+pass is.
+
+Usage (from the 'ml' folder):
+
+    python benchmark_backends.py
+    python benchmark_backends.py --limit 500 --backends eager int8_static onnx
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import torch
+from torch.utils.data import DataLoader, Subset
+
+from dataset import PlantNetFolderDataset
+from config import BACKEND_ROOT, VAL_DIR, NUM_WORKERS
+
+sys.path.insert(0, str(BACKEND_ROOT))
+from plant_recognition.inference import (  # noqa: E402
+    BACKEND_SUFFIXES,
+    MODEL_NAME,
+    artifact_path,
+    registry,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark plant model backends on the val split.")
+    parser.add_argument("--model", default=MODEL_NAME, help="Artifact name prefix (PLANT_MODEL).")
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=list(BACKEND_SUFFIXES),
+        default=None,
+        help="Backends to compare (default: every one with an artifact).",
+    )
+    parser.add_argument("--limit", type=int, default=2000, help="Val images to evaluate (0 = all).")
+    parser.add_argument("--batch-size", type=int, default=16, help="Batch size for the throughput pass.")
+    parser.add_argument("--latency-samples", type=int, default=100, help="Batch-1 forward passes to time.")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: torch's).")
+    return parser.parse_args()
+
+
+def val_subset(limit: int):
+    if not VAL_DIR.exists():
+        raise FileNotFoundError(f"VAL_DIR not found: {VAL_DIR}")
+    val_ds = PlantNetFolderDataset(VAL_DIR, train=False)
+    if limit and limit < len(val_ds):
+        # Spread over all classes instead of the first few folders.
+        step = len(val_ds) / limit
+        val_ds = Subset(val_ds, [int(i * step) for i in range(limit)])
+    return val_ds
+
+
+def class_index_map(folder_classes, model_classes):
+    """Val folder index -> model output index (the folders may be a subset, in another order)."""
+    positions = {name: i for i, name in enumerate(model_classes)}
+    missing = [name for name in folder_classes if name not in positions]
+    if missing:
+        raise ValueError(f"{len(missing)} val classes are unknown to the model, e.g. {missing[:3]}")
+    return torch.tensor([positions[name] for name in folder_classes])
+
+
+def evaluate(loaded, loader, to_model_index):
+    correct1 = correct3 = total = 0
+    top1_all = []
+    seconds = 0.0
+    with torch.no_grad():
+        for images, targets in loader:
+            targets = to_model_index[targets]
+            started = time.perf_counter()
+            logits = loaded.model(images)
+            seconds += time.perf_counter() - started
+
+            top3 = logits.topk(3, dim=1).indices
+            correct1 += (top3[:, 0] == targets).sum().item()
+            correct3 += (top3 == targets[:, None]).any(dim=1).sum().item()
+            total += images.size(0)
+            top1_all.append(top3[:, 0])
+    return {
+        "top1": correct1 / total,
+        "top3": correct3 / total,
+        "images_per_sec": total / seconds,
+        "predictions": torch.cat(top1_all),
+    }
+
+
+def latency_ms(loaded, val_ds, samples: int):
+    samples = min(samples, len(val_ds))
+    inputs = [val_ds[i][0].unsqueeze(0) for i in range(samples)]
+    timings = []
+    with torch.no_grad():
+        for _ in range(3):
+            loaded.model(inputs[0])
+        for x in inputs:
+            started = time.perf_counter()
+            loaded.model(x)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+def main():
+    args = parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    backends = args.backends or [b for b in BACKEND_SUFFIXES if artifact_path(args.model, b).exists()]
+    if not backends:
+        raise FileNotFoundError(f"No artifacts for {args.model}; run export_model.py first.")
+
+    val_ds = val_subset(args.limit)
+    folder_classes = val_ds.dataset.classes if isinstance(val_ds, Subset) else val_ds.classes
+    loader = DataLoader(val_ds, batch_size=args.batch_size, shuffle=False, num_workers=NUM_WORKERS)
+    print(f"[Data] {len(val_ds)} val images from {VAL_DIR} | threads={torch.get_num_threads()}")
+
+    results = {}
+    for backend in backends:
+        loaded = registry.get(args.model, backend)
+        to_model_index = class_index_map(folder_classes, loaded.class_names)
+        p50, p95 = latency_ms(loaded, val_ds, args.latency_samples)
+        results[backend] = {**evaluate(loaded, loader, to_model_index), "p50": p50, "p95": p95}
+        print(f"[{backend}] done (load {loaded.load_seconds:.1f}s)")
+
+    reference = results.get("eager", {}).get("predictions")
+    print()
+    print(f"{'backend':<14}{'top-1':>8}{'top-3':>8}{'agree':>8}{'p50 ms':>9}{'p95 ms':>9}{'img/s':>9}")
+    for backend, r in results.items():
+        agree = "-" if reference is None else f"{(r['predictions'] == reference).float().mean().item():.3f}"
+        print(
+            f"{backend:<14}{r['top1']:>8.3f}{r['top3']:>8.3f}{agree:>8}"
+            f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['images_per_sec']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
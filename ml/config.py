@@ -21,6 +21,9 @@ DATA_ROOT = ML_ROOT / "data" / "web_scrapped" / "images"
 TRAIN_DIR = DATA_ROOT / "train"
 VAL_DIR = DATA_ROOT / "val"
 
+# Backend app whose artifacts/ serves the trained model (see export_model.py)
+BACKEND_ROOT = PROJECT_ROOT / "backend"
+
 # Checkpoints & logs
 CHECKPOINT_DIR = ML_ROOT / "checkpoints"
 LOG_DIR = ML_ROOT / "logs"
@@ -1,109 +1,210 @@
 """
-Dataset for the plants dataset based on folder structure:
+Export the trained ResNet18 into the faster inference artifacts the backend can
+serve (see PLANT_MODEL_BACKEND in backend/plant_recognition/inference.py).
 
-    .../images/train/<latin_name>/image.jpg
-    .../images/val/<latin_name>/image.jpg
+Reads <name>_best.pth from backend/plant_recognition/artifacts and writes, next to it:
 
-Uses torchvision.datasets.ImageFolder and a robust image loader that:
-- tolerates truncated / partially corrupted images
-- suppresses noisy PIL warnings
-- never freezes training on bad files
+    <name>_scripted.pt       TorchScript, traced and frozen (fp32)
+    <name>_int8_dynamic.pt   dynamic int8 quantization of the classifier head
+    <name>_int8_static.pt    post-training static int8 (FX graph mode), calibrated
+                             on images from the val split; frozen TorchScript
+    <name>.onnx              ONNX with a dynamic batch axis (for onnxruntime)
+
+Each export is checked against the eager model on the same batch before it is
+kept. Static quantization needs the val split (config.VAL_DIR) for calibration
+and is skipped without it.
+
+Usage (from the 'ml' folder):
+
+    python export_model.py
+    python export_model.py --formats torchscript onnx
+    python export_model.py --model web_scrapped_resnet18_v1 --calib-batches 32
+
+Then compare the artifacts with benchmark_backends.py.
 """
 
+import argparse
+import copy
+import json
+import sys
+import time
 from pathlib import Path
-import warnings
-
-from PIL import Image, UnidentifiedImageError, ImageFile
-from torchvision import transforms, datasets
-
-# Allow loading of truncated / slightly corrupted JPEGs
-ImageFile.LOAD_TRUNCATED_IMAGES = True
-
-
-# ----------------------------------------------------------------------
-# Transforms
-# ----------------------------------------------------------------------
-
-def get_train_transform():
-    """
-    Data augmentation and preprocessing used for training.
-    """
-    return transforms.Compose([
-        transforms.Resize(256),
-        transforms.RandomResizedCrop(224),
-        transforms.RandomHorizontalFlip(),
-        transforms.ToTensor(),
-        transforms.Normalize(
-            mean=[0.485, 0.456, 0.406],  # ImageNet means
-            std=[0.229, 0.224, 0.225],   # ImageNet stds
-        ),
-    ])
-
-
-def get_val_transform():
-    """
-    Preprocessing used for validation / evaluation.
-    """
-    return transforms.Compose([
-        transforms.Resize(256),
-        transforms.CenterCrop(224),
-        transforms.ToTensor(),
-        transforms.Normalize(
-            mean=[0.485, 0.456, 0.406],
-            std=[0.229, 0.224, 0.225],
-        ),
-    ])
-
-
-# ----------------------------------------------------------------------
-# Robust image loader
-# ----------------------------------------------------------------------
-
-def safe_loader(path: str) -> Image.Image:
-    """
-    Robust image loader.
-
-    - Opens image and converts to RGB.
-    - Suppresses common PIL UserWarnings (palette + transparency).
-    - Returns a dummy black image if loading fails.
-
-    This guarantees that training never freezes due to a bad image file.
-    """
-    try:
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", UserWarning)
-            img = Image.open(path)
-            return img.convert("RGB")
-    except (UnidentifiedImageError, OSError, IOError):
-        # Fallback: black dummy image (224x224)
-        return Image.new("RGB", (224, 224), (0, 0, 0))
-
-
-# ----------------------------------------------------------------------
-# Dataset wrapper
-# ----------------------------------------------------------------------
-
-class PlantNetFolderDataset(datasets.ImageFolder):
-    """
-    Thin wrapper around torchvision.datasets.ImageFolder.
-
-    ImageFolder expects:
-      root/
-        class_0/
-          img001.jpg
-          ...
-        class_1/
-          ...
-
-    It automatically builds:
-      - self.samples: list of (path, class_index)
-      - self.classes: list of class names (folder names)
-    """
-
-    def __init__(self, root: Path, train: bool = True):
-        root = Path(root)
-        transform = get_train_transform() if train else get_val_transform()
-        super().__init__(root=root, transform=transform)
-
-        # Override image loading with safe loader
-        self.loader = safe_loader
+
+import torch
+from torch import nn
+from torch.utils.data import DataLoader, Subset
+from torchvision.models import resnet18
+
+from dataset import PlantNetFolderDataset
+from config import BACKEND_ROOT, VAL_DIR, BATCH_SIZE, NUM_WORKERS
+
+sys.path.insert(0, str(BACKEND_ROOT))
+from plant_recognition.inference import ARTIFACTS_DIR, BACKEND_SUFFIXES  # noqa: E402
+
+DEFAULT_MODEL_NAME = "web_scrapped_resnet18_v1"
+FORMATS = ("torchscript", "int8_dynamic", "int8_static", "onnx")
+ONNX_OPSET = 17
+
+# Largest allowed difference between an export's softmax and the eager model's.
+FP32_TOLERANCE = 1e-3
+INT8_TOLERANCE = 0.05
+
+
+def load_eager_model(weights_path: Path, classes_path: Path) -> nn.Module:
+    with classes_path.open("r", encoding="utf-8") as f:
+        num_classes = len(json.load(f))
+
+    model = resnet18(weights=None)
+    model.fc = nn.Linear(model.fc.in_features, num_classes)
+
+    state = torch.load(weights_path, map_location="cpu")
+    if isinstance(state, dict) and "model_state" in state:
+        state = state["model_state"]
+    model.load_state_dict(state, strict=True)
+    model.eval()
+    print(f"[Model] Loaded {weights_path.name} ({num_classes} classes)")
+    return model
+
+
+def freeze(model: nn.Module, example: torch.Tensor) -> torch.jit.ScriptModule:
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    return torch.jit.freeze(traced.eval())
+
+
+def calibration_loader(num_batches: int):
+    if not VAL_DIR.exists():
+        return None
+    val_ds = PlantNetFolderDataset(VAL_DIR, train=False)
+    # An even spread over the classes rather than the first few folders.
+    step = max(1, len(val_ds) // max(1, num_batches * BATCH_SIZE))
+    indices = list(range(0, len(val_ds), step))[: num_batches * BATCH_SIZE]
+    return DataLoader(Subset(val_ds, indices), batch_size=BATCH_SIZE, shuffle=False, num_workers=NUM_WORKERS)
+
+
+def export_torchscript(model, example, path: Path):
+    torch.jit.save(freeze(model, example), str(path))
+
+
+def export_int8_dynamic(model, example, path: Path):
+    quantized = torch.ao.quantization.quantize_dynamic(
+        copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8
+    )
+    torch.jit.save(freeze(quantized, example), str(path))
+
+
+def export_int8_static(model, example, path: Path, loader):
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = torch.backends.quantized.engine
+    prepared = prepare_fx(copy.deepcopy(model), get_default_qconfig_mapping(engine), (example,))
+
+    seen = 0
+    with torch.no_grad():
+        for images, _ in loader:
+            prepared(images)
+            seen += images.size(0)
+    print(f"[int8_static] Calibrated on {seen} val images ({engine} engine)")
+
+    quantized = convert_fx(prepared)
+    torch.jit.save(freeze(quantized, example), str(path))
+
+
+def export_onnx(model, example, path: Path):
+    torch.onnx.export(
+        model,
+        (example,),
+        str(path),
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=ONNX_OPSET,
+        dynamo=False,
+    )
+
+
+def max_prob_diff(fmt: str, path: Path, eager: nn.Module, batch: torch.Tensor) -> float:
+    with torch.no_grad():
+        expected = torch.softmax(eager(batch), dim=1)
+        if fmt == "onnx":
+            import onnxruntime as ort
+
+            session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+            logits = torch.from_numpy(session.run(None, {"input": batch.numpy()})[0])
+        else:
+            logits = torch.jit.load(str(path))(batch)
+    return (torch.softmax(logits, dim=1) - expected).abs().max().item()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export TorchScript / int8 / ONNX plant model artifacts.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="Artifact name prefix (PLANT_MODEL).")
+    parser.add_argument(
+        "--artifacts-dir",
+        type=Path,
+        default=ARTIFACTS_DIR,
+        help="Where <model>_best.pth lives and the exports are written.",
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=FORMATS,
+        default=list(FORMATS),
+        help="Which artifacts to write (default: all).",
+    )
+    parser.add_argument(
+        "--calib-batches",
+        type=int,
+        default=16,
+        help=f"Val batches of {BATCH_SIZE} used to calibrate int8_static.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    torch.set_grad_enabled(False)
+
+    weights = args.artifacts_dir / f"{args.model}{BACKEND_SUFFIXES['eager']}"
+    classes = args.artifacts_dir / f"{args.model}_classes.json"
+    for path in (weights, classes):
+        if not path.exists():
+            raise FileNotFoundError(f"Not found: {path}")
+
+    model = load_eager_model(weights, classes)
+    example = torch.zeros(1, 3, 224, 224)
+
+    loader = calibration_loader(args.calib_batches) if "int8_static" in args.formats else None
+    check_batch = next(iter(loader))[0] if loader is not None else torch.randn(4, 3, 224, 224)
+
+    for fmt in args.formats:
+        path = args.artifacts_dir / f"{args.model}{BACKEND_SUFFIXES[fmt]}"
+        if fmt == "int8_static" and loader is None:
+            print(f"[int8_static] Skipped: VAL_DIR not found ({VAL_DIR}), nothing to calibrate on")
+            continue
+
+        started = time.time()
+        if fmt == "torchscript":
+            export_torchscript(model, example, path)
+        elif fmt == "int8_dynamic":
+            export_int8_dynamic(model, example, path)
+        elif fmt == "int8_static":
+            export_int8_static(model, example, path, loader)
+        elif fmt == "onnx":
+            export_onnx(model, example, path)
+
+        diff = max_prob_diff(fmt, path, model, check_batch)
+        tolerance = INT8_TOLERANCE if fmt.startswith("int8") else FP32_TOLERANCE
+        size_mb = path.stat().st_size / 1024 / 1024
+        print(
+            f"[{fmt}] {path.name} | {size_mb:.1f} MB | {time.time() - started:.1f}s "
+            f"| max softmax diff vs eager={diff:.5f}"
+        )
+        if diff > tolerance:
+            path.unlink()
+            raise RuntimeError(f"{fmt} export drifted from the eager model ({diff:.4f} > {tolerance}); removed {path}")
+
+
+if __name__ == "__main__":
+    main()